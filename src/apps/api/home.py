@@ -0,0 +1,72 @@
+"""
+Materialized home page.
+
+Home page payload (current season, updates, populars and latests) is rendered
+to JSON bytes by celery task and stored in cache (Redis), so `FrontendHome` only reads
+and returns the bytes. Snapshot is rebuilt after titles updates, ranks updates
+and titles enabling or disabling.
+"""
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.generics import GenericAPIView
+from rest_framework.renderers import JSONRenderer
+
+HOME_SNAPSHOT_CACHE_KEY = 'api.home.snapshot'
+HOME_SCHEDULED_CACHE_KEY = 'api.home.scheduled'
+
+# delay of snapshot rebuilding, to rebuild it once after bunch of titles changes
+HOME_UPDATE_COUNTDOWN = 10
+
+HOME_LIST_LIMIT = 10
+
+
+def _get_list_view_data(view: GenericAPIView, limit: int = None) -> list:
+    view = view()
+    queryset = view.get_queryset()
+
+    if limit:
+        queryset = queryset[:limit]
+
+    return view.serializer_class(queryset, many=True).data
+
+
+def build_snapshot() -> bytes:
+    from apps.titles.views import CurrentSeason, Latests, Populars
+    from apps.translations.views import Updates
+
+    return JSONRenderer().render(
+        {
+            'current_season': _get_list_view_data(CurrentSeason),
+            'updates': _get_list_view_data(Updates, HOME_LIST_LIMIT),
+            'populars': _get_list_view_data(Populars, HOME_LIST_LIMIT),
+            'latests': _get_list_view_data(Latests, HOME_LIST_LIMIT),
+        }
+    )
+
+
+def update_snapshot() -> bytes:
+    """Rebuild snapshot and store it in cache"""
+    snapshot = build_snapshot()
+    cache.set(HOME_SNAPSHOT_CACHE_KEY, snapshot, None)
+    cache.delete(HOME_SCHEDULED_CACHE_KEY)
+    return snapshot
+
+
+def get_snapshot() -> bytes:
+    """Stored snapshot, it's built in place only if there is no one yet"""
+    snapshot: Optional[bytes] = cache.get(HOME_SNAPSHOT_CACHE_KEY)
+    return snapshot if snapshot is not None else update_snapshot()
+
+
+def schedule_update():
+    """Schedule snapshot rebuilding once current transaction is committed"""
+
+    def _schedule():
+        from .tasks import update_home_snapshot
+
+        if cache.add(HOME_SCHEDULED_CACHE_KEY, True, HOME_UPDATE_COUNTDOWN * 2):
+            update_home_snapshot.apply_async(countdown=HOME_UPDATE_COUNTDOWN)
+
+    transaction.on_commit(_schedule)
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.titles.models import Title
+
+from . import home
+
+
+@receiver(post_save, sender=Title, dispatch_uid='title_home_snapshot_save_signal')
+def title_home_snapshot_save_signal(instance, **kwargs):
+    if getattr(instance, '_was_enabled', False) or instance.is_enabled:
+        home.schedule_update()
+
+
+@receiver(post_delete, sender=Title, dispatch_uid='title_home_snapshot_delete_signal')
+def title_home_snapshot_delete_signal(**kwargs):
+    home.schedule_update()
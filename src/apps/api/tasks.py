@@ -0,0 +1,17 @@
+import logging
+
+from celery import shared_task
+
+from . import home
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def update_home_snapshot():
+    logger.info('Updating home snapshot')
+    try:
+        snapshot = home.update_snapshot()
+        logger.info('Successfully updated home snapshot, %s bytes', len(snapshot))
+    except Exception as ex:
+        logger.exception(ex)
@@ -27,6 +27,19 @@ class BaseApiEndpointsTests(BaseTestCase):
         self.assertEqual(self.client.get('/frontend/home/').status_code, 200)
         self.assertEqual(self.client.get('/sitemap/').status_code, 200)
 
+    @override_settings(**DUMMY_CACHE_SETTINGS)
+    def test_home_snapshot(self):
+        response = self.client.get('/frontend/home/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        data = response.json()
+        self.assertEqual(
+            set(data), {'current_season', 'updates', 'populars', 'latests'}
+        )
+        self.assertEqual(
+            [title['slug'] for title in data['latests']], [self.title.slug]
+        )
+
 
 # class AuthenticationTest(BaseTestCase):
 #     def setUp(self):
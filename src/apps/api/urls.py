@@ -10,7 +10,7 @@ urlpatterns = [
         'frontend/',
         include(
             [
-                path('home/', cache_page(60 * 5)(views.FrontendHome.as_view())),
+                path('home/', views.FrontendHome.as_view()),
                 path('config/', cache_page(60 * 5)(views.FrontendConfig.as_view())),
             ]
         ),
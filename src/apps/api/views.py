@@ -1,14 +1,13 @@
 from django.conf import settings
+from django.http import HttpResponse
 from django.views.generic import TemplateView
 
 from apps.titles.models import Title
-from apps.titles.views import CurrentSeason, Latests, Populars
 from apps.translations.models import Episode
-from apps.translations.views import Updates
-from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView, Response
 
+from . import home
 from .services import get_frontend_app_config
 
 
@@ -20,29 +19,10 @@ class FrontendConfig(APIView):
 
 
 class FrontendHome(APIView):
-    def get_list_view_data(self, view: GenericAPIView, limit: int = None):
-        view = view(request=self.request)
-
-        queryset = view.get_queryset()
-
-        if limit:
-            queryset = queryset[:limit]
-
-        serializer = view.serializer_class(
-            queryset, many=True, context={'request': self.request}
-        )
-
-        return serializer.data
+    permission_classes = (AllowAny,)
 
     def get(self, request):
-        default_limit = 10
-        context = {}
-        context['current_season'] = self.get_list_view_data(CurrentSeason)
-        context['updates'] = self.get_list_view_data(Updates, default_limit)
-        context['populars'] = self.get_list_view_data(Populars, default_limit)
-        context['latests'] = self.get_list_view_data(Latests, default_limit)
-
-        return Response(context)
+        return HttpResponse(home.get_snapshot(), content_type='application/json')
 
 
 class Sitemap(TemplateView):
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from apps.core.fastserializers import Column, Many, Nested, ValuesSerializer
 from apps.titles.models import Title
-from apps.users.serializers import UserBaseSerializer
+from apps.titles.serializers import date_time
+from apps.users.serializers import UserBaseSerializer, user_base_values_fields
 
 from . import models, service
 
@@ -144,3 +146,45 @@ class CommentRateRetrieveSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.CommentRate
         fields = ('id', 'user', 'comment', 'rate')
+
+
+# fast path serializer (see apps.core.fastserializers), output must match TitleCommentSerializer
+
+
+def _get_rate_lookups(context: dict):
+    """Only rate of the request user is serialized, see `BaseCommentSerializer.get_rate`"""
+    if (
+        'request' in context
+        and (user := context['request'].user)
+        and user.is_authenticated
+    ):
+        return {'user': user.pk}
+    return None
+
+
+title_comment_values = ValuesSerializer(
+    models.TitleComment,
+    {
+        'id': Column('id'),
+        'user': Nested('user', user_base_values_fields),
+        'text': Column('text'),
+        'likes': Column('likes'),
+        'dislikes': Column('dislikes'),
+        'date_created': Column('date_created', date_time),
+        'date_modified': Column('date_modified', date_time),
+        'group': Column('tree_id'),
+        'rate': Many(
+            'rates',
+            {
+                'id': Column('id'),
+                'user': Nested('user', user_base_values_fields),
+                'comment': Column('comment'),
+                'rate': Column('rate'),
+            },
+            filter=_get_rate_lookups,
+            single=True,
+        ),
+        'replies': Column('replies'),
+        'title': Column('title__slug'),
+    },
+)
@@ -1,3 +1,54 @@
-from django.test import TestCase
+from core.tests import BaseTestCase
 
-# Create your tests here.
+
+class TitleCommentValuesSerializerTest(BaseTestCase):
+    """Fast path serializer must give the same output as TitleCommentSerializer"""
+
+    def setUp(self):
+        from apps.comments.models import CommentRate, TitleComment
+        from apps.titles.models import Title
+
+        self._setup_test_titles(number=1)
+        self.user, self.token = self._setup_test_user()
+        self.title = Title.objects.first()
+
+        for text in ('first', 'second'):
+            comment = TitleComment.objects.create(
+                user=self.user, title=self.title, text=text
+            )
+        CommentRate.objects.create(
+            user=self.user, comment=comment, rate=CommentRate.RATES.like
+        )
+
+    def _assert_same_output(self, user):
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.test import APIRequestFactory
+
+        from apps.comments.serializers import (
+            TitleCommentSerializer,
+            title_comment_values,
+        )
+        from apps.comments.views import TitleCommentsList
+
+        request = APIRequestFactory().get('/')
+        request.user = user
+        view = TitleCommentsList()
+        view.title = self.title
+        queryset = view.get_queryset().order_by('pk')
+
+        self.assertEqual(
+            JSONRenderer().render(
+                title_comment_values.serialize(queryset, context={'request': request})
+            ),
+            JSONRenderer().render(
+                TitleCommentSerializer(
+                    queryset, many=True, context={'request': request}
+                ).data
+            ),
+        )
+
+    def test_same_output(self):
+        from django.contrib.auth.models import AnonymousUser
+
+        self._assert_same_output(self.user)
+        self._assert_same_output(AnonymousUser())
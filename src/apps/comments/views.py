@@ -7,7 +7,7 @@ from rest_framework import generics, mixins, permissions, status
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from apps.core.generics import CreateAPIView
+from apps.core.generics import CreateAPIView, ValuesListMixin
 from apps.core.permissions import IsOwner
 from apps.titles.models import Title
 
@@ -20,9 +20,10 @@ class SQCount(Subquery):
     output_field = IntegerField()
 
 
-class TitleCommentsList(generics.ListAPIView):
+class TitleCommentsList(ValuesListMixin, generics.ListAPIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = serializers.TitleCommentSerializer
+    values_serializer = serializers.title_comment_values
     ordering_fields = ('date_created', 'rating', 'has_rates')
     ordering = ('-date_created',)
 
@@ -0,0 +1,142 @@
+"""
+Caching with stale-while-revalidate and probabilistic early expiration.
+
+Cached value is stored together with the time it goes stale and the time its computation
+took. After going stale, entry stays in cache for `stale_timeout` more seconds:
+only one process, holding a short lock in cache, recomputes it, the others keep
+getting the stale value meanwhile. Before going stale, value is recomputed early
+with probability growing as expiration approaches (XFetch), so under load
+entries are usually refreshed before they go stale at all.
+"""
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+from typing import Any, Callable, Union
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+LOCK_CACHE_KEY = '%s.lock'
+DEFAULT_LOCK_TIMEOUT = 10
+# how often (in seconds) value being computed by another process is checked
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _is_fresh(expires: float, delta: float, beta: float) -> bool:
+    # -log(u) for u in (0, 1] is exponentially distributed,
+    # so early expiration gets likely only close to `expires`
+    return time.time() - delta * beta * math.log(1 - random.random()) < expires
+
+
+def _compute(key: str, compute: Callable[[], Any], timeout: int, stale_timeout: int):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+
+    cache.set(key, (value, time.time() + timeout, delta), timeout + stale_timeout)
+    return value
+
+
+def get_or_set(
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int,
+    stale_timeout: int = None,
+    lock_timeout: int = DEFAULT_LOCK_TIMEOUT,
+    beta: float = 1.0,
+) -> Any:
+    """Get cached value or compute it, only one process computes the value at a time
+
+    Args:
+        key (str): cache key
+        compute (Callable): computes the value
+        timeout (int): seconds value is fresh for
+        stale_timeout (int, optional): seconds stale value is served for while it's
+            recomputed. Defaults to None - same as `timeout`
+        lock_timeout (int, optional): seconds recompute lock is held for at most,
+            should be greater than computation time
+        beta (float, optional): eagerness of early expiration, 0 disables it
+    """
+    stale_timeout = timeout if stale_timeout is None else stale_timeout
+
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        if _is_fresh(expires, delta, beta):
+            return value
+
+    lock_key = LOCK_CACHE_KEY % key
+    if cache.add(lock_key, True, lock_timeout):
+        try:
+            return _compute(key, compute, timeout, stale_timeout)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        # another process is recomputing it
+        return entry[0]
+
+    # nothing to serve yet, wait for the process computing it
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        if (entry := cache.get(key)) is not None:
+            return entry[0]
+
+    return _compute(key, compute, timeout, stale_timeout)
+
+
+def cached(key: Union[str, Callable[..., str]], timeout: int, **options):
+    """Cache function's result, see `get_or_set` for options
+
+    Args:
+        key (str or Callable): cache key or function making it from function's arguments
+        timeout (int): seconds result is fresh for
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return get_or_set(
+                key(*args, **kwargs) if callable(key) else key,
+                lambda: function(*args, **kwargs),
+                timeout,
+                **options,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def cache_response(timeout: int, version: Callable[[], Any] = None, **options):
+    """Cache data of DRF view's response by request path,
+    for views whose responses depend only on the path, see `get_or_set` for options
+
+    Args:
+        timeout (int): seconds response is fresh for
+        version (Callable, optional): returns current version of the data, responses
+            cached for other versions aren't served. Defaults to None - not versioned
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = 'views.response.%s.%s' % (
+                version() if version else '',
+                hashlib.md5(request.get_full_path().encode()).hexdigest(),
+            )
+            return Response(
+                get_or_set(
+                    key,
+                    lambda: method(view, request, *args, **kwargs).data,
+                    timeout,
+                    **options,
+                )
+            )
+
+        return wrapper
+
+    return decorator
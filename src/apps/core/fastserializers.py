@@ -0,0 +1,271 @@
+"""
+Fast path serializers for hot read endpoints.
+
+`ValuesSerializer` describes output of a DRF serializer by columns of the model: rows
+are selected with `.values()`, so no model instances and serializer fields are created
+per row. Field accessors are compiled once per set of requested fields, and to-many
+relations are loaded by one query per relation for the whole page.
+
+Output must stay identical to the DRF serializer it replaces, every `ValuesSerializer`
+is covered by parity tests comparing the two.
+"""
+from collections import defaultdict
+from operator import itemgetter
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.db.models import QuerySet
+from django.db.models.constants import LOOKUP_SEP
+
+
+def _get_related_model(model, source: str):
+    for relation in source.split(LOOKUP_SEP):
+        model = model._meta.get_field(relation).related_model
+    return model
+
+
+class Column:
+    """Value of a single column, `convert` is applied to not null values only"""
+
+    def __init__(self, source: str, convert: Callable = None):
+        self.source = source
+        self.convert = convert
+
+    def get_columns(self, model, prefix: str) -> List[str]:
+        return [prefix + self.source]
+
+    def compile(self, model, prefix: str) -> Callable[[dict], object]:
+        getter = itemgetter(prefix + self.source)
+        if (convert := self.convert) is None:
+            return getter
+        return lambda row: None if (value := getter(row)) is None else convert(value)
+
+
+class Method:
+    """Value computed by `function` from values of `sources` columns"""
+
+    def __init__(self, function: Callable, *sources: str):
+        self.function = function
+        self.sources = sources
+
+    def get_columns(self, model, prefix: str) -> List[str]:
+        return [prefix + source for source in self.sources]
+
+    def compile(self, model, prefix: str) -> Callable[[dict], object]:
+        getter = itemgetter(*self.get_columns(model, prefix))
+        function = self.function
+        if len(self.sources) == 1:
+            return lambda row: function(getter(row))
+        return lambda row: function(*getter(row))
+
+
+class ImageUrls:
+    """Urls of image of `apps.core.fields.BaseImageField`, same as `urls` of its file"""
+
+    def __init__(self, source: str):
+        self.source = source
+
+    def get_columns(self, model, prefix: str) -> List[str]:
+        field = model._meta.get_field(self.source)
+        columns = [prefix + self.source]
+        if field.manifest_field:
+            columns.append(prefix + field.manifest_field)
+        return columns
+
+    def compile(self, model, prefix: str) -> Callable[[dict], object]:
+        urls = model._meta.get_field(self.source).storage.urls
+        columns = self.get_columns(model, prefix)
+        getter = itemgetter(*columns)
+        if len(columns) == 1:
+            return lambda row: urls(getter(row))
+        return lambda row: urls(*getter(row))
+
+
+class Nested:
+    """Object related by foreign key or one-to-one relation, None if there is no one"""
+
+    def __init__(self, source: str, fields: dict):
+        self.source = source
+        self.fields = fields
+
+    def get_columns(self, model, prefix: str) -> List[str]:
+        model = _get_related_model(model, self.source)
+        prefix = prefix + self.source + LOOKUP_SEP
+        columns = [prefix + 'pk']
+        for field in self.fields.values():
+            columns.extend(field.get_columns(model, prefix))
+        return columns
+
+    def compile(self, model, prefix: str) -> Callable[[dict], object]:
+        model = _get_related_model(model, self.source)
+        prefix = prefix + self.source + LOOKUP_SEP
+        get_pk = itemgetter(prefix + 'pk')
+        accessors = [
+            (name, field.compile(model, prefix)) for name, field in self.fields.items()
+        ]
+        return lambda row: (
+            None
+            if get_pk(row) is None
+            else {name: accessor(row) for name, accessor in accessors}
+        )
+
+
+class Many:
+    """
+    List of objects of to-many relation, loaded by separate query for all rows.
+    `filter` makes lookups (relative to related model) from serializer context,
+    if it returns None no objects are loaded. With `single` the first object or None
+    is returned instead of list
+    """
+
+    def __init__(
+        self,
+        source: str,
+        fields: dict,
+        filter: Callable[[dict], Optional[dict]] = None,
+        single: bool = False,
+    ):
+        self.source = source
+        self.fields = fields
+        self.filter = filter
+        self.single = single
+
+    def get_columns(self, model, prefix: str) -> List[str]:
+        # only primary key of the row is needed to load related objects
+        return [prefix + 'pk']
+
+    def compile(self, model, prefix: str) -> '_Relation':
+        return _Relation(self, model, prefix)
+
+
+class _Relation:
+    """Compiled `Many` field, loads related objects of rows before they are serialized"""
+
+    def __init__(self, field: Many, model, prefix: str):
+        self.field = field
+        self.model = model
+        self.get_pk = itemgetter(prefix + 'pk')
+        related_prefix = field.source + LOOKUP_SEP
+        self.plan = _Plan(
+            _get_related_model(model, field.source), field.fields, prefix=related_prefix
+        )
+        # related model's default ordering, as DRF serializer gets it from related manager
+        self.ordering = [
+            '-' + related_prefix + lookup[1:]
+            if lookup.startswith('-')
+            else related_prefix + lookup
+            for lookup in self.plan.model._meta.ordering
+        ]
+
+    def load(self, rows: List[dict], context: dict) -> Callable[[dict], object]:
+        pks = {pk for pk in map(self.get_pk, rows) if pk is not None}
+        lookups = {} if self.field.filter is None else self.field.filter(context)
+        objects = defaultdict(list)
+
+        if pks and lookups is not None:
+            related_pk = self.field.source + LOOKUP_SEP + 'pk'
+            queryset = (
+                self.model._base_manager.filter(
+                    pk__in=pks,
+                    **{
+                        self.field.source + LOOKUP_SEP + lookup: value
+                        for lookup, value in lookups.items()
+                    },
+                )
+                .values('pk', *self.plan.columns)
+                .order_by(*self.ordering, related_pk)
+            )
+            related_rows = [row for row in queryset if row[related_pk] is not None]
+            for pk, data in zip(
+                map(itemgetter('pk'), related_rows),
+                self.plan.serialize(related_rows, context),
+            ):
+                objects[pk].append(data)
+
+        get_pk = self.get_pk
+        if self.field.single:
+            return lambda row: next(iter(objects.get(get_pk(row), ())), None)
+        return lambda row: objects.get(get_pk(row), [])
+
+
+class _Plan:
+    """Columns and accessors of requested fields, `prefix` is lookup of rows model"""
+
+    def __init__(self, model, fields: dict, prefix: str = ''):
+        self.model = model
+        self.columns: List[str] = [prefix + 'pk']
+        self.accessors: List[Tuple[str, Callable]] = []
+        self.relations: List[Tuple[str, _Relation]] = []
+
+        for name, field in fields.items():
+            for column in field.get_columns(model, prefix):
+                if column not in self.columns:
+                    self.columns.append(column)
+
+            accessor = field.compile(model, prefix)
+            if isinstance(accessor, _Relation):
+                self.relations.append((name, accessor))
+            self.accessors.append((name, accessor))
+
+    def serialize(self, rows: List[dict], context: dict) -> List[dict]:
+        loaded = {
+            name: relation.load(rows, context) for name, relation in self.relations
+        }
+        accessors = [
+            (name, loaded.get(name, accessor)) for name, accessor in self.accessors
+        ]
+        return [{name: accessor(row) for name, accessor in accessors} for row in rows]
+
+
+class ValuesSerializer:
+    """
+    Serializer of `model` rows selected with `.values()`.
+    `fields` are output field name to `Column`, `Method`, `ImageUrls`, `Nested` or `Many`,
+    in the order of the DRF serializer's fields
+    """
+
+    def __init__(self, model, fields: dict):
+        self.model = model
+        self.fields = fields
+        self._plans: Dict[Optional[FrozenSet[str]], _Plan] = {}
+
+    def supports(self, fields: Iterable[str]) -> bool:
+        return all(field in self.fields for field in fields)
+
+    def get_plan(self, fields: Iterable[str] = None) -> _Plan:
+        """Compiled plan of requested `fields`, all fields if None"""
+        key = None if fields is None else frozenset(fields)
+
+        if (plan := self._plans.get(key)) is None:
+            plan = self._plans[key] = _Plan(
+                self.model,
+                {
+                    name: field
+                    for name, field in self.fields.items()
+                    if fields is None or name in fields
+                },
+            )
+
+        return plan
+
+    def values(
+        self,
+        queryset: QuerySet,
+        fields: Iterable[str] = None,
+        extra: Iterable[str] = (),
+    ) -> QuerySet:
+        """Queryset of rows for `to_representation`,
+        `extra` are columns needed besides the fields, e.g. by pagination"""
+        plan = self.get_plan(fields)
+        return queryset.prefetch_related(None).values(
+            *plan.columns, *(column for column in extra if column not in plan.columns)
+        )
+
+    def to_representation(
+        self, rows: Iterable[dict], fields: Iterable[str] = None, context: dict = None
+    ) -> List[dict]:
+        return self.get_plan(fields).serialize(list(rows), context or {})
+
+    def serialize(
+        self, queryset: QuerySet, fields: Iterable[str] = None, context: dict = None
+    ) -> List[dict]:
+        return self.to_representation(self.values(queryset, fields), fields, context)
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import signals
 from django.db.models.fields.files import ImageFieldFile
 
+from .storages import PROCESSING
+
 from .validators import image_validator, slug_validator
 
 
@@ -9,7 +13,19 @@ class BaseImageFieldFile(ImageFieldFile):
     def save(self, name, content, save=True):
         image_validator(content)
         name = self.field.generate_filename(self.instance, name)
-        self.name = self.storage.save(name, content)
+
+        if not self.field.manifest_field:
+            self.name = self.storage.save(name, content)
+        elif settings.IMAGES_ASYNC_PROCESSING:
+            self.name, manifest = self.storage.save_original(name, content)
+            setattr(self.instance, self.field.manifest_field, manifest)
+            # variants are processed once the instance is saved
+            self.instance.__dict__.setdefault(PROCESSING_IMAGES_ATTNAME, set()).add(
+                self.field.name
+            )
+        else:
+            self.name, manifest = self.storage.save_with_manifest(name, content)
+            setattr(self.instance, self.field.manifest_field, manifest)
 
         setattr(self.instance, self.field.name, self.name)
         self._committed = True
@@ -25,23 +41,78 @@ class BaseImageFieldFile(ImageFieldFile):
         self._require_file()
         return self.storage.url(self.name)
 
+    @property
+    def manifest(self):
+        """Manifest of image variants, see apps.core.storages.ImageStorage.save_with_manifest"""
+        if self.field.manifest_field:
+            return getattr(self.instance, self.field.manifest_field)
+        return None
+
+    @property
+    def is_processing(self) -> bool:
+        """Variants of the image are not saved yet, original is served instead"""
+        manifest = self.manifest
+        return bool(manifest) and manifest.get('status') == PROCESSING
+
     @property
     def urls(self):
         self._require_file()
-        return self.storage.urls(self.name)
+        return self.storage.urls(self.name, self.manifest)
 
     def _require_file(self):
         """Allow value being empty"""
         pass
 
 
+# instance attribute with names of image fields waiting for processing to be scheduled
+PROCESSING_IMAGES_ATTNAME = '_processing_images'
+
+
 class BaseImageField(models.ImageField):
+    """
+    Image field of ImageStorage. `manifest_field` is name of model's JSONField
+    the manifest of produced image variants is saved to, like `width_field`.
+
+    With `IMAGES_ASYNC_PROCESSING` setting only the original image is saved
+    during the request, variants are saved by celery task `process_image`
+    scheduled after the instance is saved
+    """
+
     attr_class = BaseImageFieldFile
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, manifest_field=None, **kwargs):
+        self.manifest_field = manifest_field
         kwargs.setdefault('max_length', 255)
         super().__init__(*args, **kwargs)
 
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if self.manifest_field and not cls._meta.abstract:
+            signals.post_save.connect(self.schedule_processing, sender=cls)
+
+    def schedule_processing(self, instance, **kwargs):
+        """Schedule processing of the image saved in async mode,
+        once current transaction is committed"""
+        if self.name not in instance.__dict__.get(PROCESSING_IMAGES_ATTNAME, ()):
+            return
+
+        from .tasks import process_image
+
+        instance.__dict__[PROCESSING_IMAGES_ATTNAME].discard(self.name)
+        args = (
+            instance._meta.label,
+            instance.pk,
+            self.name,
+            getattr(instance, self.attname).name,
+        )
+        transaction.on_commit(lambda: process_image.delay(*args))
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.manifest_field:
+            kwargs['manifest_field'] = self.manifest_field
+        return name, path, args, kwargs
+
 
 class SlugField(models.SlugField):
     def clean(self, value, model_instance):
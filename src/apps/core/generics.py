@@ -1,5 +1,10 @@
+from functools import lru_cache
+from typing import Optional
+
+from django.utils.translation import gettext_lazy as _
 from rest_framework import generics as rest_generics
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 
@@ -25,3 +30,102 @@ class CreateAPIView(rest_generics.CreateAPIView):
         return Response(
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
+
+
+class SparseFieldsMixin:
+    """
+    Allow client to choose serializer fields via `fields` query param,
+    either by name of the projection from `projections` or by comma separated list of fields.
+    Only relations required by chosen fields (`field_prefetches`) are prefetched.
+    Serializer must accept `fields` argument (see apps.core.serializers.DynamicFieldsSerializerMixin)
+    """
+
+    fields_query_param = 'fields'
+
+    # projection name to tuple of serializer fields
+    projections = {}
+
+    # serializer field to tuple of lookups for `prefetch_related`
+    field_prefetches = {}
+
+    def get_fields(self) -> Optional[tuple]:
+        """Returns None if all fields are requested"""
+        if not (value := self.request.query_params.get(self.fields_query_param)):
+            return None
+
+        if value in self.projections:
+            return self.projections[value]
+
+        fields = tuple(field.strip() for field in value.split(',') if field.strip())
+        available_fields = self.get_serializer_class()().fields
+        invalid_fields = [field for field in fields if field not in available_fields]
+        if invalid_fields:
+            raise ValidationError(
+                {
+                    self.fields_query_param: _('Unknown fields: %s')
+                    % ', '.join(invalid_fields)
+                }
+            )
+
+        return fields
+
+    def get_prefetches(self) -> list:
+        fields = self.get_fields()
+        prefetches = []
+        for field, lookups in self.field_prefetches.items():
+            if fields is None or field in fields:
+                for lookup in lookups:
+                    if lookup not in prefetches:
+                        prefetches.append(lookup)
+        return prefetches
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fields())
+        return super().get_serializer(*args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def _get_serializer_fields(serializer_class) -> tuple:
+    return tuple(serializer_class().fields)
+
+
+class ValuesListMixin:
+    """
+    List rows serialized by `values_serializer` (see apps.core.fastserializers.ValuesSerializer)
+    from `.values()` of the queryset, instead of model instances serialized by `serializer_class`.
+    Falls back to `serializer_class` if some of the requested fields are not supported.
+    `values_extra_columns` are columns needed besides the fields, e.g. by pagination
+    """
+
+    values_serializer = None
+    values_extra_columns = ()
+
+    def get_values_fields(self) -> Optional[tuple]:
+        """Requested fields, None if all fields are requested"""
+        return self.get_fields() if isinstance(self, SparseFieldsMixin) else None
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_values_fields()
+        if not self.values_serializer.supports(
+            _get_serializer_fields(self.get_serializer_class())
+            if fields is None
+            else fields
+        ):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.values_serializer.values(
+            self.filter_queryset(self.get_queryset()),
+            fields,
+            self.values_extra_columns,
+        )
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.values_serializer.to_representation(page, fields, context)
+            )
+
+        return Response(
+            self.values_serializer.to_representation(queryset, fields, context)
+        )
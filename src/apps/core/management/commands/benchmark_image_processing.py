@@ -0,0 +1,120 @@
+import time
+from collections import defaultdict
+from io import BytesIO
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFilter
+
+from apps.titles.storages import (
+    TitlePosterStorage,
+    TitleWallpaperMobileStorage,
+    TitleWallpaperStorage,
+)
+from apps.users.storages import UserImageStorage
+
+# storage classes with source format and size of representative uploaded images
+SOURCES = (
+    (TitlePosterStorage, 'JPEG', (1500, 2100)),
+    (TitleWallpaperStorage, 'JPEG', (3840, 2160)),
+    (TitleWallpaperStorage, 'PNG', (1920, 1080)),
+    (TitleWallpaperMobileStorage, 'JPEG', (1920, 1080)),
+    (UserImageStorage, 'JPEG', (1024, 1024)),
+    (UserImageStorage, 'PNG', (512, 512)),
+)
+
+BENCHMARK_PATH = 'benchmark/{}/image'
+
+
+def _get_source(image_format: str, size: tuple) -> ContentFile:
+    """Image with gradients, shapes and noise, so it's encoded like a real picture"""
+    width, height = size
+    image = Image.merge(
+        'RGB',
+        (
+            Image.linear_gradient('L').resize(size),
+            Image.radial_gradient('L').resize(size),
+            Image.effect_noise(size, 64),
+        ),
+    )
+    draw = ImageDraw.Draw(image)
+    for step in range(1, 10):
+        draw.ellipse(
+            (width * step // 12, height * step // 14, width * step // 8, height // 2),
+            outline=(255, 32 * step, 0),
+            width=8,
+        )
+    image = image.filter(ImageFilter.SMOOTH)
+
+    io = BytesIO()
+    image.save(io, image_format, quality=95)
+    return ContentFile(io.getvalue(), f'source.{image_format.lower()}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure time of decoding, resizing, encoding and storing variants '
+        'of representative images by every image storage class. '
+        'Variants are stored by backend of IMAGES_STORAGE setting and deleted after'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=5, help='Number of measured images'
+        )
+
+    def handle(self, *args, **options):
+        number = options['number']
+
+        for storage_class, image_format, size in SOURCES:
+            storage = storage_class()
+            content = _get_source(image_format, size)
+            name = BENCHMARK_PATH.format(storage_class.__name__)
+            variants = [
+                (variant_format, quality_label, quality, size_label)
+                for quality_label, quality in storage.qualities
+                for variant_format, _ in storage.formats
+                for size_label, _ in storage.sizes
+            ]
+            seconds = defaultdict(float)
+
+            for _ in range(number):
+                # variants are stored under the same names every time
+                storage.delete_old(name)
+
+                started = time.perf_counter()
+                image = storage.decode_image(content)
+                seconds['decode'] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                resized_images = storage.resize_image(image)
+                seconds['resize'] += time.perf_counter() - started
+
+                for variant_format, quality_label, quality, size_label in variants:
+                    started = time.perf_counter()
+                    io = storage.encode_image(
+                        resized_images[size_label], variant_format, quality
+                    )
+                    seconds['encode'] += time.perf_counter() - started
+
+                    path = storage._generate_file_name(
+                        name, variant_format, quality_label, size_label
+                    )
+                    started = time.perf_counter()
+                    storage._save(path, File(io, path))
+                    seconds['store'] += time.perf_counter() - started
+
+                for resized_image in resized_images.values():
+                    resized_image.close()
+
+            storage.delete_old(name)
+
+            self.stdout.write(
+                f'{storage_class.__name__} {image_format} {size[0]}x{size[1]}: '
+                f'decode {seconds["decode"] / number * 1e3:.1f} ms, '
+                f'resize {seconds["resize"] / number * 1e3:.1f} ms per image, '
+                f'encode {seconds["encode"] / number / len(variants) * 1e3:.1f} ms, '
+                f'store {seconds["store"] / number / len(variants) * 1e3:.1f} ms '
+                f'per variant ({len(variants)} variants)'
+            )
@@ -0,0 +1,29 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from apps.titles.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Measure time of building urls of all poster variants of a title card'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=100, help='Number of measured cards'
+        )
+
+    def handle(self, *args, **options):
+        number = options['number']
+        name = 'titles/benchmark/da39a3ee5e6b4b0d3255bfef95601890afd80709'
+
+        storage = Title._meta.get_field('poster').storage
+        boto_storage = type(storage)()
+        # urls are built by boto one by one
+        boto_storage._url_prefix = None
+
+        for label, benchmarked in (('boto', boto_storage), ('prefix', storage)):
+            # boto client and urls prefix are created by the first call
+            benchmarked.urls(name)
+            seconds = timeit.timeit(lambda: benchmarked.urls(name), number=number)
+            self.stdout.write(f'{label}: {seconds / number * 1e6:.1f} us per card')
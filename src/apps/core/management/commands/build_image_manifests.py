@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.core.fields import BaseImageField
+
+
+class Command(BaseCommand):
+    help = (
+        'Save manifests of variants of images stored before manifests were introduced'
+    )
+
+    def handle(self, *args, **options):
+        for model in apps.get_models():
+            for field in model._meta.get_fields():
+                if isinstance(field, BaseImageField) and field.manifest_field:
+                    self._build_manifests(model, field)
+
+    def _build_manifests(self, model, field):
+        rows = (
+            model._base_manager.filter(**{f'{field.manifest_field}__isnull': True})
+            .exclude(**{field.name: ''})
+            .exclude(**{f'{field.name}__isnull': True})
+            .values_list('pk', field.name)
+        )
+
+        built = 0
+        for pk, name in rows.iterator():
+            model._base_manager.filter(pk=pk).update(
+                **{field.manifest_field: field.storage.build_manifest(name)}
+            )
+            built += 1
+
+        self.stdout.write(f'{model._meta.label}.{field.name}: built {built} manifests')
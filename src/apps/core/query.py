@@ -41,3 +41,24 @@ class Rank(models.Func):
 class ArraySim(TrigramBase):
     function = 'ARR_SIM'
     output_field = models.FloatField()
+
+
+class ArrayIncrement(models.Func):
+    """
+    Add `delta` to the array's element at `index` (1-based).
+    Allows to update counters stored in array atomically,
+    e.g. `queryset.update(counters=ArrayIncrement('counters', 3))`
+    """
+
+    def __init__(self, expression, index: int, delta: int = 1, **extra):
+        super().__init__(expression, **extra)
+        self.index = int(index)
+        self.delta = int(delta)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f'({sql}[1:{self.index - 1}] || ({sql}[{self.index}] + {self.delta}) '
+            f'|| {sql}[{self.index + 1}:])',
+            params * 3,
+        )
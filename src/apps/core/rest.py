@@ -1,4 +1,15 @@
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
 from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
@@ -21,3 +32,163 @@ class Pagination(PageNumberPagination):
         if page_number == 1:
             return remove_query_param(url, self.page_query_param)
         return replace_query_param(url, self.page_query_param, page_number)
+
+
+class KeysetPagination(Pagination):
+    """
+    Page number pagination with optional keyset (cursor) mode.
+
+    Cursor mode is enabled by passing `cursor` query param (empty value for the first page).
+    In this mode there is no COUNT query and no OFFSET, next page is selected
+    by values of the ordering fields of the last row, with primary key as a tiebreaker,
+    so every page costs the same. Nulls are always placed last.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = _('Invalid cursor')
+    tiebreaker = 'pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.is_cursor = self.cursor_query_param in request.query_params
+
+        if not self.is_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self._get_ordering(request, queryset, view)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(
+            *(
+                F(field).desc(nulls_last=True)
+                if descending
+                else F(field).asc(nulls_last=True)
+                for field, descending in self.ordering
+            )
+        )
+
+        if position := self._decode_cursor(
+            request.query_params[self.cursor_query_param]
+        ):
+            queryset = queryset.filter(self._get_after_position_filter(position))
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.is_cursor:
+            return super().get_paginated_response(data)
+
+        return Response({'next': self.get_next_cursor_link(), 'results': data})
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+
+        position = [
+            self._get_value(self.page[-1], field) for field, descending in self.ordering
+        ]
+
+        return replace_query_param(
+            self.request.get_full_path(),
+            self.cursor_query_param,
+            self._encode_cursor(position),
+        )
+
+    def _get_ordering(self, request, queryset, view) -> list:
+        """
+        Get ordering from view's ordering filter backend (e.g. rest_framework.filters.OrderingFilter).
+        Returns list of (field, descending) tuples with tiebreaker as the last one
+        """
+        ordering = []
+
+        for backend in getattr(view, 'filter_backends', ()):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view) or []
+                break
+
+        ordering = [
+            (field.lstrip('-'), field.startswith('-'))
+            for field in ordering
+            if field.lstrip('-') not in (self.tiebreaker, 'id')
+        ]
+
+        return ordering + [(self.tiebreaker, False)]
+
+    def _get_after_position_filter(self, position: list) -> Q:
+        """
+        Build filter for rows placed after given position:
+        (a after A) OR (a = A AND b after B) OR (a = A AND b = B AND pk > PK) ...
+        """
+        conditions = []
+        equals = Q()
+
+        for (field, descending), value in zip(self.ordering, position):
+            if value is None:
+                # nothing is placed after nulls, so only equality is possible
+                equals &= Q(**{f'{field}__isnull': True})
+                continue
+
+            after = Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+            if field != self.tiebreaker:
+                after |= Q(**{f'{field}__isnull': True})
+
+            conditions.append(equals & after)
+            equals &= Q(**{field: value})
+
+        if not conditions:
+            # position is the very last row
+            return Q(pk__in=[])
+
+        return reduce(lambda x, y: x | y, conditions)
+
+    def _get_field(self, field: str):
+        model = self.model
+        *relations, name = field.split(LOOKUP_SEP)
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def _get_value(self, instance, field: str):
+        if isinstance(instance, dict):
+            # row of values queryset, see apps.core.generics.ValuesListMixin
+            instance = instance[field]
+            return None if instance is None else str(instance)
+
+        for attribute in field.split(LOOKUP_SEP):
+            if instance is None:
+                break
+            instance = getattr(instance, attribute)
+
+        return None if instance is None else str(instance)
+
+    def _encode_cursor(self, position: list) -> str:
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> list:
+        if not cursor:
+            return []
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError()
+
+            return [
+                None if value is None else self._get_field(field).to_python(value)
+                for (field, descending), value in zip(self.ordering, position)
+            ]
+        except (
+            binascii.Error,
+            UnicodeDecodeError,
+            TypeError,
+            ValueError,
+            DjangoValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
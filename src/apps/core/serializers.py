@@ -74,3 +74,17 @@ class CaptchaSerializerMixin(serializers.Serializer):
                         )
                     }
                 )
+
+
+class DynamicFieldsSerializerMixin:
+    """
+    Takes additional `fields` argument that controls which fields should be displayed.
+    If `fields` is None all serializer fields are displayed
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
@@ -1,14 +1,24 @@
 import logging
+import time
 from pprint import pformat
+from typing import Iterator, Tuple
 
 import requests
+from django.apps import apps
 from django.conf import settings
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ValidationError
 from rest_framework.settings import api_settings
 
+from .storages import PROCESSING
+
 logger = logging.getLogger(__name__)
 
+# images processed for longer than this (in seconds) are queued again,
+# should be longer than processing with all retries takes
+PROCESSING_TIMEOUT = 60 * 60  # 1 hour
+
 
 def google_captcha_verify(captcha: str):
     """Captcha verification method
@@ -69,3 +79,71 @@ def google_captcha_default_verification(captcha: str):
                 )
             }
         )
+
+
+def process_image(model, pk, field_name: str, name: str) -> bool:
+    """Save variants and manifest of image saved in async mode (see apps.core.fields.BaseImageField).
+    Returns False if the image was replaced or deleted before it was processed"""
+    field = model._meta.get_field(field_name)
+    manifest = (
+        model._base_manager.filter(pk=pk, **{field.attname: name})
+        .values_list(field.manifest_field, flat=True)
+        .first()
+    )
+    if not manifest or manifest.get('status') != PROCESSING:
+        return False
+
+    manifest = field.storage.process(manifest)
+
+    with transaction.atomic():
+        instance = (
+            model._base_manager.select_for_update()
+            .filter(pk=pk, **{field.attname: name})
+            .first()
+        )
+        if instance is None:
+            return False
+
+        setattr(instance, field.manifest_field, manifest)
+        # saved with signals, so e.g. cached responses with the image are invalidated
+        instance.save(update_fields=[field.manifest_field])
+
+    return True
+
+
+def _get_processed_image_fields() -> Iterator[Tuple[type, models.Field]]:
+    """Image fields of all models saving manifest of variants"""
+    from .fields import BaseImageField
+
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, BaseImageField) and field.manifest_field:
+                yield model, field
+
+
+def requeue_processing_images() -> int:
+    """
+    Queue again processing of images processed for longer than `PROCESSING_TIMEOUT`,
+    e.g. when all retries of the task failed or the task was lost.
+    Returns number of queued images
+    """
+    from .tasks import process_image
+
+    queued = 0
+    now = time.time()
+
+    for model, field in _get_processed_image_fields():
+        for pk, name, manifest in model._base_manager.filter(
+            **{f'{field.manifest_field}__status': PROCESSING}
+        ).values_list('pk', field.attname, field.manifest_field):
+            if manifest.get('queued', 0) > now - PROCESSING_TIMEOUT:
+                continue
+
+            # queued again only if the image wasn't replaced meanwhile
+            if model._base_manager.filter(
+                pk=pk, **{field.attname: name, field.manifest_field: manifest}
+            ).update(**{field.manifest_field: {**manifest, 'queued': now}}):
+                process_image.delay(model._meta.label, pk, field.name, name)
+                queued += 1
+
+    return queued
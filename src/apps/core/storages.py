@@ -1,15 +1,41 @@
+import abc
 import hashlib
+import math
 import os
 import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from io import BytesIO
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
 
+from django.conf import settings
 from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
 from PIL import Image
 
 from storages.backends.s3boto3 import S3Boto3Storage
 
 
-class ImageStorage(S3Boto3Storage):
+# name of file whose url is split into prefix of all urls, see `ImageStorage._url_prefix`
+URL_PREFIX_NAME = 'url-prefix'
+
+# sources of resizing are kept at least this times bigger than the resized images
+REDUCING_GAP = 2
+
+# status of manifest of image whose variants are not saved yet, see `ImageStorage.process`
+PROCESSING = 'processing'
+
+
+class BaseImageStorage(abc.ABC):
+    """
+    Saving of images together with their variants, by format, quality and size,
+    and building of their urls. Files are stored by storage backend it's mixed with,
+    see `S3ImageStorage` and `FileSystemImageStorage`
+    """
+
     # heights of image variants to save
     sizes = (
         ('small', 100),
@@ -31,6 +57,9 @@ class ImageStorage(S3Boto3Storage):
 
     original_suffix = 'original'
 
+    # number of threads encoding and uploading variants of an image concurrently
+    workers = 4
+
     def __init__(self, *args, **kwargs):
         default_format, default_quality, default_size = self.default
 
@@ -50,6 +79,66 @@ class ImageStorage(S3Boto3Storage):
         super().__init__(*args, **kwargs)
 
     def save(self, name, content):
+        return self.save_with_manifest(name, content)[0]
+
+    def save_with_manifest(self, name, content) -> Tuple[str, dict]:
+        """
+        Save original image and its variants.
+        Returns stored name and manifest of produced variants (see `urls`):
+        {
+            'name': stored name,
+            'original': [width, height, bytes],
+            'variants': [[format, quality, size, extension, width, height, bytes], ...],
+        }
+        """
+        hashed_path, original = self._save_original(name, content)
+
+        return (
+            hashed_path,
+            {
+                'name': hashed_path,
+                'original': original,
+                'variants': self._save_variants(hashed_path, content),
+            },
+        )
+
+    def save_original(self, name, content) -> Tuple[str, dict]:
+        """
+        Save only original image, its variants are saved later by `process`.
+        Returns stored name and manifest of image being processed, without variants,
+        'queued' is timestamp processing was queued at
+        """
+        hashed_path, original = self._save_original(name, content)
+
+        return (
+            hashed_path,
+            {
+                'name': hashed_path,
+                'status': PROCESSING,
+                'queued': time.time(),
+                'original': original,
+                'variants': [],
+            },
+        )
+
+    def process(self, manifest: dict) -> dict:
+        """Save variants of image saved by `save_original`, returns its full manifest"""
+        filepath = manifest['name']
+
+        with self.open(f'{filepath}.{self.original_suffix}') as content:
+            variants = self._save_variants(filepath, content)
+
+        return {
+            'name': filepath,
+            'original': manifest['original'],
+            'variants': variants,
+        }
+
+    def _save_original(self, name, content) -> Tuple[str, list]:
+        """
+        Save original image under new hashed name.
+        Returns the name and [width, height, bytes] of the image
+        """
 
         # Generate hash for filename
         hashing = hashlib.sha1()
@@ -63,90 +152,185 @@ class ImageStorage(S3Boto3Storage):
         # open original
         original_image = Image.open(content)
         original_image.verify()
-        original_image = Image.open(content)
-
-        original_name = f'{hashed_path}.{self.original_suffix}'
+        with Image.open(content) as original_image:
+            original = [*original_image.size, content.size]
 
         # Delete old images
         self.delete_old(name)
 
-        for quality_label, quality in self.qualities:
-            for image_format, extension in self.formats:
-
-                new_image = original_image.copy()
+        # Save original image
+        self._save(f'{hashed_path}.{self.original_suffix}', content)
 
-                if new_image.mode != 'RGB':
-                    # Convert image to rgb mode if it isn't
-                    new_image = new_image.convert('RGB')
+        return hashed_path, original
 
-                for size_label, size in self.sizes:
-                    # New image pull path with specific format, size and quality
-                    new_image_path = self._generate_file_name(
-                        hashed_path, image_format, quality_label, size_label
-                    )
+    def _save_variants(self, filepath: str, content) -> list:
+        """
+        Save variants of original image `content`, returns them as in manifest.
+        Variants are encoded and uploaded by `workers` threads, if any of them fails
+        already saved variants are deleted and the error is raised
+        """
+        resized_images = self.get_resized_images(content)
+        variants = [
+            (image_format, quality_label, quality, size_label, extension)
+            for quality_label, quality in self.qualities
+            for image_format, extension in self.formats
+            for size_label, _ in self.sizes
+        ]
+        paths = [
+            self._generate_file_name(filepath, image_format, quality_label, size_label)
+            for image_format, quality_label, _, size_label, _ in variants
+        ]
+
+        self._prepare_workers()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                # Image.save keeps encoder options on the image, so every thread
+                # encodes its own copy
+                executor.submit(
+                    self._save_image,
+                    path,
+                    resized_images[size_label].copy(),
+                    image_format,
+                    quality,
+                )
+                for path, (image_format, _, quality, size_label, _) in zip(
+                    paths, variants
+                )
+            ]
+            _, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in not_done:
+                future.cancel()
+
+        for resized_image in resized_images.values():
+            resized_image.close()
+
+        errors = [future.exception() for future in futures if not future.cancelled()]
+        if any(errors):
+            # variants are saved all or nothing
+            for path, future in zip(paths, futures):
+                if not future.cancelled():
+                    self.delete(path)
+            raise next(error for error in errors if error)
+
+        return [
+            [
+                image_format,
+                quality_label,
+                size_label,
+                extension,
+                *resized_images[size_label].size,
+                future.result(),
+            ]
+            for (image_format, quality_label, _, size_label, extension), future in zip(
+                variants, futures
+            )
+        ]
 
-                    # Resize image
-                    resized_image = self._resized_image(new_image, size, size_label)
+    def get_resized_images(self, content) -> Dict[str, Image.Image]:
+        """
+        Decode original image `content` once and resize it to every size, returns images
+        by size label. Sizes are resized from the biggest to the smallest: big source
+        is decoded in reduced scale (JPEG draft mode) or reduced by integer factor,
+        and the reduced image is the source of smaller sizes too,
+        while it stays `REDUCING_GAP` times bigger than the size
+        """
+        return self.resize_image(self.decode_image(content))
+
+    def decode_image(self, content) -> Image.Image:
+        """Decode original image `content` in RGB mode, see `get_resized_images`"""
+        content.seek(0)
+        image = Image.open(content)
+
+        # JPEG is decoded right in the scale enough for the biggest size
+        scale = max(self._get_scale(image.size, *size) for size in self.sizes)
+        image.draft(
+            'RGB',
+            (
+                math.ceil(image.width * scale * REDUCING_GAP),
+                math.ceil(image.height * scale * REDUCING_GAP),
+            ),
+        )
+
+        if image.mode != 'RGB':
+            # Convert image to rgb mode if it isn't
+            image = image.convert('RGB')
+
+        image.load()
+        return image
+
+    def resize_image(self, image: Image.Image) -> Dict[str, Image.Image]:
+        """Resize decoded `image` to every size and close it, see `get_resized_images`"""
+        resized_images = {}
+
+        for size_label, size in sorted(
+            self.sizes, key=lambda size: size[1], reverse=True
+        ):
+            factor = int(
+                1 / (self._get_scale(image.size, size_label, size) * REDUCING_GAP)
+            )
+            if factor >= 2:
+                image = image.reduce(factor)
 
-                    # Save image
-                    self._save_image(
-                        new_image_path, resized_image, image_format, quality
-                    )
-                    resized_image.close()
-                new_image.close()
+            resized_images[size_label] = self._resized_image(image, size, size_label)
 
-        # Save original image
-        self._save(original_name, content)
+        image.close()
 
-        original_image.close()
+        return resized_images
 
-        return hashed_path
+    @staticmethod
+    def encode_image(image: Image.Image, image_format: str, quality: int) -> BytesIO:
+        io = BytesIO()
+        image.save(io, image_format, optimize=True, quality=quality)
+        return io
 
     def _save_image(
         self, path: str, image: Image.Image, image_format: str, quality: int
-    ):
-        io = BytesIO()
-        image.save(io, image_format, optimize=True, quality=quality)
+    ) -> int:
+        """Returns size of saved image in bytes"""
+        io = self.encode_image(image, image_format, quality)
+        size_bytes = io.tell()
         self._save(path, File(io, path))
         io.close()
+        return size_bytes
 
     @classmethod
     def _resized_image(
         cls, original_image: Image.Image, new_height: int, size_label: str
     ) -> Image.Image:
-        orig_width, orig_height = original_image.size
+        """Crop image to aspect ratio of the size and resize it, in a single resampling"""
+        box, size = cls._get_crop_box(original_image.size, new_height, size_label)
+        return original_image.resize(size, Image.LANCZOS, box=box)
 
-        height = int(new_height)
-        width = int(orig_width * height / orig_height)
+    @classmethod
+    def _get_crop_box(
+        cls, image_size: Tuple[int, int], new_height: int, size_label: str
+    ) -> Tuple[Tuple[float, float, float, float], Tuple[int, int]]:
+        """
+        Part of the image to resize to the size and the size itself. If the image is wider
+        than the size it's cropped at the center, else it's cropped at the top
+        """
+        orig_width, orig_height = image_size
 
-        # resize image saving the original aspect ratio
-        resized_image = original_image.resize((width, height), Image.ANTIALIAS)
+        height = int(new_height)
         required_width = int(height / cls._get_ratio(size_label))
 
-        # difference between desired width and actual width
-        diff_width = width - required_width
+        if orig_width * height >= required_width * orig_height:
+            box_width = orig_height * required_width / height
+            left = (orig_width - box_width) / 2
+            box = (left, 0, left + box_width, orig_height)
+        else:
+            box = (0, 0, orig_width, orig_width * height / required_width)
 
-        # if actual width is bigger than desired, just crop to fit that width, else crop and resize to fit desired width
-        if diff_width >= 0:
-            box_width = int((diff_width) / 2)
+        return box, (required_width, height)
 
-            box = (
-                box_width,
-                0,
-                required_width + box_width,
-                height,
-            )
-            return resized_image.crop(box)
-        else:
-            box = (
-                0,
-                0,
-                width,
-                height - int(abs(diff_width * cls._get_ratio(size_label))),
-            )
-            return resized_image.crop(box).resize(
-                (required_width, height), Image.ANTIALIAS
-            )
+    @classmethod
+    def _get_scale(
+        cls, image_size: Tuple[int, int], size_label: str, new_height: int
+    ) -> float:
+        """Scale of the image resized to the size"""
+        box, (width, height) = cls._get_crop_box(image_size, new_height, size_label)
+        return height / (box[3] - box[1])
 
     @classmethod
     def _get_ratio(cls, size_label: str) -> int:
@@ -159,32 +343,179 @@ class ImageStorage(S3Boto3Storage):
         self, base_path: str, image_format: str, quality: str, size: str
     ):
         extension = dict(self.formats).get(image_format)
-        return f'{base_path}_{quality}_{size}.{extension}'
+        return base_path + self._get_variant_suffix(quality, size, extension)
+
+    @staticmethod
+    def _get_variant_suffix(quality: str, size: str, extension: str) -> str:
+        return f'_{quality}_{size}.{extension}'
+
+    @cached_property
+    def _url_prefix(self) -> Optional[str]:
+        """
+        Part of urls before the file name (custom domain or bucket url and location),
+        computed by boto once, so urls of all variants are built by string concatenation.
+        None if urls are signed and every one of them has to be built by boto
+        """
+        if getattr(self, 'querystring_auth', False):
+            return None
+
+        prefix, name, rest = super().url(URL_PREFIX_NAME).rpartition(URL_PREFIX_NAME)
+        return prefix if name and not rest else None
+
+    @cached_property
+    def _url_suffixes(self) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """Suffixes of variants names by format, quality and size"""
+        return {
+            image_format: {
+                quality_label: {
+                    size_label: self._generate_file_name(
+                        '', image_format, quality_label, size_label
+                    )
+                    for size_label, _ in self.sizes
+                }
+                for quality_label, _ in self.qualities
+            }
+            for image_format, _ in self.formats
+        }
+
+    @abc.abstractmethod
+    def _quote_name(self, name: str) -> str:
+        """Name quoted the same way as in urls of storage backend"""
 
     def url(self, filepath: str) -> str:
-        return super().url(f'{filepath}.{self.original_suffix}')
+        name = f'{filepath}.{self.original_suffix}'
+
+        if self._url_prefix is None:
+            return super().url(name)
+        return self._url_prefix + self._quote_name(name)
 
-    def urls(self, filepath: str) -> dict:
+    def urls(self, filepath: str, manifest: dict = None) -> dict:
+        """
+        Urls of original image and its variants by format, quality and size.
+        If `manifest` of the image is passed, only variants it has are served,
+        together with their dimensions and sizes in bytes under 'variants' key.
+        While variants are being processed, original is served in their place
+        and 'processing' key is set
+        """
 
         if not filepath:
             return None
 
-        url_set = {'original': self.url(filepath)}
+        if self._url_prefix is None:
+
+            def get_url(suffix):
+                return super(BaseImageStorage, self).url(filepath + suffix)
+
+        else:
+            get_url = (self._url_prefix + self._quote_name(filepath)).__add__
+
+        url_set = {'original': get_url(f'.{self.original_suffix}')}
+
+        if manifest and manifest['name'] == filepath:
+            if manifest.get('status') == PROCESSING:
+                # original is served in place of variants until they are saved
+                url_set['processing'] = True
+                original_url = url_set['original']
+
+                def get_url(suffix):
+                    return original_url
+
+            else:
+                return self._get_manifest_urls(url_set, get_url, manifest)
 
-        for image_format, _ in self.formats:
-            if image_format not in url_set:
-                url_set[image_format] = {}
+        for image_format, qualities in self._url_suffixes.items():
+            url_set[image_format] = {
+                quality_label: {
+                    size_label: get_url(suffix) for size_label, suffix in sizes.items()
+                }
+                for quality_label, sizes in qualities.items()
+            }
+
+        return url_set
+
+    @classmethod
+    def _get_manifest_urls(cls, url_set: dict, get_url, manifest: dict) -> dict:
+        variants = []
+
+        for (
+            image_format,
+            quality_label,
+            size_label,
+            extension,
+            width,
+            height,
+            size_bytes,
+        ) in manifest['variants']:
+            url = get_url(cls._get_variant_suffix(quality_label, size_label, extension))
+            url_set.setdefault(image_format, {}).setdefault(quality_label, {})[
+                size_label
+            ] = url
+            variants.append(
+                {
+                    'url': url,
+                    'format': image_format,
+                    'quality': quality_label,
+                    'size': size_label,
+                    'width': width,
+                    'height': height,
+                    'bytes': size_bytes,
+                }
+            )
+
+        url_set['variants'] = variants
+        return url_set
+
+    def build_manifest(self, filepath: str) -> dict:
+        """Manifest of already stored image, for images saved without it.
+        Variants are looked up by current formats, qualities and sizes"""
+        manifest = {'name': filepath, 'original': None, 'variants': []}
+
+        if self.exists(original_name := f'{filepath}.{self.original_suffix}'):
+            manifest['original'] = self._get_stored_image_info(original_name)
+
+        for image_format, extension in self.formats:
             for quality_label, _ in self.qualities:
-                if quality_label not in url_set[image_format]:
-                    url_set[image_format][quality_label] = {}
                 for size_label, _ in self.sizes:
-                    url_set[image_format][quality_label][size_label] = super().url(
-                        self._generate_file_name(
-                            filepath, image_format, quality_label, size_label
-                        )
+                    name = self._generate_file_name(
+                        filepath, image_format, quality_label, size_label
                     )
+                    if self.exists(name):
+                        manifest['variants'].append(
+                            [
+                                image_format,
+                                quality_label,
+                                size_label,
+                                extension,
+                                *self._get_stored_image_info(name),
+                            ]
+                        )
+
+        return manifest
+
+    def _get_stored_image_info(self, name: str) -> list:
+        """Width, height and size in bytes of stored image"""
+        with self.open(name) as file, Image.open(file) as image:
+            return [*image.size, file.size]
+
+    def _prepare_workers(self):
+        """Called before variants are saved by worker threads"""
+
+    @abc.abstractmethod
+    def delete_old(self, old):
+        """
+        Delete old files
+        """
 
-        return url_set
+
+class S3ImageStorage(BaseImageStorage, S3Boto3Storage):
+    def _quote_name(self, name: str) -> str:
+        # quoted the same way as boto and S3Boto3Storage quote names in urls
+        name = self._clean_name(name)
+        return filepath_to_uri(name) if self.custom_domain else quote(name, safe='/~')
+
+    def _prepare_workers(self):
+        # boto3 resource is created once here, not by every thread
+        self.bucket
 
     def delete_old(self, old):
         """
@@ -192,3 +523,26 @@ class ImageStorage(S3Boto3Storage):
         """
         folder = os.path.split(old)[0]
         self.bucket.objects.filter(Prefix=f'{folder}/').delete()
+
+
+class FileSystemImageStorage(BaseImageStorage, FileSystemStorage):
+    """Images stored in `MEDIA_ROOT`, e.g. for local development and benchmarks"""
+
+    def _quote_name(self, name: str) -> str:
+        # quoted the same way as FileSystemStorage quotes names in urls
+        return filepath_to_uri(name).lstrip('/')
+
+    def delete_old(self, old):
+        """
+        Delete old files
+        """
+        folder = os.path.split(old)[0]
+        if not self.exists(folder):
+            return
+
+        for name in self.listdir(folder)[1]:
+            self.delete(os.path.join(folder, name))
+
+
+# storage backend of images, selected by `IMAGES_STORAGE` setting
+ImageStorage = import_string(settings.IMAGES_STORAGE)
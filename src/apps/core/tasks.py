@@ -0,0 +1,39 @@
+import logging
+
+from celery import shared_task
+from django.apps import apps
+
+from . import services
+
+logger = logging.getLogger(__name__)
+
+
+# failed processing is retried in 10, 20, 40, 80 and 160 seconds,
+# images whose processing failed anyway are queued again by `requeue_processing_images`
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=10,
+    retry_backoff_max=60 * 10,
+    retry_jitter=False,
+    max_retries=5,
+)
+def process_image(model: str, pk, field: str, name: str):
+    logger.info('Processing image %s of %s %s', name, model, pk)
+    try:
+        if services.process_image(apps.get_model(model), pk, field, name):
+            logger.info('Successfully processed image %s', name)
+        else:
+            logger.info('Image %s was replaced before it was processed', name)
+    except Exception as ex:
+        logger.exception(ex)
+        raise
+
+
+@shared_task
+def requeue_processing_images():
+    logger.info('Requeueing stale processing images')
+    try:
+        queued = services.requeue_processing_images()
+        logger.info('Successfully requeued %s processing images', queued)
+    except Exception as ex:
+        logger.exception(ex)
@@ -0,0 +1,282 @@
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class StaleWhileRevalidateCacheTest(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def test_get_or_set(self):
+        from django.core.cache import cache
+
+        from apps.core.cache import LOCK_CACHE_KEY, get_or_set
+
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return len(computed)
+
+        self.assertEqual(get_or_set('key', compute, 60, beta=0), 1)
+        self.assertEqual(get_or_set('key', compute, 60, beta=0), 1)
+
+        # stale value is served while another process recomputes it
+        value, expires, delta = cache.get('key')
+        cache.set('key', (value, expires - 120, delta))
+        cache.add(LOCK_CACHE_KEY % 'key', True)
+        self.assertEqual(get_or_set('key', compute, 60, beta=0), 1)
+
+        cache.delete(LOCK_CACHE_KEY % 'key')
+        self.assertEqual(get_or_set('key', compute, 60, beta=0), 2)
+        self.assertEqual(get_or_set('key', compute, 60, beta=0), 2)
+
+    def test_cached(self):
+        from apps.core.cache import cached
+
+        calls = []
+
+        @cached(lambda number: f'numbers.{number}', 60)
+        def double(number):
+            calls.append(number)
+            return number * 2
+
+        self.assertEqual([double(1), double(1), double(2)], [2, 2, 4])
+        self.assertEqual(calls, [1, 2])
+
+    def test_cache_response(self):
+        from django.test import RequestFactory
+        from rest_framework.response import Response
+
+        from apps.core.cache import cache_response
+
+        calls = []
+        versions = [1]
+
+        @cache_response(60, version=lambda: versions[0])
+        def get(view, request):
+            calls.append(request.path)
+            return Response(len(calls))
+
+        request = RequestFactory().get('/list/')
+        self.assertEqual([get(None, request).data for _ in range(2)], [1, 1])
+
+        # response cached for previous version isn't served
+        versions[0] = 2
+        self.assertEqual([get(None, request).data for _ in range(2)], [2, 2])
+
+
+class ImageStorageUrlsTest(SimpleTestCase):
+    def test_urls(self):
+        from apps.core.storages import S3ImageStorage
+
+        name = 'user/ab cd/da39a3ee5e6b4b0d3255bfef95601890afd80709'
+
+        for options in (
+            {},
+            {'custom_domain': 'cdn.example.com'},
+            {'location': 'media'},
+        ):
+            storage = S3ImageStorage(**options)
+            boto_storage = S3ImageStorage(**options)
+            # urls are built by boto one by one
+            boto_storage._url_prefix = None
+
+            self.assertIsNotNone(storage._url_prefix)
+            self.assertEqual(storage.urls(name), boto_storage.urls(name))
+            self.assertEqual(storage.url(name), boto_storage.url(name))
+
+        self.assertIsNone(S3ImageStorage(querystring_auth=True)._url_prefix)
+
+    def _get_storage(self):
+        from django.core.files.base import ContentFile
+
+        from apps.core.storages import S3ImageStorage
+
+        class MemoryImageStorage(S3ImageStorage):
+            files = {}
+            failing = None
+
+            def _save(self, name, content):
+                if name == self.failing:
+                    raise OSError(name)
+                content.seek(0)
+                self.files[name] = content.read()
+                return name
+
+            def _open(self, name, mode='rb'):
+                return ContentFile(self.files[name], name)
+
+            def delete(self, name):
+                self.files.pop(name, None)
+
+            def delete_old(self, old):
+                pass
+
+        return MemoryImageStorage()
+
+    def _get_image(self):
+        from io import BytesIO
+
+        from django.core.files.base import ContentFile
+        from PIL import Image
+
+        io = BytesIO()
+        Image.new('RGB', (400, 600)).save(io, 'png')
+        return ContentFile(io.getvalue())
+
+    def test_manifest_urls(self):
+        storage = self._get_storage()
+        name, manifest = storage.save_with_manifest(
+            'titles/poster.png', self._get_image()
+        )
+
+        self.assertEqual(manifest['original'][:2], [400, 600])
+        self.assertEqual(len(manifest['variants']), 12)
+
+        urls = storage.urls(name, manifest)
+        variants = urls.pop('variants')
+        self.assertEqual(urls, storage.urls(name))
+        self.assertEqual(
+            [variant['height'] for variant in variants if variant['size'] == 'big'],
+            [500] * 4,
+        )
+
+        # variants of the manifest are served after storage's variants are changed
+        storage.sizes = (('small', 100),)
+        del storage._url_suffixes
+        self.assertEqual(len(storage.urls(name, manifest)['jpeg']['1x']), 3)
+        self.assertEqual(len(storage.urls(name)['jpeg']['1x']), 1)
+
+    def test_processing(self):
+        storage = self._get_storage()
+        name, manifest = storage.save_original('titles/poster.png', self._get_image())
+
+        self.assertEqual(manifest['variants'], [])
+        urls = storage.urls(name, manifest)
+        self.assertTrue(urls['processing'])
+        self.assertEqual(urls['jpeg']['2x']['big'], urls['original'])
+
+        manifest = storage.process(manifest)
+        self.assertEqual(len(manifest['variants']), 12)
+        self.assertNotIn('processing', storage.urls(name, manifest))
+
+    def test_variants_encoding(self):
+        from io import BytesIO
+
+        from django.core.files.base import ContentFile
+        from PIL import Image
+
+        storage = self._get_storage()
+        storage.workers = 4
+        io = BytesIO()
+        Image.effect_noise((400, 600), 64).convert('RGB').save(io, 'png')
+        name, manifest = storage.save_with_manifest(
+            'titles/poster.png', ContentFile(io.getvalue())
+        )
+
+        # every variant is encoded with its own format and quality
+        resized_images = storage.get_resized_images(ContentFile(io.getvalue()))
+        for (
+            image_format,
+            quality_label,
+            size_label,
+            extension,
+            *_,
+            size_bytes,
+        ) in manifest['variants']:
+            encoded = storage.encode_image(
+                resized_images[size_label],
+                image_format,
+                dict(storage.qualities)[quality_label],
+            ).getvalue()
+            self.assertEqual(
+                storage.files[
+                    name
+                    + storage._get_variant_suffix(quality_label, size_label, extension)
+                ],
+                encoded,
+            )
+            self.assertEqual(size_bytes, len(encoded))
+
+    def test_resized_images(self):
+        from io import BytesIO
+
+        from PIL import Image
+
+        storage = self._get_storage()
+        type(storage).ratio = 0.5
+
+        # big jpeg is decoded in reduced scale, wide image is cropped at the center
+        io = BytesIO()
+        Image.new('RGB', (4000, 1000), 'red').save(io, 'jpeg')
+        images = storage.get_resized_images(io)
+        self.assertEqual(
+            {label: image.size for label, image in images.items()},
+            {'small': (200, 100), 'medium': (600, 300), 'big': (1000, 500)},
+        )
+
+        # narrow image is cropped at the top
+        images = storage.get_resized_images(self._get_image())
+        self.assertEqual(images['big'].size, (1000, 500))
+
+    def test_variants_failure(self):
+        storage = self._get_storage()
+        name, manifest = storage.save_original('titles/poster.png', self._get_image())
+        storage.failing = name + storage._get_variant_suffix('1x', 'medium', 'jpg')
+
+        # variants saved by other threads are deleted
+        with self.assertRaises(OSError):
+            storage.process(manifest)
+        self.assertEqual(list(storage.files), [f'{name}.{storage.original_suffix}'])
+
+        storage.failing = None
+        self.assertEqual(len(storage.process(manifest)['variants']), 12)
+        self.assertEqual(len(storage.files), 13)
+
+
+class FileSystemImageStorageTest(SimpleTestCase):
+    def test_save(self):
+        import os
+        from io import BytesIO
+        from tempfile import TemporaryDirectory
+
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import FileSystemStorage
+        from PIL import Image
+
+        from apps.core.storages import FileSystemImageStorage
+
+        io = BytesIO()
+        Image.new('RGB', (400, 600)).save(io, 'jpeg')
+
+        with TemporaryDirectory() as location:
+            storage = FileSystemImageStorage(location=location, base_url='/uploads/')
+            name, manifest = storage.save_with_manifest(
+                'title/ab cd/poster.jpg', ContentFile(io.getvalue())
+            )
+
+            self.assertEqual(len(os.listdir(os.path.join(location, 'title/ab cd'))), 13)
+            self.assertEqual(
+                sorted(storage.build_manifest(name)['variants']),
+                sorted(manifest['variants']),
+            )
+
+            urls = storage.urls(name, manifest)
+            self.assertEqual(urls['original'], storage.url(name))
+            # urls are the same as FileSystemStorage builds
+            self.assertEqual(
+                urls['jpeg']['2x']['big'],
+                FileSystemStorage.url(storage, f'{name}_2x_big.jpg'),
+            )
+            self.assertTrue(urls['original'].startswith('/uploads/title/ab%20cd/'))
+
+            # old images are deleted by the next saved one
+            storage.save_with_manifest(
+                'title/ab cd/poster.jpg', ContentFile(io.getvalue())
+            )
+            self.assertFalse(storage.exists(f'{name}.{storage.original_suffix}'))
+            self.assertEqual(len(os.listdir(os.path.join(location, 'title/ab cd'))), 13)
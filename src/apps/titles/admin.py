@@ -7,19 +7,31 @@ from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from nested_admin import NestedTabularInline
 
+from apps.api import home
 from apps.core.fields import BaseImageField
 from apps.core.widgets import AdminImageWidget
 
-from . import forms
+from . import autocomplete, facets, forms, versions
 from .models import Title, WatchOrderItem, WatchOrderList
 
 
 def turn_on(modeladmin, request, queryset):
+    title_ids = list(queryset.values_list('pk', flat=True))
     queryset.update(inner_status=Title.INNER_STATUSES.on)
+    facets.schedule_update()
+    autocomplete.schedule_update(title_ids)
+    versions.bump_versions(title_ids, search=True, updates=True)
+    home.schedule_update()
 
 
 def turn_off(modeladmin, request, queryset):
+    title_ids = list(queryset.values_list('pk', flat=True))
+    slugs = list(queryset.values_list('slug', flat=True))
     queryset.update(inner_status=Title.INNER_STATUSES.off, slug='')
+    facets.schedule_update()
+    autocomplete.schedule_update(title_ids)
+    versions.bump_versions(title_ids, slugs, search=True, updates=True)
+    home.schedule_update()
 
 
 class TitleAutocompleteView(AutocompleteJsonView):
@@ -142,9 +154,12 @@ class TitleAdmin(admin.ModelAdmin):
         fields = [
             'rating_total',
             'rating_average',
+            'rating_histogram',
             'views_total',
             'rank',
             'rank_previous',
+            'last_episode',
+            'last_episode_date',
         ]
         for field in fields:
             result += f'<tr><td>{title.relevant_data._meta.get_field(field).verbose_name}</td><td>{getattr(title.relevant_data, field)}</td><tr>'
@@ -0,0 +1,243 @@
+"""
+In-process trigram search engine for autocomplete.
+
+Names, other names, characters and tags of enabled titles are split into trigrams
+the same way pg_trgm does it and stored in an inverted index (trigram to documents),
+so a lookup is a couple of dict lookups and vectorized counting, without touching the database.
+Similarity is pg_trgm's `similarity()`: number of shared trigrams divided by number
+of trigrams in both texts, title's similarity is the best similarity of it's texts.
+
+Every worker keeps its own copy of the index in memory. Changed titles are published
+to cache under increasing versions, workers apply them incrementally,
+full index is rebuilt by celery task.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Title
+
+AUTOCOMPLETE_INDEX_CACHE_KEY = 'titles.autocomplete.index'
+AUTOCOMPLETE_VERSION_CACHE_KEY = 'titles.autocomplete.version'
+AUTOCOMPLETE_CHANGES_CACHE_KEY = 'titles.autocomplete.changes.%s'
+AUTOCOMPLETE_CHANGES_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+
+# same as default pg_trgm.similarity_threshold
+SIMILARITY_THRESHOLD = 0.3
+
+_words_regex = re.compile(r'[^\W_]+')
+
+_index = None
+_index_checked = 0
+_lock = threading.Lock()
+
+
+def get_trigrams(text: str) -> Set[str]:
+    """Trigrams of the text as pg_trgm makes them: every word is lowercased
+    and padded with two spaces in front and one space at the end"""
+    trigrams = set()
+    for word in _words_regex.findall(text.lower()):
+        word = f'  {word} '
+        trigrams.update(word[i : i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def _get_titles():
+    return Title.objects.enabled().only(
+        'name',
+        'slug',
+        'poster',
+        'year',
+        'type',
+        'status',
+        'other_names',
+        'characters',
+        'tags',
+    )
+
+
+class SearchIndex:
+    def __init__(self, version: int):
+        self.version = version
+        # title id to serialized title
+        self.titles: Dict[int, dict] = {}
+        # title id to ids of it's documents
+        self.titles_documents: Dict[int, List[int]] = {}
+        # document id to title id and number of trigrams, 0 trigrams for removed documents
+        self.documents_titles = np.zeros(0, dtype=np.uint32)
+        self.documents_sizes = np.zeros(0, dtype=np.int32)
+        # trigram to ids of documents having it
+        self.postings: Dict[str, np.ndarray] = {}
+        self.removed = 0
+
+    @classmethod
+    def build(cls, version: int) -> 'SearchIndex':
+        index = cls(version)
+        index._add(_get_titles().order_by('pk'))
+        return index
+
+    def _add(self, titles: Iterable[Title]):
+        from .serializers import SearchTitleSerializer
+        from .services import get_search_documents
+
+        documents_titles, documents_sizes = [], []
+        postings = defaultdict(list)
+
+        for title in titles:
+            self.titles[title.pk] = dict(SearchTitleSerializer(title).data)
+            self.titles_documents[title.pk] = []
+
+            for kind, text in get_search_documents(title):
+                document = len(self.documents_sizes) + len(documents_sizes)
+                trigrams = get_trigrams(text)
+
+                self.titles_documents[title.pk].append(document)
+                documents_titles.append(title.pk)
+                documents_sizes.append(len(trigrams))
+
+                for trigram in trigrams:
+                    postings[trigram].append(document)
+
+        self.documents_titles = np.concatenate(
+            (self.documents_titles, np.array(documents_titles, dtype=np.uint32))
+        )
+        self.documents_sizes = np.concatenate(
+            (self.documents_sizes, np.array(documents_sizes, dtype=np.int32))
+        )
+        for trigram, documents in postings.items():
+            documents = np.array(documents, dtype=np.uint32)
+            if trigram in self.postings:
+                documents = np.concatenate((self.postings[trigram], documents))
+            self.postings[trigram] = documents
+
+    def _remove(self, title_ids: Iterable[int]):
+        for pk in title_ids:
+            self.titles.pop(pk, None)
+            for document in self.titles_documents.pop(pk, ()):
+                self.documents_sizes[document] = 0
+                self.removed += 1
+
+    def update(self, title_ids: Iterable[int], version: int):
+        """Reload changed titles. Documents of changed titles are only marked as removed,
+        they are dropped from postings on the next full rebuild"""
+        title_ids = set(title_ids)
+        titles = list(_get_titles().filter(pk__in=title_ids))
+
+        with _lock:
+            self._remove(title_ids)
+            self._add(titles)
+            self.version = version
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        """Find `limit` most similar titles, ordered by similarity and id
+
+        Returns:
+            list: serialized titles, see SearchTitleSerializer
+        """
+        trigrams = get_trigrams(query)
+
+        with _lock:
+            postings = [self.postings[t] for t in trigrams if t in self.postings]
+            if not postings:
+                return []
+
+            # number of query trigrams in every document
+            shared = np.bincount(
+                np.concatenate(postings), minlength=len(self.documents_sizes)
+            )
+            documents = np.flatnonzero(shared)
+            # skip removed documents
+            documents = documents[self.documents_sizes[documents] > 0]
+            shared = shared[documents]
+            sizes = self.documents_sizes[documents]
+
+            similarities = shared / (len(trigrams) + sizes - shared)
+            matched = similarities >= SIMILARITY_THRESHOLD
+            titles = self.documents_titles[documents[matched]]
+            similarities = similarities[matched]
+
+            # order by similarity and title, first document of every title is its best one
+            order = np.lexsort((titles, -similarities))
+            titles = titles[order]
+            _, best = np.unique(titles, return_index=True)
+            best.sort()
+
+            return [self.titles[int(pk)] for pk in titles[best[:limit]]]
+
+
+def _get_version() -> int:
+    return cache.get(AUTOCOMPLETE_VERSION_CACHE_KEY, 0)
+
+
+def update_index() -> SearchIndex:
+    """Rebuild index from scratch and publish it to all workers"""
+    global _index
+
+    # changes made during the building are applied once again later, that's harmless
+    index = SearchIndex.build(_get_version())
+    cache.set(AUTOCOMPLETE_INDEX_CACHE_KEY, index, None)
+    _index = index
+
+    return index
+
+
+def _apply_changes(index: SearchIndex, version: int) -> Optional[SearchIndex]:
+    """Apply changes published after index was built. Returns None if some of them are lost"""
+    if index.version == version:
+        return index
+
+    versions = range(index.version + 1, version + 1)
+    changes = cache.get_many([AUTOCOMPLETE_CHANGES_CACHE_KEY % v for v in versions])
+    if len(changes) != len(versions):
+        return None
+
+    index.update({pk for title_ids in changes.values() for pk in title_ids}, version)
+    return index
+
+
+def get_index() -> SearchIndex:
+    global _index, _index_checked
+
+    if (
+        _index is not None
+        and time.monotonic() - _index_checked
+        < settings.TITLES_AUTOCOMPLETE_CHECK_INTERVAL
+    ):
+        return _index
+
+    version = _get_version()
+    index = _index if _index is not None else cache.get(AUTOCOMPLETE_INDEX_CACHE_KEY)
+
+    if index is None or index.version > version:
+        index = None
+    else:
+        index = _apply_changes(index, version)
+
+    _index = index if index is not None else update_index()
+    _index_checked = time.monotonic()
+
+    return _index
+
+
+def publish_changes(title_ids: Iterable[int]):
+    """Publish changed titles under new version, workers reload them on next lookup"""
+    cache.add(AUTOCOMPLETE_VERSION_CACHE_KEY, 0, None)
+    version = cache.incr(AUTOCOMPLETE_VERSION_CACHE_KEY)
+    cache.set(
+        AUTOCOMPLETE_CHANGES_CACHE_KEY % version,
+        list(title_ids),
+        AUTOCOMPLETE_CHANGES_CACHE_TIMEOUT,
+    )
+
+
+def schedule_update(title_ids: Iterable[int]):
+    """Publish changed titles once current transaction is committed"""
+    title_ids = list(title_ids)
+    transaction.on_commit(lambda: publish_changes(title_ids))
@@ -0,0 +1,172 @@
+"""
+In-memory bitmap index of catalog facets.
+
+Every enabled title gets a bit position, every facet value gets a bitset (python int)
+of titles having that value. Counting titles for a facet value under current filter state
+is then a couple of bitwise AND's and a popcount, without touching the database.
+
+Index is built by celery task and stored in cache, every worker keeps its own copy
+in memory and reloads it only when the version in cache changes.
+"""
+from functools import reduce
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Title
+
+FACETS_INDEX_CACHE_KEY = 'titles.facets.index'
+FACETS_VERSION_CACHE_KEY = 'titles.facets.version'
+FACETS_SCHEDULED_CACHE_KEY = 'titles.facets.scheduled'
+
+# delay of index rebuilding, to rebuild it once after bunch of titles changes
+FACETS_UPDATE_COUNTDOWN = 60
+
+MULTIPLE_FACETS = {
+    'genres': 'genre__slug',
+    'countries': 'country__slug',
+    'studios': 'studio__slug',
+}
+
+SINGLE_FACETS = ('year', 'year_season', 'status', 'type', 'source', 'age_rating')
+
+_index = None
+
+
+def popcount(bitset: int) -> int:
+    return bin(bitset).count('1')
+
+
+class FacetIndex:
+    def __init__(self, version: int, size: int, bitmaps: Dict[str, Dict[str, int]]):
+        self.version = version
+        self.size = size
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def build(cls, version: int) -> 'FacetIndex':
+        titles = Title.objects.enabled().order_by('pk')
+        positions = {}
+        bitmaps = {facet: {} for facet in (*MULTIPLE_FACETS, *SINGLE_FACETS)}
+
+        for position, (pk, *values) in enumerate(
+            titles.values_list('pk', *SINGLE_FACETS)
+        ):
+            positions[pk] = position
+            for facet, value in zip(SINGLE_FACETS, values):
+                if value is not None and value != '':
+                    cls._set_bit(bitmaps[facet], str(value), position)
+
+        for facet, slug_field in MULTIPLE_FACETS.items():
+            through = Title._meta.get_field(facet).remote_field.through
+            relations = (
+                through.objects.filter(title__in=titles)
+                .exclude(**{slug_field: ''})
+                .values_list('title_id', slug_field)
+            )
+            for title_id, slug in relations:
+                cls._set_bit(bitmaps[facet], slug, positions[title_id])
+
+        return cls(version, len(positions), bitmaps)
+
+    @staticmethod
+    def _set_bit(bitmap: dict, value: str, position: int):
+        bitmap[value] = bitmap.get(value, 0) | (1 << position)
+
+    def _get_mask(self, facet: str, values: Iterable) -> int:
+        """Titles having any of `values` in `facet`"""
+        bitmap = self.bitmaps[facet]
+        return reduce(lambda x, y: x | y, (bitmap.get(str(v), 0) for v in values), 0)
+
+    def _get_masks(self, filters: dict) -> Dict[str, int]:
+        masks = {}
+
+        for facet, values in filters.items():
+            if facet in self.bitmaps and values:
+                masks[facet] = self._get_mask(facet, values)
+
+        year_gte, year_lte = filters.get('year__gte'), filters.get('year__lte')
+        if year_gte is not None or year_lte is not None:
+            masks['year'] = self._get_mask(
+                'year',
+                (
+                    year
+                    for year in self.bitmaps['year']
+                    if (year_gte is None or int(year) >= year_gte)
+                    and (year_lte is None or int(year) <= year_lte)
+                ),
+            )
+
+        return masks
+
+    def count(self, filters: dict) -> dict:
+        """Count titles for every facet value under current `filters`.
+
+        Filter of a facet itself is not applied to it's own values counts,
+        so selected values don't hide their alternatives.
+
+        Args:
+            filters (dict): facet name to list of values, plus `year__gte` and `year__lte`
+
+        Returns:
+            dict: total number of titles and per facet value counts
+        """
+
+        masks = self._get_masks(filters)
+        everything = (1 << self.size) - 1
+
+        def get_mask(exclude: str = None) -> int:
+            return reduce(
+                lambda x, y: x & y,
+                (mask for facet, mask in masks.items() if facet != exclude),
+                everything,
+            )
+
+        facets = {}
+        for facet, bitmap in self.bitmaps.items():
+            mask = get_mask(exclude=facet)
+            facets[facet] = {
+                value: popcount(titles & mask) for value, titles in bitmap.items()
+            }
+
+        return {'total': popcount(get_mask()), 'facets': facets}
+
+
+def update_index() -> FacetIndex:
+    """Rebuild index and publish it to all workers"""
+    global _index
+
+    version = cache.get(FACETS_VERSION_CACHE_KEY, 0) + 1
+    index = FacetIndex.build(version)
+
+    cache.set(FACETS_INDEX_CACHE_KEY, index, None)
+    cache.set(FACETS_VERSION_CACHE_KEY, version, None)
+    cache.delete(FACETS_SCHEDULED_CACHE_KEY)
+    _index = index
+
+    return index
+
+
+def get_index() -> FacetIndex:
+    global _index
+
+    version: Optional[int] = cache.get(FACETS_VERSION_CACHE_KEY)
+
+    if _index is None or version is None or _index.version != version:
+        index = cache.get(FACETS_INDEX_CACHE_KEY) if version is not None else None
+        _index = index if index is not None else update_index()
+
+    return _index
+
+
+def schedule_update():
+    """Schedule index rebuilding once current transaction is committed"""
+
+    def _schedule():
+        from .tasks import update_title_facets
+
+        if cache.add(FACETS_SCHEDULED_CACHE_KEY, True, FACETS_UPDATE_COUNTDOWN * 2):
+            update_title_facets.apply_async(countdown=FACETS_UPDATE_COUNTDOWN)
+
+    transaction.on_commit(_schedule)
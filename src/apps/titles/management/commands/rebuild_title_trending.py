@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from apps.titles.trending import rebuild_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute trending scores of all titles from hourly views'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Updated trending scores of {rebuild_scores()} titles')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.titles.services import reconcile_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Verify titles rating aggregates against users ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true', help='Overwrite wrong aggregates'
+        )
+
+    def handle(self, *args, **options):
+        title_ids = reconcile_rating_aggregates(fix=options['fix'])
+
+        if not title_ids:
+            self.stdout.write('Rating aggregates of all titles are correct')
+        elif options['fix']:
+            self.stdout.write(f'Fixed rating aggregates of titles: {title_ids}')
+        else:
+            self.stdout.write(f'Wrong rating aggregates of titles: {title_ids}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.titles.services import refresh_last_episode
+
+
+class Command(BaseCommand):
+    help = 'Recalculate last episode data of all titles'
+
+    def handle(self, *args, **options):
+        updated = refresh_last_episode()
+        self.stdout.write(f'Updated last episode of {updated} titles')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.titles.services import get_search_cache_stats, reset_search_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss statistics of the search results cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', help='Reset statistics after showing'
+        )
+
+    def handle(self, *args, **options):
+        stats = get_search_cache_stats()
+        self.stdout.write(
+            f'Hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit ratio: {stats["hit_ratio"]:.2%}'
+        )
+
+        if options['reset']:
+            reset_search_cache_stats()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.titles.similars import METRICS, update_similars
+
+
+class Command(BaseCommand):
+    help = 'Recompute similar titles of all enabled titles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', choices=METRICS, default='jaccard')
+
+    def handle(self, *args, **options):
+        result = update_similars(metric=options['metric'])
+
+        for phase, seconds in result['timings'].items():
+            self.stdout.write(f'{phase}: {seconds:.3f}s')
+        self.stdout.write(
+            f'Updated similars of {result["titles"]} titles, {result["rows"]} rows'
+        )
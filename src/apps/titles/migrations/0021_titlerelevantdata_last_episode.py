@@ -0,0 +1,23 @@
+# Generated by Django 3.1 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0020_auto_20201031_0428'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='titlerelevantdata',
+            name='last_episode',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='titlerelevantdata',
+            name='last_episode_date',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.1 on 2026-10-18 09:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0021_titlerelevantdata_last_episode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleSimilar',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('similar_title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='titles.title')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_titles', to='titles.title')),
+            ],
+            options={
+                'ordering': ('-score',),
+                'unique_together': {('title', 'similar_title')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.1 on 2026-10-18 09:44
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def get_search_documents(title):
+    """Searchable (kind, text) of the title, without empty and case insensitive duplicates"""
+    documents = {}
+
+    for kind, texts in (
+        ('name', [title.name]),
+        ('other_name', title.other_names),
+        ('character', title.characters),
+        ('tag', title.tags),
+    ):
+        for text in texts or []:
+            text = (text or '').strip()
+            if text:
+                documents.setdefault(text.lower(), (kind, text))
+
+    return list(documents.values())
+
+
+def populate_search_documents(apps, schema_editor):
+    Title = apps.get_model('titles', 'Title')
+    TitleSearchDocument = apps.get_model('titles', 'TitleSearchDocument')
+    db_alias = schema_editor.connection.alias
+    TitleSearchDocument.objects.using(db_alias).bulk_create(
+        (
+            TitleSearchDocument(title=title, kind=kind, text=text)
+            for title in Title.objects.using(db_alias).only(
+                'name', 'other_names', 'characters', 'tags'
+            )
+            for kind, text in get_search_documents(title)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0022_titlesimilar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleSearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('name', 'название'), ('other_name', 'другое название'), ('character', 'персонаж'), ('tag', 'тэг')], max_length=10)),
+                ('text', models.CharField(max_length=255)),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='titles.title')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='titlesearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['text'], name='titles_search_text_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+import re
+
+from django.db import migrations
+
+_cyrillic_letters_regex = re.compile(r'[а-я]')
+_latin_letters_regex = re.compile(r'[a-z]')
+
+# latin and cyrillic letters looking the same
+_latin_to_cyrillic = str.maketrans('aceopxyk', 'асеорхук')
+_cyrillic_to_latin = str.maketrans('асеорхук', 'aceopxyk')
+
+
+def normalize_search_text(text):
+    """
+    Lowercase the text, collapse whitespaces, replace "ё" with "е"
+    and fix words typed in mixed latin/cyrillic keyboard layouts
+    """
+    words = []
+
+    for word in text.lower().replace('ё', 'е').split():
+        cyrillic = len(_cyrillic_letters_regex.findall(word))
+        latin = len(_latin_letters_regex.findall(word))
+        if cyrillic and latin:
+            word = word.translate(
+                _latin_to_cyrillic if cyrillic >= latin else _cyrillic_to_latin
+            )
+        words.append(word)
+
+    return ' '.join(words)
+
+
+def get_search_documents(title):
+    """Normalized searchable (kind, text) of the title, without empty texts and duplicates"""
+    documents = {}
+
+    for kind, texts in (
+        ('name', [title.name]),
+        ('other_name', title.other_names),
+        ('character', title.characters),
+        ('tag', title.tags),
+    ):
+        for text in texts or []:
+            text = normalize_search_text(text or '')
+            if text:
+                documents.setdefault(text, (kind, text))
+
+    return list(documents.values())
+
+
+def normalize_search_documents(apps, schema_editor):
+    Title = apps.get_model('titles', 'Title')
+    TitleSearchDocument = apps.get_model('titles', 'TitleSearchDocument')
+    db_alias = schema_editor.connection.alias
+    TitleSearchDocument.objects.using(db_alias).all().delete()
+    TitleSearchDocument.objects.using(db_alias).bulk_create(
+        (
+            TitleSearchDocument(title=title, kind=kind, text=text)
+            for title in Title.objects.using(db_alias).only(
+                'name', 'other_names', 'characters', 'tags'
+            )
+            for kind, text in get_search_documents(title)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0023_titlesearchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_search_documents, migrations.RunPython.noop),
+    ]
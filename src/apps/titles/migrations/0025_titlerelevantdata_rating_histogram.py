@@ -0,0 +1,58 @@
+# Generated by Django 3.1 on 2026-10-18 09:50
+
+import apps.titles.models
+import django.contrib.postgres.fields
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    TitleRelevantData = apps.get_model('titles', 'TitleRelevantData')
+    TitleRating = apps.get_model('users', 'TitleRating')
+    db_alias = schema_editor.connection.alias
+
+    histograms = {}
+    for title_id, rate, count in (
+        TitleRating.objects.using(db_alias)
+        .order_by()
+        .values_list('title_id', 'rate')
+        .annotate(count=Count('pk'))
+    ):
+        histograms.setdefault(title_id, [0] * 10)[rate - 1] = count
+
+    TitleRelevantData.objects.using(db_alias).update(rating_total=0, rating_average=0)
+    for title_id, histogram in histograms.items():
+        rating_sum = sum(rate * count for rate, count in enumerate(histogram, 1))
+        TitleRelevantData.objects.using(db_alias).filter(title_id=title_id).update(
+            rating_histogram=histogram,
+            rating_sum=rating_sum,
+            rating_total=sum(histogram),
+            rating_average=rating_sum / sum(histogram),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0024_normalize_search_documents'),
+        ('users', '0021_auto_20201031_0403'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='titlerelevantdata',
+            name='rating_histogram',
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.PositiveIntegerField(),
+                default=apps.titles.models.get_empty_rating_histogram,
+                editable=False,
+                size=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name='titlerelevantdata',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.1 on 2026-10-18 09:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0025_titlerelevantdata_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRankHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('rank', models.PositiveIntegerField()),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rank_history', to='titles.title')),
+            ],
+            options={
+                'ordering': ('date',),
+                'unique_together': {('title', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.1 on 2026-10-18 09:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_views(apps, schema_editor):
+    ViewedEpisode = apps.get_model('users', 'ViewedEpisode')
+    TitleViews = apps.get_model('titles', 'TitleViews')
+    EpisodeViews = apps.get_model('titles', 'EpisodeViews')
+    db_alias = schema_editor.connection.alias
+    viewed = (
+        ViewedEpisode.objects.using(db_alias)
+        .order_by()
+        .annotate(date=TruncDate('date_created'))
+    )
+
+    EpisodeViews.objects.using(db_alias).bulk_create(
+        (
+            EpisodeViews(episode_id=episode_id, date=date, views=views)
+            for episode_id, date, views in viewed.values_list(
+                'episode_id', 'date'
+            ).annotate(views=Count('pk'))
+        ),
+        batch_size=1000,
+    )
+    TitleViews.objects.using(db_alias).bulk_create(
+        (
+            TitleViews(
+                title_id=title_id, date=date, views=views, unique_viewers=viewers
+            )
+            for title_id, date, views, viewers in viewed.filter(
+                episode__translation__title__isnull=False
+            )
+            .values_list('episode__translation__title', 'date')
+            .annotate(views=Count('pk'), viewers=Count('user', distinct=True))
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0006_auto_20200927_2254'),
+        ('titles', '0026_titlerankhistory'),
+        ('users', '0021_auto_20201031_0403'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleViews',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='titles.title')),
+            ],
+            options={
+                'unique_together': {('title', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EpisodeViews',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('episode', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='translations.episode')),
+            ],
+            options={
+                'unique_together': {('episode', 'date')},
+            },
+        ),
+        migrations.RunPython(populate_views, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 3.1 on 2026-10-18 09:59
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils.timezone import now
+
+# settings of trending scores when the migration was written
+TRENDING_HALF_LIFE = 24
+TRENDING_HOURS = 24 * 7
+
+
+def populate_trending(apps, schema_editor):
+    ViewedEpisode = apps.get_model('users', 'ViewedEpisode')
+    TitleHourlyViews = apps.get_model('titles', 'TitleHourlyViews')
+    TitleRelevantData = apps.get_model('titles', 'TitleRelevantData')
+    connection = schema_editor.connection
+    hour = now().replace(minute=0, second=0, microsecond=0)
+
+    viewed = (
+        ViewedEpisode.objects.using(connection.alias)
+        .order_by()
+        .filter(
+            episode__translation__title__isnull=False,
+            date_created__gte=hour - timedelta(hours=TRENDING_HOURS),
+        )
+        .annotate(hour=TruncHour('date_created'))
+    )
+
+    TitleHourlyViews.objects.using(connection.alias).bulk_create(
+        (
+            TitleHourlyViews(title_id=title_id, hour=views_hour, views=views)
+            for title_id, views_hour, views in viewed.values_list(
+                'episode__translation__title', 'hour'
+            ).annotate(views=Count('pk'))
+        ),
+        batch_size=1000,
+    )
+
+    # scores are sums of hourly views decayed to the current hour
+    table = connection.ops.quote_name(TitleRelevantData._meta.db_table)
+    hourly_views = connection.ops.quote_name(TitleHourlyViews._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            update {table} set trending = scores.score, trending_hour = %(hour)s
+            from (
+                select
+                    relevant_data.title_id,
+                    coalesce(sum(
+                        hourly_views.views * power(
+                            %(decay)s,
+                            extract(epoch from (%(hour)s - hourly_views.hour)) / 3600
+                        )
+                    ), 0) as score
+                from {table} as relevant_data
+                left join {hourly_views} as hourly_views
+                    on hourly_views.title_id = relevant_data.title_id
+                group by relevant_data.title_id
+            ) as scores
+            where {table}.title_id = scores.title_id
+            """,
+            {'decay': 0.5 ** (1 / TRENDING_HALF_LIFE), 'hour': hour},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0027_titleviews_episodeviews'),
+        ('users', '0021_auto_20201031_0403'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='titlerelevantdata',
+            name='trending',
+            field=models.FloatField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='titlerelevantdata',
+            name='trending_hour',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='TitleHourlyViews',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_views', to='titles.title')),
+            ],
+            options={
+                'unique_together': {('title', 'hour')},
+            },
+        ),
+        migrations.RunPython(populate_trending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.1 on 2026-10-18 10:15
+
+import apps.core.fields
+import apps.titles.models
+import apps.titles.storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('titles', '0028_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='poster_manifest',
+            field=models.JSONField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='wallpaper_manifest',
+            field=models.JSONField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='wallpaper_mobile_manifest',
+            field=models.JSONField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='poster',
+            field=apps.core.fields.BaseImageField(manifest_field='poster_manifest', max_length=255, null=True, storage=apps.titles.storages.TitlePosterStorage(), upload_to=apps.titles.models.title_poster_path),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='wallpaper',
+            field=apps.core.fields.BaseImageField(blank=True, manifest_field='wallpaper_manifest', max_length=255, null=True, storage=apps.titles.storages.TitleWallpaperStorage(), upload_to=apps.titles.models.title_wallpaper_path),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='wallpaper_mobile',
+            field=apps.core.fields.BaseImageField(blank=True, manifest_field='wallpaper_mobile_manifest', max_length=255, null=True, storage=apps.titles.storages.TitleWallpaperMobileStorage(), upload_to=apps.titles.models.title_wallpaper_mobile_path),
+        ),
+    ]
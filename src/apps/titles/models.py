@@ -52,6 +52,10 @@ class TitleManager(query.BaseManager):
         return query.filter_queryset_by_enabled_title(super().enabled())
 
 
+def get_empty_rating_histogram() -> list:
+    return [0] * 10
+
+
 class TitleRelevantData(BaseModel):
     title = models.OneToOneField(
         'Title',
@@ -63,9 +67,22 @@ class TitleRelevantData(BaseModel):
     rating_average = models.DecimalField(
         max_digits=4, decimal_places=2, default=0, editable=False
     )
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    # number of ratings of every rate, from 1 to 10
+    rating_histogram = ArrayField(
+        models.PositiveIntegerField(),
+        size=10,
+        default=get_empty_rating_histogram,
+        editable=False,
+    )
     views_total = models.PositiveIntegerField(default=0, editable=False)
     rank = models.PositiveIntegerField(default=0, editable=False)
     rank_previous = models.PositiveIntegerField(default=0, editable=False)
+    # views decayed exponentially by their age, see apps.titles.trending
+    trending = models.FloatField(default=0, editable=False, db_index=True)
+    trending_hour = models.DateTimeField(null=True, editable=False)
+    last_episode = models.PositiveSmallIntegerField(null=True, editable=False)
+    last_episode_date = models.DateTimeField(null=True, editable=False)
 
 
 class Title(BaseModel, mixins.SlugMixin, mixins.DateCreatedModifiedMixin):
@@ -128,21 +145,29 @@ class Title(BaseModel, mixins.SlugMixin, mixins.DateCreatedModifiedMixin):
     )
     season = models.SmallIntegerField(null=True, blank=True)
     poster = fields.BaseImageField(
-        null=True, upload_to=title_poster_path, storage=storages.TitlePosterStorage(),
+        null=True,
+        upload_to=title_poster_path,
+        storage=storages.TitlePosterStorage(),
+        manifest_field='poster_manifest',
     )
+    poster_manifest = models.JSONField(null=True, editable=False)
     wallpaper = fields.BaseImageField(
         null=True,
         upload_to=title_wallpaper_path,
         storage=storages.TitleWallpaperStorage(),
         blank=True,
+        manifest_field='wallpaper_manifest',
     )
+    wallpaper_manifest = models.JSONField(null=True, editable=False)
 
     wallpaper_mobile = fields.BaseImageField(
         null=True,
         upload_to=title_wallpaper_mobile_path,
         storage=storages.TitleWallpaperMobileStorage(),
         blank=True,
+        manifest_field='wallpaper_mobile_manifest',
     )
+    wallpaper_mobile_manifest = models.JSONField(null=True, editable=False)
     shikimori_id = models.PositiveIntegerField(_('Shikimori ID'), null=True, blank=True)
     name = models.CharField(_('название'), max_length=255)
     duration = models.CharField(
@@ -239,6 +264,10 @@ class Title(BaseModel, mixins.SlugMixin, mixins.DateCreatedModifiedMixin):
     def __str__(self):
         return '%s [SE:%s]' % (self.name, self.season)
 
+    @property
+    def is_enabled(self) -> bool:
+        return self.inner_status == self.INNER_STATUSES.on and bool(self.slug)
+
     @cached_property
     def rating_total(self):
         return self.relevant_data.rating_total
@@ -249,16 +278,110 @@ class Title(BaseModel, mixins.SlugMixin, mixins.DateCreatedModifiedMixin):
 
     @cached_property
     def rating_best(self):
-        if self.ratings.count():
-            return self.ratings.all().order_by('-rate')[:1].first().rate
-        else:
-            return None
+        histogram = self.relevant_data.rating_histogram
+        return next((rate for rate in range(10, 0, -1) if histogram[rate - 1]), None)
 
     @cached_property
     def watch_order_list(self):
         return WatchOrderList.objects.get_or_none(watchorderitem__title=self)
 
 
+class TitleSimilar(BaseModel):
+    """Precomputed similar titles, see apps.titles.similars"""
+
+    title = models.ForeignKey(
+        'Title', on_delete=models.CASCADE, related_name='similar_titles'
+    )
+    similar_title = models.ForeignKey(
+        'Title', on_delete=models.CASCADE, related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ('-score',)
+        unique_together = (('title', 'similar_title'),)
+
+
+class TitleViews(BaseModel):
+    """Daily views of a title, flushed from buffered counters, see apps.titles.viewcounts"""
+
+    title = models.ForeignKey(
+        'Title', on_delete=models.CASCADE, related_name='daily_views'
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    # approximate number of unique users and anonymous viewers
+    unique_viewers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('title', 'date'),)
+
+
+class TitleHourlyViews(BaseModel):
+    """Hourly views of a title for trending scores, see apps.titles.trending"""
+
+    title = models.ForeignKey(
+        'Title', on_delete=models.CASCADE, related_name='hourly_views'
+    )
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('title', 'hour'),)
+
+
+class EpisodeViews(BaseModel):
+    """Daily views of an episode, flushed from buffered counters, see apps.titles.viewcounts"""
+
+    episode = models.ForeignKey(
+        'translations.Episode', on_delete=models.CASCADE, related_name='daily_views'
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('episode', 'date'),)
+
+
+class TitleRankHistory(BaseModel):
+    """Daily snapshots of title's rank, see apps.titles.services.update_ranks"""
+
+    title = models.ForeignKey(
+        'Title', on_delete=models.CASCADE, related_name='rank_history'
+    )
+    date = models.DateField()
+    rank = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ('date',)
+        unique_together = (('title', 'date'),)
+
+
+class TitleSearchDocument(BaseModel):
+    """Searchable name, alias, character or tag of a title, see apps.titles.services.search"""
+
+    class KINDS(models.TextChoices):
+        name = 'name', _('название')
+        other_name = 'other_name', _('другое название')
+        character = 'character', _('персонаж')
+        tag = 'tag', _('тэг')
+
+    title = models.ForeignKey(
+        'Title', on_delete=models.CASCADE, related_name='search_documents'
+    )
+    kind = models.CharField(choices=KINDS.choices, max_length=10)
+    text = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=['text'],
+                name='titles_search_text_trgm',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
+
 class WatchOrderList(BaseModel):
     class Meta:
         verbose_name = _('порядок просмотра')
@@ -8,10 +8,19 @@ from apps.content.serializers import (
     GenreSerializer,
     StudioSerializer,
 )
+from apps.core.fastserializers import (
+    Column,
+    ImageUrls,
+    Many,
+    Method,
+    Nested,
+    ValuesSerializer,
+)
+from apps.core.serializers import DynamicFieldsSerializerMixin
 from apps.translations.models import Episode, Translation, Translator
 
 from . import services
-from .models import Title, WatchOrderItem, WatchOrderList
+from .models import Title, TitleRankHistory, WatchOrderItem, WatchOrderList
 
 
 def get_title_serializer_class(serializer_fields: dict = {}):
@@ -64,7 +73,7 @@ def get_title_serializer_class(serializer_fields: dict = {}):
             return services.get_formated_relevant_data(title)
 
         def get_last_episode(self, title):
-            return title.last_episode
+            return title.relevant_data.last_episode
 
     return _TitleSerializer
 
@@ -89,7 +98,7 @@ class BaseTitleSerializer(serializers.ModelSerializer):
         return services.get_formated_relevant_data(title)
 
     def get_last_episode(self, title):
-        return title.last_episode if hasattr(title, 'last_episode') else None
+        return title.relevant_data.last_episode
 
 
 class CurrentSeasonSerializer(BaseTitleSerializer):
@@ -206,7 +215,7 @@ class WatchOrderListSerializer(serializers.ModelSerializer):
         fields = ('titles',)
 
 
-class TitleSerializer(BaseTitleSerializer):
+class TitleSerializer(DynamicFieldsSerializerMixin, BaseTitleSerializer):
     other_names = serializers.ListField(child=serializers.CharField())
     characters = serializers.ListField(child=serializers.CharField())
     tags = serializers.ListField(child=serializers.CharField())
@@ -263,6 +272,12 @@ class TitleSerializer(BaseTitleSerializer):
         )
 
 
+class TitleRankHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TitleRankHistory
+        fields = ('date', 'rank')
+
+
 class SearchTitleSerializer(BaseTitleSerializer):
     class Meta(BaseTitleSerializerMeta):
         fields = BaseTitleSerializerMeta.fields + ('year', 'type', 'status')
@@ -273,9 +288,104 @@ class SearchQuerySerializer(serializers.Serializer):
         validators=[validators.MinLengthValidator(3), validators.MaxLengthValidator(50)]
     )
 
+    def validate_q(self, value):
+        return services.normalize_search_text(value)
+
+
+class FacetsQuerySerializer(serializers.Serializer):
+    genres = serializers.ListField(child=serializers.CharField(), required=False)
+    countries = serializers.ListField(child=serializers.CharField(), required=False)
+    studios = serializers.ListField(child=serializers.CharField(), required=False)
+    year__gte = serializers.IntegerField(required=False)
+    year__lte = serializers.IntegerField(required=False)
+    year_season = serializers.ChoiceField(Title.YEAR_SEASONS.choices, required=False)
+    status = serializers.ChoiceField(Title.STATUSES.choices, required=False)
+    source = serializers.ChoiceField(Title.SOURCES.choices, required=False)
+    type = serializers.ChoiceField(Title.TYPES.choices, required=False)
+    age_rating = serializers.ChoiceField(Title.AGE_RATINGS.choices, required=False)
+
+    def to_internal_value(self, data):
+        """Single value filters are treated as lists of one value"""
+        value = super().to_internal_value(data)
+        for field in ('year_season', 'status', 'source', 'type', 'age_rating'):
+            if field in value:
+                value[field] = [value[field]]
+        return value
+
 
 class LatestsSerializer(BaseTitleSerializer):
     genres = GenreSerializer(many=True)
 
     class Meta(BaseTitleSerializerMeta):
         fields = BaseTitleSerializerMeta.fields + ('year', 'type', 'genres',)
+
+
+# fast path serializers (see apps.core.fastserializers), output must match serializers above
+
+date_time = serializers.DateTimeField().to_representation
+
+content_values_fields = {'name': Column('name'), 'slug': Column('slug')}
+
+base_title_values_fields = {
+    'name': Column('name'),
+    'slug': Column('slug'),
+    'poster': ImageUrls('poster'),
+}
+
+title_values = ValuesSerializer(
+    Title,
+    {
+        **base_title_values_fields,
+        'other_names': Column('other_names', list),
+        'release_day': Column('release_day'),
+        'countries': Many('countries', content_values_fields),
+        'genres': Many('genres', content_values_fields),
+        'studios': Many('studios', content_values_fields),
+        'duration': Column('duration'),
+        'description': Column('description'),
+        'source': Column('source'),
+        'translations': Many(
+            'translation',
+            {
+                'id': Column('id'),
+                'translator': Nested(
+                    'translator',
+                    {
+                        'id': Column('id'),
+                        'name': Column('name'),
+                        'slug': Column('slug'),
+                        'date_created': Column('date_created', date_time),
+                        'date_modified': Column('date_modified', date_time),
+                    },
+                ),
+                'service': Column('service', str),
+                'url': Column('url'),
+                'episodes': Many(
+                    'episode',
+                    {
+                        'id': Column('id'),
+                        'number': Column('number'),
+                        'url': Column('url'),
+                        'name': Column('name'),
+                    },
+                ),
+                'is_other': Column('is_other'),
+            },
+        ),
+        'season': Column('season'),
+        'year': Column('year'),
+        'year_season': Column('year_season'),
+        'characters': Column('characters', list),
+        'tags': Column('tags', list),
+        'age_rating': Column('age_rating'),
+        'status': Column('status'),
+        'type': Column('type'),
+        'relevant_data': Method(
+            services.format_relevant_data,
+            *(f'relevant_data__{field}' for field in services.RELEVANT_DATA_FIELDS),
+        ),
+        'last_episode': Column('relevant_data__last_episode'),
+        'total_episodes': Column('total_episodes'),
+        'date_enabled': Column('date_enabled', date_time),
+    },
+)
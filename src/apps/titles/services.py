@@ -1,70 +1,516 @@
-from typing import Iterable
+import hashlib
+import re
+import time
+from datetime import timedelta
+from typing import Iterable, List, Tuple
 
+from django.conf import settings
 from django.contrib.postgres.search import TrigramSimilarity
 from django.core.cache import cache
-from django.db.models import Count, Q, QuerySet
-from django.db.models.functions import Greatest
+from django.db import connection, transaction
+from django.db.models import (
+    DecimalField,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf
+from django.utils.timezone import localdate
 
-from apps.core.query import ArraySim
+from apps.core.cache import cached
+from apps.core.query import ArrayIncrement, Rank
+from apps.translations.models import Episode
+from apps.users.models import TitleRating
 
-from .models import Title
+from . import versions
+from .models import (
+    Title,
+    TitleRankHistory,
+    TitleRelevantData,
+    TitleSearchDocument,
+    TitleSimilar,
+    TitleViews,
+)
 
 
-def get_formated_relevant_data(title: Title) -> dict:
+SEARCH_CACHE_KEY = 'titles.search.%s.%s'
+SEARCH_STATS_CACHE_KEY = 'titles.search.stats.%s'
+TITLE_SIMILARS_CACHE_KEY = 'titles.similars.%s'
+
+_cyrillic_letters_regex = re.compile(r'[а-я]')
+_latin_letters_regex = re.compile(r'[a-z]')
+
+# latin and cyrillic letters looking the same
+_latin_to_cyrillic = str.maketrans('aceopxyk', 'асеорхук')
+_cyrillic_to_latin = str.maketrans('асеорхук', 'aceopxyk')
+
+# rating aggregates fields of `TitleRelevantData`, see `update_rating_aggregates`
+RATING_AGGREGATES_FIELDS = (
+    'rating_total',
+    'rating_sum',
+    'rating_histogram',
+    'rating_average',
+)
+
+# fields of `TitleRelevantData` in order of `format_relevant_data` arguments
+RELEVANT_DATA_FIELDS = (
+    'rating_total',
+    'rating_average',
+    'views_total',
+    'rank',
+    'rank_previous',
+    'trending',
+)
+
+
+def format_relevant_data(
+    rating_total, rating_average, views_total, rank, rank_previous, trending
+) -> dict:
     return {
-        'rating_total': str(title.relevant_data.rating_total),
-        'rating_average': '{:0.2f}'.format(title.relevant_data.rating_average or 0),
-        'views_total': str(title.relevant_data.views_total),
-        'rank': str(title.relevant_data.rank),
-        'rank_previous': str(title.relevant_data.rank_previous),
+        'rating_total': str(rating_total),
+        'rating_average': '{:0.2f}'.format(rating_average or 0),
+        'views_total': str(views_total),
+        'rank': str(rank),
+        'rank_previous': str(rank_previous),
+        'trending': '{:0.2f}'.format(trending),
     }
 
 
-def search(search_query: str, queryset: QuerySet = None) -> QuerySet:
+def get_formated_relevant_data(title: Title) -> dict:
+    relevant_data = title.relevant_data
+    return format_relevant_data(
+        *(getattr(relevant_data, field) for field in RELEVANT_DATA_FIELDS)
+    )
+
+
+def update_last_episode(episode: Episode) -> None:
     """
-    Perform a search in Title's models.
-    Returns ordered QuerySet
+    Move title's last episode forward after a new episode has been inserted.
+    Uses single UPDATE, so there is no need to lock or read relevant data first
+    """
+    TitleRelevantData.objects.filter(title__translation=episode.translation_id).update(
+        last_episode=Greatest(F('last_episode'), Value(episode.number)),
+        last_episode_date=Greatest(F('last_episode_date'), Value(episode.date_created)),
+    )
+
+
+def refresh_last_episode(queryset: QuerySet = None) -> int:
+    """
+    Recalculate title's last episode from scratch.
+    Should be used when episodes were changed or deleted, or to backfill the data.
+    Returns number of updated rows
+    """
+
+    queryset = queryset if queryset is not None else TitleRelevantData.objects.all()
+    episodes = Episode.objects.filter(
+        translation__title=OuterRef('title_id')
+    ).order_by()
+
+    return queryset.update(
+        last_episode=Subquery(
+            episodes.values('translation__title')
+            .annotate(last=Max('number'))
+            .values('last')[:1]
+        ),
+        last_episode_date=Subquery(
+            episodes.values('translation__title')
+            .annotate(last=Max('date_created'))
+            .values('last')[:1]
+        ),
+    )
+
+
+def update_rating_aggregates(
+    title_id: int, added: int = None, removed: int = None
+) -> None:
+    """
+    Apply added and/or removed rate to title's rating aggregates.
+    Uses single UPDATE with F() expressions, so concurrent ratings don't overwrite each other
+    """
+    rating_total = F('rating_total') + (
+        int(added is not None) - int(removed is not None)
+    )
+    rating_sum = F('rating_sum') + ((added or 0) - (removed or 0))
+
+    rating_histogram = F('rating_histogram')
+    if added is not None:
+        rating_histogram = ArrayIncrement(rating_histogram, added, 1)
+    if removed is not None:
+        rating_histogram = ArrayIncrement(rating_histogram, removed, -1)
+
+    TitleRelevantData.objects.filter(title=title_id).update(
+        rating_total=rating_total,
+        rating_sum=rating_sum,
+        rating_histogram=rating_histogram,
+        rating_average=Coalesce(
+            Cast(rating_sum, DecimalField(max_digits=12, decimal_places=2))
+            / NullIf(rating_total, 0),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+    versions.bump_versions([title_id])
+
+
+def _sync_relevant_data(fields: Iterable[str], fix: bool = True) -> List[int]:
     """
+    Compare titles relevant data with actual values computed by grouped aggregates
+    of ratings and daily views, in a single statement.
+
+    Args:
+        fields (Iterable[str]): relevant data fields to compare, rating aggregates
+            and/or views_total
+        fix (bool, optional): Overwrite wrong values with single UPDATE ... FROM.
+            Defaults to True. Table is locked against concurrent updates (rating aggregates
+            updates, views flushes) until the transaction is committed, so they are applied
+            on top of recomputed values instead of being overwritten
 
-    base_queryset = queryset if queryset else Title.objects.enabled()
+    Returns:
+        list: ids of titles with wrong values
+    """
+    relevant_data = connection.ops.quote_name(TitleRelevantData._meta.db_table)
+    joins = {
+        'ratings': f"""
+            left join (
+                select
+                    title_id,
+                    count(*) as total,
+                    sum(rate) as sum,
+                    array[{', '.join(
+                        f'count(*) filter (where rate = {rate})' for rate in range(1, 11)
+                    )}]::integer[] as histogram
+                from {connection.ops.quote_name(TitleRating._meta.db_table)}
+                group by title_id
+            ) as ratings on ratings.title_id = stored.title_id
+        """,
+        'views': f"""
+            left join (
+                select title_id, sum(views) as total
+                from {connection.ops.quote_name(TitleViews._meta.db_table)}
+                group by title_id
+            ) as views on views.title_id = stored.title_id
+        """,
+    }
+    actual_values = {
+        'rating_total': ('ratings', 'coalesce(ratings.total, 0)'),
+        'rating_sum': ('ratings', 'coalesce(ratings.sum, 0)'),
+        'rating_histogram': (
+            'ratings',
+            'coalesce(ratings.histogram, array_fill(0, array[10]))',
+        ),
+        'rating_average': (
+            'ratings',
+            'coalesce(round(ratings.sum::numeric / ratings.total, 2), 0)',
+        ),
+        'views_total': ('views', 'coalesce(views.total, 0)'),
+    }
+    fields = list(fields)
 
-    filtered_queryset = (
-        base_queryset.annotate(
-            similarity=Greatest(
-                TrigramSimilarity('name', search_query),
-                ArraySim('tags', search_query),
-                ArraySim('other_names', search_query),
-                ArraySim('characters', search_query),
+    actual = f"""
+        select stored.title_id, {', '.join(
+            f'{actual_values[field][1]} as {field}' for field in fields
+        )}
+        from {relevant_data} as stored
+        {' '.join(joins[join] for join in dict.fromkeys(actual_values[field][0] for field in fields))}
+    """
+    mismatched = f"""
+        {relevant_data}.title_id = actual.title_id
+        and ({', '.join(f'{relevant_data}.{field}' for field in fields)})
+        is distinct from ({', '.join(f'actual.{field}' for field in fields)})
+    """
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if fix:
+            cursor.execute(f'lock table {relevant_data} in share row exclusive mode')
+            cursor.execute(
+                f"""
+                update {relevant_data}
+                set {', '.join(f'{field} = actual.{field}' for field in fields)}
+                from ({actual}) as actual
+                where {mismatched}
+                returning {relevant_data}.title_id
+                """
             )
-        )
-        .filter(similarity__gte=0.3)
-        .order_by('-similarity')
+        else:
+            cursor.execute(
+                f"""
+                select actual.title_id from {relevant_data}, ({actual}) as actual
+                where {mismatched}
+                """
+            )
+        return [title_id for title_id, in cursor.fetchall()]
+
+
+def reconcile_rating_aggregates(fix: bool = False) -> List[int]:
+    """
+    Verify titles rating aggregates against TitleRating.
+
+    Args:
+        fix (bool, optional): Overwrite wrong aggregates with actual ones. Defaults to False.
+
+    Returns:
+        list: ids of titles with wrong aggregates
+    """
+    return _sync_relevant_data(RATING_AGGREGATES_FIELDS, fix=fix)
+
+
+def update_views_and_ratings() -> dict:
+    """
+    Recompute views and ratings of all titles: single UPDATE ... FROM grouped aggregates
+    of ratings and daily views, changed rows only.
+
+    Returns:
+        dict: number of created and updated rows and timings of every phase in seconds
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    created = TitleRelevantData.objects.bulk_create(
+        [
+            TitleRelevantData(title=title)
+            for title in Title.objects.filter(relevant_data__isnull=True).only('pk')
+        ]
     )
+    timings['create'] = time.perf_counter() - started
 
-    return filtered_queryset
+    started = time.perf_counter()
+    updated = _sync_relevant_data((*RATING_AGGREGATES_FIELDS, 'views_total'))
+    timings['update'] = time.perf_counter() - started
 
+    if created or updated:
+        versions.bump_relevant_data_version()
 
-def get_title_similars(title: Title, force=True) -> Iterable[Title]:
-    queryset: QuerySet = Title.objects.enabled().exclude(pk=title.pk)
+    return {
+        'created': len(created),
+        'updated': len(updated),
+        'timings': timings,
+    }
 
-    cache_key = f'similars.{title.pk}'
-    cache_timeout = 24 * 60 * 60  # one day
-    similars = None
-    if force or (similars := cache.get(cache_key)) is None:
-        if title.watch_order_list:
-            queryset = queryset.exclude(
-                id__in=map(lambda x: x.pk, title.watch_order_list.titles)
+
+def update_ranks() -> int:
+    """
+    Rank enabled titles by number of views during last `TITLES_RANK_EPISODES_DAYS_COUNT` days.
+    Single statement writes new ranks of all titles, with rank of the last snapshot
+    before today (yesterday's, if ranks were updated yesterday) as `rank_previous`,
+    and saves them as today's snapshot in TitleRankHistory, so ranks can be updated
+    many times a day. Snapshots older than `TITLES_RANK_HISTORY_DAYS` are deleted.
+    Returns number of ranked titles
+    """
+    ranks = (
+        Title.objects.enabled()
+        .order_by()
+        .annotate(
+            count=Coalesce(
+                Sum(
+                    'daily_views__views',
+                    filter=Q(
+                        daily_views__date__gt=localdate()
+                        - timedelta(days=settings.TITLES_RANK_EPISODES_DAYS_COUNT)
+                    ),
+                ),
+                0,
+            ),
+            new_rank=Rank('count'),
+        )
+        .values('pk', 'new_rank')
+    )
+    ranks_sql, ranks_params = ranks.query.sql_with_params()
+
+    relevant_data = connection.ops.quote_name(TitleRelevantData._meta.db_table)
+    rank_history = connection.ops.quote_name(TitleRankHistory._meta.db_table)
+    today = localdate()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            with ranked as (
+                update {relevant_data}
+                set
+                    rank_previous = coalesce((
+                        select history.rank from {rank_history} as history
+                        where history.title_id = {relevant_data}.title_id
+                        and history.date < %s
+                        order by history.date desc
+                        limit 1
+                    ), 0),
+                    rank = ranks.new_rank
+                from ({ranks_sql}) as ranks
+                where {relevant_data}.title_id = ranks.id
+                returning {relevant_data}.title_id, {relevant_data}.rank
             )
+            insert into {rank_history} (title_id, date, rank)
+            select title_id, %s, rank from ranked
+            on conflict (title_id, date) do update set rank = excluded.rank
+            """,
+            (today, *ranks_params, today),
+        )
+        ranked = cursor.rowcount
+
+    versions.bump_relevant_data_version()
+
+    TitleRankHistory.objects.filter(
+        date__lt=today - timedelta(days=settings.TITLES_RANK_HISTORY_DAYS)
+    ).delete()
+
+    return ranked
 
-        similars = (
-            queryset.annotate(
-                similar_genres=Count('genres', filter=Q(genres__in=title.genres.all()))
+
+def normalize_search_text(text: str) -> str:
+    """
+    Lowercase the text, collapse whitespaces, replace "ё" with "е"
+    and fix words typed in mixed latin/cyrillic keyboard layouts
+    by replacing look-alike letters with ones of the word's main alphabet
+    """
+    words = []
+
+    for word in text.lower().replace('ё', 'е').split():
+        cyrillic = len(_cyrillic_letters_regex.findall(word))
+        latin = len(_latin_letters_regex.findall(word))
+        if cyrillic and latin:
+            word = word.translate(
+                _latin_to_cyrillic if cyrillic >= latin else _cyrillic_to_latin
             )
-            .filter(similar_genres__gte=int(title.genres.count() * 0.9))
-            .order_by('-similar_genres')[:10]
+        words.append(word)
+
+    return ' '.join(words)
+
+
+def get_search_documents(title: Title) -> List[Tuple[str, str]]:
+    """
+    Get searchable texts of the title, normalized with `normalize_search_text`.
+    Returns list of (kind, text) tuples without empty texts and duplicates
+    """
+    documents = {}
+
+    for kind, texts in (
+        (TitleSearchDocument.KINDS.name, [title.name]),
+        (TitleSearchDocument.KINDS.other_name, title.other_names),
+        (TitleSearchDocument.KINDS.character, title.characters),
+        (TitleSearchDocument.KINDS.tag, title.tags),
+    ):
+        for text in texts or []:
+            text = normalize_search_text(text or '')
+            if text:
+                documents.setdefault(text, (kind.value, text))
+
+    return list(documents.values())
+
+
+def update_search_documents(title: Title) -> bool:
+    """
+    Sync title's search documents with it's names, aliases, characters and tags.
+    Rows are rewritten only if texts were changed.
+    Returns whether texts were changed
+    """
+    documents = get_search_documents(title)
+
+    if set(documents) == set(title.search_documents.values_list('kind', 'text')):
+        return False
+
+    with transaction.atomic():
+        title.search_documents.all().delete()
+        TitleSearchDocument.objects.bulk_create(
+            TitleSearchDocument(title=title, kind=kind, text=text)
+            for kind, text in documents
         )
 
-        cache.set(cache_key, similars, cache_timeout)
+    return True
 
-    return similars
 
+def search(search_query: str, queryset: QuerySet = None) -> QuerySet:
+    """
+    Perform a search in Title's search documents.
+    Documents are matched with trigram `%` operator (pg_trgm.similarity_threshold, 0.3 by default),
+    which uses trigram index, title's similarity is the best similarity of it's documents.
+    Returns ordered QuerySet
+    """
+
+    base_queryset = queryset if queryset is not None else Title.objects.enabled()
+
+    return (
+        base_queryset.filter(search_documents__text__trigram_similar=search_query)
+        .annotate(
+            similarity=Max(TrigramSimilarity('search_documents__text', search_query))
+        )
+        .order_by('-similarity', 'pk')
+    )
+
+
+def _count_search_cache(stat: str) -> None:
+    key = SEARCH_STATS_CACHE_KEY % stat
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_search_title_ids(search_query: str) -> List[int]:
+    """
+    Perform a search of enabled titles, results are cached per search version,
+    see `versions.bump_versions`.
+    Query should be normalized with `normalize_search_text` first.
+    Returns ranked list of at most `TITLES_SEARCH_MAX_RESULTS` title ids
+    """
+    key = SEARCH_CACHE_KEY % (
+        versions.get_search_modified(),
+        hashlib.md5(search_query.encode()).hexdigest(),
+    )
+
+    title_ids = cache.get(key)
+    if title_ids is not None:
+        _count_search_cache('hits')
+        return title_ids
+
+    _count_search_cache('misses')
+    title_ids = list(
+        search(search_query).values_list('pk', flat=True)[
+            : settings.TITLES_SEARCH_MAX_RESULTS
+        ]
+    )
+    cache.set(key, title_ids, settings.TITLES_SEARCH_CACHE_TIMEOUT)
+
+    return title_ids
+
+
+def get_search_cache_stats() -> dict:
+    stats = {
+        stat: cache.get(SEARCH_STATS_CACHE_KEY % stat, 0) for stat in ('hits', 'misses')
+    }
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / total if total else 0
+    return stats
+
+
+def reset_search_cache_stats() -> None:
+    cache.delete_many([SEARCH_STATS_CACHE_KEY % stat for stat in ('hits', 'misses')])
+
+
+@cached(
+    lambda title_id: TITLE_SIMILARS_CACHE_KEY % title_id,
+    settings.TITLES_SIMILARS_CACHE_TIMEOUT,
+)
+def _get_title_similar_ids(title_id: int) -> List[int]:
+    return list(
+        TitleSimilar.objects.filter(title=title_id).values_list(
+            'similar_title_id', flat=True
+        )
+    )
+
+
+def get_title_similars(title: Title) -> Iterable[Title]:
+    """
+    Get precomputed similar titles (see apps.titles.similars).
+    Only their ids are cached, so titles disabled or changed since then
+    are never served from cache.
+    Returns titles ordered by similarity
+    """
+    similar_ids = _get_title_similar_ids(title.pk)
+    titles = Title.objects.enabled().in_bulk(similar_ids)
+    return [titles[pk] for pk in similar_ids if pk in titles][
+        : settings.TITLES_SIMILARS_LIMIT
+    ]
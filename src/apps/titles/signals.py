@@ -0,0 +1,88 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, facets, services, similars, versions
+from .models import Title
+
+
+@receiver(post_save, sender=Title, dispatch_uid='title_facets_save_signal')
+@receiver(post_delete, sender=Title, dispatch_uid='title_facets_delete_signal')
+def title_facets_signal(**kwargs):
+    facets.schedule_update()
+
+
+@receiver(
+    m2m_changed, sender=Title.genres.through, dispatch_uid='title_genres_facets_signal'
+)
+@receiver(
+    m2m_changed,
+    sender=Title.countries.through,
+    dispatch_uid='title_countries_facets_signal',
+)
+@receiver(
+    m2m_changed,
+    sender=Title.studios.through,
+    dispatch_uid='title_studios_facets_signal',
+)
+def title_relations_facets_signal(action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        facets.schedule_update()
+
+
+@receiver(
+    m2m_changed,
+    sender=Title.genres.through,
+    dispatch_uid='title_genres_similars_signal',
+)
+def title_genres_similars_signal(action, instance, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # for reverse relation (genre.title_set) `pk_set` contains titles
+        title_ids = pk_set if reverse else [instance.pk]
+        if title_ids:
+            similars.schedule_update(title_ids)
+
+
+@receiver(pre_save, sender=Title, dispatch_uid='title_was_enabled_signal')
+def title_was_enabled_signal(instance, **kwargs):
+    # slug of enabled title before the change, None if it wasn't enabled
+    instance._previous_slug = (
+        Title.objects.enabled()
+        .filter(pk=instance.pk)
+        .values_list('slug', flat=True)
+        .first()
+        if instance.pk is not None
+        else None
+    )
+    instance._was_enabled = instance._previous_slug is not None
+
+
+@receiver(post_save, sender=Title, dispatch_uid='title_search_documents_signal')
+def title_search_documents_signal(instance, **kwargs):
+    was_enabled = getattr(instance, '_was_enabled', False)
+    changed = services.update_search_documents(instance)
+
+    if was_enabled != instance.is_enabled or (
+        changed and (was_enabled or instance.is_enabled)
+    ):
+        versions.bump_versions(search=True)
+
+
+@receiver(post_save, sender=Title, dispatch_uid='title_versions_save_signal')
+def title_versions_save_signal(instance, **kwargs):
+    # titles are shown in updates list, so it's bumped on any title change
+    versions.bump_versions(
+        [instance.pk],
+        [instance.slug, getattr(instance, '_previous_slug', None)],
+        updates=True,
+    )
+
+
+@receiver(post_delete, sender=Title, dispatch_uid='title_versions_delete_signal')
+def title_versions_delete_signal(instance, **kwargs):
+    versions.bump_versions([instance.pk], [instance.slug], search=True, updates=True)
+
+
+@receiver(post_save, sender=Title, dispatch_uid='title_autocomplete_save_signal')
+@receiver(post_delete, sender=Title, dispatch_uid='title_autocomplete_delete_signal')
+def title_autocomplete_signal(instance, **kwargs):
+    autocomplete.schedule_update([instance.pk])
@@ -0,0 +1,332 @@
+"""
+Precomputed similar titles.
+
+Similarity is computed in one batch for all enabled titles. Features (genres, studios,
+countries, tags) of the whole catalog are loaded with a few queries and encoded
+as sparse binary title x feature value matrices, so intersections of a batch of titles
+with the whole catalog are counted with a few vectorized operations.
+Results are stored in `TitleSimilar` table, so title page reads them with a single query.
+"""
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Title, TitleSimilar, WatchOrderItem
+from .services import TITLE_SIMILARS_CACHE_KEY
+
+logger = logging.getLogger(__name__)
+
+# weight of every feature's similarity in the final score
+FEATURES_WEIGHTS = (
+    ('genres', 0.5),
+    ('studios', 0.2),
+    ('countries', 0.1),
+    ('tags', 0.2),
+)
+
+METRICS = ('jaccard', 'cosine')
+
+
+def get_features() -> Dict[int, dict]:
+    """Load similarity features of all enabled titles
+
+    Returns:
+        dict: title id to dict of features sets and watch order list id
+    """
+    titles = Title.objects.enabled()
+    features = {
+        pk: {
+            'genres': set(),
+            'studios': set(),
+            'countries': set(),
+            'tags': {tag.strip().lower() for tag in tags},
+            'watch_order_list': None,
+        }
+        for pk, tags in titles.values_list('pk', 'tags')
+    }
+
+    for feature, related_field in (
+        ('genres', 'genre_id'),
+        ('studios', 'studio_id'),
+        ('countries', 'country_id'),
+    ):
+        through = Title._meta.get_field(feature).remote_field.through
+        for title_id, related_id in through.objects.filter(
+            title__in=titles
+        ).values_list('title_id', related_field):
+            features[title_id][feature].add(related_id)
+
+    for title_id, watch_order_list_id in WatchOrderItem.objects.filter(
+        title__in=titles
+    ).values_list('title_id', 'watch_order_list_id'):
+        features[title_id]['watch_order_list'] = watch_order_list_id
+
+    return features
+
+
+def _concatenate_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenated `np.arange(start, end)` of every pair of `starts` and `ends`"""
+    lengths = ends - starts
+    return np.arange(lengths.sum()) + np.repeat(
+        starts - np.cumsum(lengths) + lengths, lengths
+    )
+
+
+class SimilarityEngine:
+    """Top-K similar titles over sparse binary feature matrices
+
+    Only feature values shared by at least two titles become matrix columns:
+    unique values never intersect, but they are still counted in sets sizes.
+    Matrices are stored as arrays of values of every title and titles of every value
+    (CSR and CSC layouts), so memory grows with number of titles' values,
+    not with number of distinct values (thousands of tags).
+
+    Title and similar title must not be in the same watch order list
+    and similar title must have at least `TITLES_SIMILARS_MIN_GENRES_RATIO` of title's genres.
+    """
+
+    def __init__(
+        self, features: Dict[int, dict], metric: str = 'jaccard', batch_size: int = 512
+    ):
+        if metric not in METRICS:
+            raise ValueError(f'{metric} not exists in {METRICS}')
+
+        self.metric = metric
+        self.batch_size = batch_size
+        self.ids = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+        self.positions = {pk: position for position, pk in enumerate(features)}
+
+        self.matrices = {}
+        self.sizes = {}
+        for feature, _ in FEATURES_WEIGHTS:
+            self.matrices[feature], self.sizes[feature] = self._encode(
+                features, feature
+            )
+
+        self.watch_order_lists = np.fromiter(
+            (
+                title_features['watch_order_list'] or 0
+                for title_features in features.values()
+            ),
+            dtype=np.int64,
+            count=len(features),
+        )
+
+    def _encode(self, features: Dict[int, dict], feature: str):
+        counter = Counter(
+            value
+            for title_features in features.values()
+            for value in title_features[feature]
+        )
+        columns = {
+            value: column
+            for column, value in enumerate(
+                value for value, count in counter.items() if count > 1
+            )
+        }
+
+        rows_counts = np.zeros(len(features), dtype=np.int64)
+        matrix_columns = []
+        sizes = np.zeros(len(features), dtype=np.float32)
+        for row, title_features in enumerate(features.values()):
+            sizes[row] = len(title_features[feature])
+            for value in title_features[feature]:
+                if (column := columns.get(value)) is not None:
+                    rows_counts[row] += 1
+                    matrix_columns.append(column)
+
+        # values of every title
+        rows_indptr = np.concatenate(([0], np.cumsum(rows_counts)))
+        matrix_columns = np.array(matrix_columns, dtype=np.int64)
+        # titles of every value
+        columns_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(matrix_columns, minlength=len(columns))))
+        )
+        columns_rows = np.repeat(np.arange(len(features)), rows_counts)[
+            np.argsort(matrix_columns, kind='stable')
+        ]
+
+        return (rows_indptr, matrix_columns, columns_indptr, columns_rows), sizes
+
+    def _intersections(self, rows: np.ndarray, feature: str) -> np.ndarray:
+        """Numbers of common values of `rows` titles with every title"""
+        rows_indptr, matrix_columns, columns_indptr, columns_rows = self.matrices[
+            feature
+        ]
+
+        # (batch row, value) pairs, then (batch row, title having the value) pairs
+        starts, ends = rows_indptr[rows], rows_indptr[rows + 1]
+        batch_rows = np.repeat(np.arange(len(rows)), ends - starts)
+        columns = matrix_columns[_concatenate_ranges(starts, ends)]
+
+        starts, ends = columns_indptr[columns], columns_indptr[columns + 1]
+        batch_rows = np.repeat(batch_rows, ends - starts)
+        titles = columns_rows[_concatenate_ranges(starts, ends)]
+
+        # only a batch of intersections with the whole catalog is dense
+        return (
+            np.bincount(
+                batch_rows * len(self.ids) + titles,
+                minlength=len(rows) * len(self.ids),
+            )
+            .reshape(len(rows), len(self.ids))
+            .astype(np.float32)
+        )
+
+    def _similarity(self, rows: np.ndarray, feature: str):
+        sizes = self.sizes[feature]
+        intersections = self._intersections(rows, feature)
+
+        if self.metric == 'cosine':
+            denominators = np.sqrt(np.outer(sizes[rows], sizes))
+        else:
+            denominators = sizes[rows, None] + sizes[None, :] - intersections
+
+        similarity = np.divide(
+            intersections,
+            denominators,
+            out=np.zeros_like(intersections),
+            where=denominators > 0,
+        )
+        return similarity, intersections
+
+    def _batch_scores(self, rows: np.ndarray) -> np.ndarray:
+        """Scores of `rows` titles with every title, -1 for not allowed pairs"""
+        scores = np.zeros((len(rows), len(self.ids)), dtype=np.float32)
+        for feature, weight in FEATURES_WEIGHTS:
+            similarity, intersections = self._similarity(rows, feature)
+            scores += weight * similarity
+            if feature == 'genres':
+                genres_intersections = intersections
+
+        min_genres = np.floor(
+            self.sizes['genres'][rows] * settings.TITLES_SIMILARS_MIN_GENRES_RATIO
+        )
+        allowed = (genres_intersections > 0) & (
+            genres_intersections >= min_genres[:, None]
+        )
+
+        # exclude title itself and titles of the same watch order list
+        allowed[np.arange(len(rows)), rows] = False
+        watch_order_lists = self.watch_order_lists[rows, None]
+        allowed &= (watch_order_lists == 0) | (
+            watch_order_lists != self.watch_order_lists[None, :]
+        )
+
+        return np.where(allowed, scores, -1)
+
+    def top_k(
+        self, title_ids: Iterable[int], k: int
+    ) -> Dict[int, List[Tuple[int, float]]]:
+        """Compute `k` most similar titles of `title_ids`
+
+        Returns:
+            dict: title id to list of (similar title id, score) ordered by score
+        """
+        rows = np.array([self.positions[pk] for pk in title_ids], dtype=np.int64)
+        similars = {}
+
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start : start + self.batch_size]
+            scores = self._batch_scores(batch)
+
+            if len(self.ids) > k:
+                candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.tile(np.arange(len(self.ids)), (len(batch), 1))
+
+            for row, title_scores, title_candidates in zip(batch, scores, candidates):
+                title_candidates = title_candidates[title_scores[title_candidates] >= 0]
+                # order by score, then by id to be deterministic
+                title_candidates = title_candidates[
+                    np.lexsort(
+                        (self.ids[title_candidates], -title_scores[title_candidates])
+                    )
+                ]
+                similars[int(self.ids[row])] = [
+                    (int(self.ids[candidate]), float(title_scores[candidate]))
+                    for candidate in title_candidates
+                ]
+
+        return similars
+
+
+def save_similars(similars: Dict[int, List[Tuple[int, float]]]) -> int:
+    """Replace stored similar titles of given titles. Returns number of created rows"""
+    with transaction.atomic():
+        TitleSimilar.objects.filter(title_id__in=similars.keys()).delete()
+        created = TitleSimilar.objects.bulk_create(
+            (
+                TitleSimilar(title_id=pk, similar_title_id=similar_pk, score=score)
+                for pk, title_similars in similars.items()
+                for similar_pk, score in title_similars
+            ),
+            batch_size=1000,
+        )
+
+    cache.delete_many([TITLE_SIMILARS_CACHE_KEY % pk for pk in similars])
+    return len(created)
+
+
+def update_similars(
+    title_ids: Optional[Iterable[int]] = None, metric: str = 'jaccard'
+) -> dict:
+    """Recompute similar titles.
+
+    Args:
+        title_ids (Iterable[int], optional): Recompute only these titles and titles
+            that have them as similar. Defaults to None - recompute all titles.
+        metric (str, optional): Features similarity metric, "jaccard" or "cosine"
+
+    Returns:
+        dict: number of computed titles, stored rows and timings of every phase in seconds
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    features = get_features()
+    timings['load'] = time.perf_counter() - started
+
+    if title_ids is None:
+        title_ids = list(features.keys())
+        # drop similars of titles which are not enabled anymore
+        TitleSimilar.objects.exclude(title_id__in=title_ids).delete()
+    else:
+        title_ids = set(title_ids) | set(
+            TitleSimilar.objects.filter(similar_title__in=title_ids).values_list(
+                'title_id', flat=True
+            )
+        )
+        title_ids = [pk for pk in title_ids if pk in features]
+
+    started = time.perf_counter()
+    engine = SimilarityEngine(features, metric=metric)
+    timings['encode'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    similars = engine.top_k(title_ids, settings.TITLES_SIMILARS_LIMIT)
+    timings['compute'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = save_similars(similars)
+    timings['save'] = time.perf_counter() - started
+
+    return {'titles': len(title_ids), 'rows': rows, 'timings': timings}
+
+
+def schedule_update(title_ids: Iterable[int]):
+    """Schedule recomputing of `title_ids` similars once current transaction is committed"""
+    title_ids = list(title_ids)
+
+    def _schedule():
+        from .tasks import update_title_similars
+
+        update_title_similars.delay(title_ids)
+
+    transaction.on_commit(_schedule)
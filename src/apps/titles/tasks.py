@@ -1,18 +1,12 @@
 from __future__ import absolute_import, unicode_literals
 
 import logging
-from datetime import datetime, timedelta
 
 from celery import shared_task
-from django.conf import settings
-from django.db.models import Avg, Count, Q
-from django.utils.timezone import now
 
-from apps.core.query import Rank
-from apps.titles.models import Title, TitleRelevantData
-from apps.users.models import ViewedEpisode
+from apps.api import home
 
-from .models import Title, TitleRelevantData
+from . import autocomplete, facets, services, similars, trending, viewcounts
 
 logger = logging.getLogger(__name__)
 
@@ -21,27 +15,34 @@ logger = logging.getLogger(__name__)
 def update_title_ranks():
     logger.info('Updating title\'s rank')
     try:
-        titles = (
-            Title.objects.enabled()
-            .annotate(
-                count=Count(
-                    'translation__episode__viewed',
-                    filter=Q(
-                        translation__episode__viewed__date_created__gte=now()
-                        - timedelta(days=settings.TITLES_RANK_EPISODES_DAYS_COUNT)
-                    ),
-                ),
-                new_rank=Rank('count'),
-            )
-            .distinct()
-        )
+        ranked = services.update_ranks()
+        logger.info('Successfully updated title\'s ranks, %s titles', ranked)
+        home.schedule_update()
+    except Exception as ex:
+        logger.exception(ex)
 
-        for title in titles:
-            title.relevant_data.rank_previous = title.relevant_data.rank
-            title.relevant_data.rank = title.new_rank
-            title.relevant_data.save()
 
-        logger.info('Successfully updated title\'s ranks')
+@shared_task
+def flush_title_views():
+    logger.info('Flushing title\'s views')
+    try:
+        flushed = viewcounts.flush_views()
+        logger.info('Successfully flushed title\'s views, %s views', flushed)
+    except Exception as ex:
+        logger.exception(ex)
+
+
+@shared_task
+def update_title_trending():
+    logger.info('Updating title\'s trending scores')
+    try:
+        result = trending.update_scores()
+        logger.info(
+            'Successfully updated title\'s trending scores: '
+            '%s decayed scores, %s deleted hourly views',
+            result['decayed'],
+            result['deleted'],
+        )
     except Exception as ex:
         logger.exception(ex)
 
@@ -51,28 +52,68 @@ def update_title_viewes_and_ratings():
     logger.info('Updating title\'s views and ratings')
 
     try:
-        for title in Title.objects.enabled():
-            # if for some reason we title doesn't have relevant_data - create it
-            if not title.relevant_data:
-                TitleRelevantData.objects.create(title=title)
+        result = services.update_views_and_ratings()
+        logger.info(
+            'Successfully updated title\'s views and ratings: '
+            '%s created, %s updated rows, timings %s',
+            result['created'],
+            result['updated'],
+            ', '.join(
+                f'{phase} {seconds:.3f}s'
+                for phase, seconds in result['timings'].items()
+            ),
+        )
+
+    except Exception as ex:
+        logger.exception(ex)
 
-            # total number of user ratings for this title
-            title.relevant_data.rating_total = title.ratings.count()
 
-            # averate user rating's rate for this title
-            title.relevant_data.rating_average = (
-                title.ratings.aggregate(Avg('rate'))['rate__avg'] or 0
-            )
+@shared_task
+def update_title_facets():
+    logger.info('Updating title\'s facets index')
+    try:
+        index = facets.update_index()
+        logger.info(
+            'Successfully updated title\'s facets index, version %s, %s titles',
+            index.version,
+            index.size,
+        )
+    except Exception as ex:
+        logger.exception(ex)
 
-            views_queryset = ViewedEpisode.objects.filter(
-                episode__translation__title=title
-            )
 
-            # title total views
-            title.relevant_data.views_total = views_queryset.count()
+@shared_task
+def update_title_autocomplete():
+    logger.info('Updating title\'s autocomplete index')
+    try:
+        index = autocomplete.update_index()
+        logger.info(
+            'Successfully updated title\'s autocomplete index, version %s, %s titles',
+            index.version,
+            len(index.titles),
+        )
+    except Exception as ex:
+        logger.exception(ex)
 
-            title.relevant_data.save()
-        logger.info('Successfully updated title\'s views and ratings')
 
+@shared_task
+def update_title_similars(title_ids: list = None):
+    """Recompute similar titles.
+
+    Args:
+        title_ids (list, optional): Titles to recompute. Defaults to None - all titles.
+    """
+    logger.info('Updating title\'s similars')
+    try:
+        result = similars.update_similars(title_ids)
+        logger.info(
+            'Successfully updated title\'s similars: %s titles, %s rows, timings %s',
+            result['titles'],
+            result['rows'],
+            ', '.join(
+                f'{phase} {seconds:.3f}s'
+                for phase, seconds in result['timings'].items()
+            ),
+        )
     except Exception as ex:
         logger.exception(ex)
@@ -1,6 +1,8 @@
 import json
 
-from core.tests import BaseTestCase
+from django.test import SimpleTestCase, override_settings
+
+from core.tests import DUMMY_CACHE_SETTINGS, REDIS_TEST_CACHE_SETTINGS, BaseTestCase
 
 
 class TitlesEndpointsTest(BaseTestCase):
@@ -13,6 +15,7 @@ class TitlesEndpointsTest(BaseTestCase):
             'populars',
             'current-season',
             'latests',
+            'facets',
         ]
 
     def test_titles_endpoints(self):
@@ -22,3 +25,813 @@ class TitlesEndpointsTest(BaseTestCase):
             self.assertIsInstance(
                 json.loads(response.content), (dict, list),
             )
+
+    def test_titles_fields(self):
+        response = self.client.get('/titles/titles/?fields=card')
+        self.assertEqual(response.status_code, 200)
+        title = json.loads(response.content)['results'][0]
+        self.assertNotIn('translations', title)
+        self.assertNotIn('similars', title)
+        self.assertIn('last_episode', title)
+
+        response = self.client.get('/titles/titles/?fields=name,slug')
+        self.assertEqual(
+            set(json.loads(response.content)['results'][0]), {'name', 'slug'}
+        )
+
+        response = self.client.get('/titles/titles/?fields=name,unknown')
+        self.assertEqual(response.status_code, 400)
+
+    def test_titles_cursor_pagination(self):
+        slugs = []
+        url = '/titles/titles/?cursor=&limit=3&ordering=-name'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            self.assertNotIn('count', data)
+            slugs.extend(title['slug'] for title in data['results'])
+            url = data['next']
+
+        self.assertEqual(len(slugs), 10)
+        self.assertEqual(len(set(slugs)), 10)
+
+        response = self.client.get('/titles/titles/?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
+
+class TitleValuesSerializerTest(BaseTestCase):
+    """Fast path serializer must give the same output as TitleSerializer"""
+
+    def setUp(self):
+        from apps.content.models import Genre
+        from apps.titles.models import Title
+
+        self._setup_test_titles(number=3)
+        genres = [Genre.objects.create(name=name, slug=name) for name in ('b', 'a')]
+        for title in Title.objects.all()[:2]:
+            title.genres.add(*genres)
+
+    def _assert_same_output(self, fields):
+        from rest_framework.renderers import JSONRenderer
+
+        from apps.titles.models import Title
+        from apps.titles.serializers import TitleSerializer, title_values
+
+        queryset = (
+            Title.objects.enabled().select_related('relevant_data').order_by('pk')
+        )
+        self.assertEqual(
+            JSONRenderer().render(title_values.serialize(queryset, fields)),
+            JSONRenderer().render(
+                TitleSerializer(queryset, many=True, fields=fields).data
+            ),
+        )
+
+    def test_same_output(self):
+        from apps.titles.serializers import title_values
+        from apps.titles.views import TitleSparseFieldsMixin
+
+        self._assert_same_output(TitleSparseFieldsMixin.projections['card'])
+        self._assert_same_output(tuple(title_values.fields))
+        self._assert_same_output(('name', 'translations'))
+
+    def test_titles_endpoint(self):
+        response = self.client.get('/titles/titles/?fields=card&cursor=&limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(len(data['results']), 2)
+
+        response = self.client.get(data['next'])
+        self.assertEqual(len(json.loads(response.content)['results']), 1)
+
+
+class TitleLastEpisodeTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_last_episode(self):
+        from apps.titles.models import TitleRelevantData
+        from apps.translations.models import Episode
+
+        relevant_data = TitleRelevantData.objects.first()
+        self.assertEqual(relevant_data.last_episode, 2)
+
+        episode = Episode.objects.get(
+            translation__title=relevant_data.title_id, number=2
+        )
+        episode.delete()
+        relevant_data.refresh_from_db()
+        self.assertEqual(relevant_data.last_episode, 1)
+
+
+class TitleSimilarsTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    @override_settings(**DUMMY_CACHE_SETTINGS)
+    def test_update_similars(self):
+        from apps.content.models import Genre
+        from apps.titles.models import Title
+        from apps.titles.services import get_title_similars
+        from apps.titles.similars import update_similars
+
+        genre = Genre.objects.create(name='test', slug='test')
+        titles = list(Title.objects.enabled())
+        for title in titles[:2]:
+            title.genres.add(genre)
+
+        update_similars()
+
+        self.assertEqual(get_title_similars(titles[0]), [titles[1]])
+        self.assertEqual(get_title_similars(titles[2]), [])
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    )
+    def test_disabled_similar_title(self):
+        from django.core.cache import cache
+
+        from apps.content.models import Genre
+        from apps.titles.models import Title
+        from apps.titles.services import get_title_similars
+        from apps.titles.similars import update_similars
+
+        cache.clear()
+        genre = Genre.objects.create(name='test', slug='test')
+        titles = list(Title.objects.enabled())
+        for title in titles[:2]:
+            title.genres.add(genre)
+
+        update_similars()
+        self.assertEqual(get_title_similars(titles[0]), [titles[1]])
+
+        # similar titles are cached, but disabled one isn't served anymore
+        Title.objects.filter(pk=titles[1].pk).update(
+            inner_status=Title.INNER_STATUSES.off
+        )
+        self.assertEqual(get_title_similars(titles[0]), [])
+
+
+@override_settings(TITLES_SIMILARS_MIN_GENRES_RATIO=0.9)
+class SimilarityEngineTest(SimpleTestCase):
+    def _get_features(self):
+        def title(genres, studios, countries, tags, watch_order_list=None):
+            return {
+                'genres': set(genres),
+                'studios': set(studios),
+                'countries': set(countries),
+                'tags': set(tags),
+                'watch_order_list': watch_order_list,
+            }
+
+        return {
+            1: title({1, 2}, {1}, {1}, {'a', 'b'}),
+            2: title({1, 2}, {1}, {2}, {'a'}),
+            3: title({1, 2}, {2}, {1}, {'c'}, watch_order_list=7),
+            4: title({1, 2}, {1}, {1}, {'a', 'b'}, watch_order_list=7),
+            5: title({3}, {1}, {1}, {'a', 'b'}),
+        }
+
+    def _top_k(self, engine, title_ids, k=10):
+        return {
+            pk: [(similar_pk, round(score, 4)) for similar_pk, score in similars]
+            for pk, similars in engine.top_k(title_ids, k).items()
+        }
+
+    def test_jaccard(self):
+        from apps.titles.similars import SimilarityEngine
+
+        engine = SimilarityEngine(self._get_features(), metric='jaccard')
+
+        self.assertEqual(
+            self._top_k(engine, [1, 3, 5]),
+            {
+                1: [(4, 1.0), (2, 0.8), (3, 0.6)],
+                # same watch order list
+                3: [(1, 0.6), (2, 0.5)],
+                # no common genres
+                5: [],
+            },
+        )
+        self.assertEqual(self._top_k(engine, [1], k=2), {1: [(4, 1.0), (2, 0.8)]})
+
+    def test_cosine(self):
+        from apps.titles.similars import SimilarityEngine
+
+        engine = SimilarityEngine(self._get_features(), metric='cosine')
+
+        # tags: 1 / sqrt(2 * 1) of title 2 instead of 1 / 2 of jaccard
+        self.assertEqual(
+            self._top_k(engine, [1, 2]),
+            {
+                1: [(4, 1.0), (2, 0.8414), (3, 0.6)],
+                2: [(1, 0.8414), (4, 0.8414), (3, 0.5)],
+            },
+        )
+
+    def test_batches(self):
+        from apps.titles.similars import SimilarityEngine
+
+        features = self._get_features()
+        self.assertEqual(
+            self._top_k(SimilarityEngine(features, batch_size=2), features),
+            self._top_k(SimilarityEngine(features), features),
+        )
+
+    def test_unknown_metric(self):
+        from apps.titles.similars import SimilarityEngine
+
+        with self.assertRaises(ValueError):
+            SimilarityEngine(self._get_features(), metric='euclidean')
+
+
+@override_settings(**DUMMY_CACHE_SETTINGS)
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class TitleFacetsTest(BaseTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        from apps.content.models import Country, Genre, Studio
+        from apps.titles.models import Title
+
+        cache.clear()
+        self._setup_test_titles(number=4)
+
+        genres = {slug: Genre.objects.create(name=slug, slug=slug) for slug in 'abc'}
+        countries = {
+            slug: Country.objects.create(name=slug, slug=slug) for slug in ('jp', 'us')
+        }
+        studios = {
+            slug: Studio.objects.create(name=slug, slug=slug) for slug in ('s1', 's2')
+        }
+
+        self.titles = list(Title.objects.enabled().order_by('pk'))
+        for title, year, title_genres, country, studio in zip(
+            self.titles,
+            (2010, 2015, 2020, 2020),
+            ('ab', 'a', 'b', 'c'),
+            ('jp', 'us', 'jp', 'jp'),
+            ('s1', 's2', 's1', None),
+        ):
+            Title.objects.filter(pk=title.pk).update(year=year)
+            title.genres.add(*(genres[slug] for slug in title_genres))
+            title.countries.add(countries[country])
+            if studio:
+                title.studios.add(studios[studio])
+
+    def test_count(self):
+        from apps.titles.facets import update_index
+
+        index = update_index()
+
+        result = index.count({})
+        self.assertEqual(result['total'], 4)
+        self.assertEqual(result['facets']['genres'], {'a': 2, 'b': 2, 'c': 1})
+        self.assertEqual(result['facets']['studios'], {'s1': 2, 's2': 1})
+        self.assertEqual(result['facets']['year'], {'2010': 1, '2015': 1, '2020': 2})
+
+        # values of the same facet are OR'ed
+        self.assertEqual(index.count({'genres': ['a', 'c']})['total'], 3)
+        self.assertEqual(index.count({'countries': ['jp', 'us']})['total'], 4)
+        self.assertEqual(index.count({'studios': ['s1', 's2']})['total'], 3)
+
+        # facet's own filter isn't applied to its own counts, but to the others
+        result = index.count({'genres': ['a']})
+        self.assertEqual(result['total'], 2)
+        self.assertEqual(result['facets']['genres'], {'a': 2, 'b': 2, 'c': 1})
+        self.assertEqual(result['facets']['countries'], {'jp': 1, 'us': 1})
+
+        # different facets are AND'ed
+        result = index.count({'genres': ['b'], 'countries': ['jp']})
+        self.assertEqual(result['total'], 2)
+        self.assertEqual(result['facets']['genres'], {'a': 1, 'b': 2, 'c': 1})
+        self.assertEqual(result['facets']['countries'], {'jp': 2, 'us': 0})
+        self.assertEqual(result['facets']['studios'], {'s1': 2, 's2': 0})
+
+    def test_count_years(self):
+        from apps.titles.facets import update_index
+
+        index = update_index()
+
+        self.assertEqual(
+            index.count({'year__gte': 2012, 'year__lte': 2020})['total'], 3
+        )
+        self.assertEqual(index.count({'year__gte': 2015})['total'], 3)
+        self.assertEqual(index.count({'year__lte': 2015})['total'], 2)
+
+        result = index.count({'year__gte': 2016, 'studios': ['s1']})
+        self.assertEqual(result['total'], 1)
+        # years range isn't applied to years counts
+        self.assertEqual(result['facets']['year'], {'2010': 1, '2015': 0, '2020': 1})
+        self.assertEqual(result['facets']['studios'], {'s1': 1, 's2': 0})
+
+    def test_update_index(self):
+        from apps.content.models import Genre
+        from apps.titles.facets import get_index, update_index
+        from apps.titles.models import Title
+
+        update_index()
+        self.titles[3].genres.add(Genre.objects.get(slug='a'))
+
+        # index is rebuilt by scheduled task, so it's unchanged until then
+        self.assertEqual(get_index().count({'genres': ['a']})['total'], 2)
+
+        update_index()
+        self.assertEqual(get_index().count({'genres': ['a']})['total'], 3)
+
+        Title.objects.filter(pk=self.titles[1].pk).update(
+            inner_status=Title.INNER_STATUSES.off
+        )
+        update_index()
+        result = get_index().count({})
+        self.assertEqual(result['total'], 3)
+        self.assertEqual(result['facets']['countries'], {'jp': 3})
+
+
+class TitleSearchTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_search(self):
+        from apps.titles.models import Title
+
+        title = Title.objects.enabled().first()
+        title.name = 'Shingeki no Kyojin'
+        title.other_names = ['Attack on Titan', 'attack on titan', '']
+        title.save()
+
+        self.assertEqual(title.search_documents.count(), 2)
+
+        response = self.client.get('/titles/search/?q=attack titan')
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)['results']
+        self.assertEqual([result['slug'] for result in results], [title.slug])
+
+        title.other_names = []
+        title.save()
+
+        response = self.client.get('/titles/search/?q=attack titan')
+        self.assertEqual(json.loads(response.content)['results'], [])
+
+        response = self.client.get('/titles/search/?q=at')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    )
+    def test_search_cache(self):
+        from apps.titles.models import Title
+        from apps.titles.services import (
+            get_search_cache_stats,
+            get_search_title_ids,
+            normalize_search_text,
+        )
+
+        title = Title.objects.enabled().first()
+        title.name = 'Атака титанов'
+        title.save()
+
+        self.assertEqual(
+            normalize_search_text(' AТАКА  Титанов'),
+            normalize_search_text('атака титанов'),
+        )
+
+        for query in (' AТАКА  Титанов', 'атака титанов'):
+            self.assertEqual(
+                get_search_title_ids(normalize_search_text(query)), [title.pk]
+            )
+
+        stats = get_search_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+class TitleAutocompleteTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_autocomplete(self):
+        from apps.titles.autocomplete import SearchIndex
+        from apps.titles.models import Title
+
+        title = Title.objects.enabled().first()
+        title.name = 'Shingeki no Kyojin'
+        title.other_names = ['Attack on Titan']
+        title.save()
+
+        index = SearchIndex.build(version=0)
+        self.assertEqual(
+            [result['slug'] for result in index.search('attack titan', 10)],
+            [title.slug],
+        )
+
+        title.other_names = []
+        title.save()
+        index.update([title.pk], version=1)
+        self.assertEqual(index.search('attack titan', 10), [])
+        self.assertEqual(index.search('kyojin', 10)[0]['slug'], title.slug)
+
+        response = self.client.get('/titles/autocomplete/?q=kyojin')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(json.loads(response.content), list)
+
+
+class TitleRatingAggregatesTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_rating_aggregates(self):
+        from apps.titles.models import Title
+        from apps.titles.services import reconcile_rating_aggregates
+
+        title = Title.objects.enabled().first()
+
+        for rate in (8, 6, 6):
+            user, token = self._setup_test_user()
+            response = self.client.post(
+                '/users/title-ratings/',
+                {'title': title.slug, 'rate': rate},
+                **self._get_auth_headers(token),
+            )
+            self.assertEqual(response.status_code, 201)
+
+        # change the last rate and remove it
+        response = self.client.post(
+            '/users/title-ratings/',
+            {'title': title.slug, 'rate': 10},
+            **self._get_auth_headers(token),
+        )
+        self.assertEqual(response.status_code, 201)
+
+        relevant_data = title.relevant_data
+        relevant_data.refresh_from_db()
+        self.assertEqual(relevant_data.rating_total, 3)
+        self.assertEqual(relevant_data.rating_sum, 24)
+        self.assertEqual(relevant_data.rating_histogram, [0, 0, 0, 0, 0, 1, 0, 1, 0, 1])
+        self.assertEqual(str(relevant_data.rating_average), '8.00')
+        self.assertEqual(reconcile_rating_aggregates(), [])
+
+        response = self.client.delete(
+            f'/users/title-ratings/{title.slug}/delete', **self._get_auth_headers(token)
+        )
+        self.assertEqual(response.status_code, 204)
+
+        relevant_data.refresh_from_db()
+        self.assertEqual(relevant_data.rating_total, 2)
+        self.assertEqual(relevant_data.rating_histogram[9], 0)
+        self.assertEqual(str(relevant_data.rating_average), '7.00')
+        self.assertEqual(reconcile_rating_aggregates(), [])
+
+
+class TitleViewsAndRatingsTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_update_views_and_ratings(self):
+        from django.utils.timezone import localdate
+
+        from apps.titles.models import TitleRelevantData, TitleViews
+        from apps.titles.services import update_views_and_ratings
+        from apps.translations.models import Episode
+
+        episode = Episode.objects.first()
+        TitleViews.objects.create(
+            title_id=episode.translation.title_id, date=localdate(), views=1
+        )
+        TitleRelevantData.objects.update(rating_total=5)
+
+        result = update_views_and_ratings()
+        self.assertEqual(result['updated'], 3)
+
+        relevant_data = TitleRelevantData.objects.get(
+            title=episode.translation.title_id
+        )
+        self.assertEqual(relevant_data.views_total, 1)
+        self.assertEqual(relevant_data.rating_total, 0)
+
+        self.assertEqual(update_views_and_ratings()['updated'], 0)
+
+
+class TitleRanksTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_update_ranks(self):
+        from datetime import timedelta
+
+        from django.utils.timezone import localdate
+
+        from apps.titles.models import TitleRankHistory, TitleRelevantData, TitleViews
+        from apps.titles.services import update_ranks
+        from apps.translations.models import Episode
+
+        title = Episode.objects.first().translation.title
+        TitleViews.objects.create(title=title, date=localdate(), views=1)
+        TitleRankHistory.objects.create(
+            title=title, date=localdate() - timedelta(days=1), rank=3
+        )
+
+        # previous rank is yesterday's one however many times ranks are updated today
+        self.assertEqual(update_ranks(), 3)
+        self.assertEqual(update_ranks(), 3)
+
+        relevant_data = TitleRelevantData.objects.get(title=title)
+        self.assertEqual((relevant_data.rank, relevant_data.rank_previous), (1, 3))
+        self.assertEqual(
+            set(TitleRelevantData.objects.values_list('rank', flat=True)), {1, 2}
+        )
+        self.assertEqual(
+            set(
+                TitleRelevantData.objects.exclude(title=title).values_list(
+                    'rank_previous', flat=True
+                )
+            ),
+            {0},
+        )
+        self.assertEqual(TitleRankHistory.objects.count(), 4)
+
+        response = self.client.get(f'/titles/titles/{title.slug}/rank-history/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['rank'] for item in json.loads(response.content)], [3, 1]
+        )
+
+
+@override_settings(**REDIS_TEST_CACHE_SETTINGS)
+class TitleViewCountsTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def tearDown(self):
+        from django_redis import get_redis_connection
+
+        get_redis_connection().flushdb()
+
+    def test_flush_views(self):
+        from django.utils.timezone import localdate
+
+        from apps.titles.models import EpisodeViews, TitleRelevantData, TitleViews
+        from apps.titles.viewcounts import count_view, flush_views
+        from apps.translations.models import Episode
+
+        episode = Episode.objects.first()
+        for viewer in ('u1', 'u1', 'a127.0.0.1'):
+            count_view(episode.pk, episode.translation.title_id, viewer)
+
+        self.assertEqual(flush_views(), 3)
+
+        title_views = TitleViews.objects.get(
+            title=episode.translation.title_id, date=localdate()
+        )
+        self.assertEqual((title_views.views, title_views.unique_viewers), (3, 2))
+        self.assertEqual(EpisodeViews.objects.get(episode=episode).views, 3)
+
+        relevant_data = TitleRelevantData.objects.get(
+            title=episode.translation.title_id
+        )
+        self.assertEqual(relevant_data.views_total, 3)
+        self.assertAlmostEqual(relevant_data.trending, 3)
+
+    def test_flush_lock(self):
+        from django_redis import get_redis_connection
+
+        from apps.titles.viewcounts import FLUSH_LOCK_KEY, count_view, flush_views
+        from apps.translations.models import Episode
+
+        episode = Episode.objects.first()
+        count_view(episode.pk, episode.translation.title_id, 'u1')
+
+        # another flush is running
+        lock = get_redis_connection().lock(FLUSH_LOCK_KEY)
+        lock.acquire()
+        self.assertEqual(flush_views(), 0)
+
+        lock.release()
+        self.assertEqual(flush_views(), 1)
+
+    @override_settings(DEBUG=True)
+    def test_view_episode(self):
+        from apps.titles.models import TitleViews
+        from apps.titles.viewcounts import flush_views
+        from apps.translations.models import Episode
+        from apps.users.models import ViewedEpisode
+
+        first, second = Episode.objects.filter(
+            translation=Episode.objects.first().translation
+        ).order_by('number')
+        user, token = self._setup_test_user()
+
+        # progress of the last viewed episode doesn't count new views
+        for episode, start_from in ((first, 0), (first, 60), (first, 120), (second, 0)):
+            response = self.client.post(
+                '/users/view-episode/',
+                {'episode': episode.pk, 'start_from': start_from, 'captcha': 'test'},
+                **self._get_auth_headers(token),
+            )
+            self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(flush_views(), 2)
+        self.assertEqual(TitleViews.objects.get(title=first.translation.title).views, 2)
+        self.assertEqual(
+            ViewedEpisode.objects.get(user=user, episode=first).start_from, 120
+        )
+
+
+class TitleTrendingTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_trending_scores(self):
+        from datetime import timedelta
+
+        from apps.titles.models import Title, TitleHourlyViews, TitleRelevantData
+        from apps.titles.trending import (
+            add_views,
+            decay_scores,
+            get_hour,
+            rebuild_scores,
+        )
+
+        first, second, third = Title.objects.order_by('pk')
+        hour = get_hour()
+        # 24 hours is the half life
+        add_views({first.pk: 4}, hour - timedelta(hours=24))
+        add_views({second.pk: 3}, hour)
+        TitleHourlyViews.objects.bulk_create(
+            [
+                TitleHourlyViews(title=first, hour=hour - timedelta(hours=24), views=4),
+                TitleHourlyViews(title=second, hour=hour, views=3),
+            ]
+        )
+
+        scores = dict(TitleRelevantData.objects.values_list('title', 'trending'))
+        self.assertAlmostEqual(scores[first.pk], 2)
+        self.assertAlmostEqual(scores[second.pk], 3)
+        self.assertEqual(scores[third.pk], 0)
+
+        self.assertEqual(decay_scores(hour + timedelta(hours=24)), 2)
+        self.assertAlmostEqual(TitleRelevantData.objects.get(title=first).trending, 1)
+
+        self.assertEqual(rebuild_scores(), 3)
+        self.assertAlmostEqual(TitleRelevantData.objects.get(title=first).trending, 2)
+
+        response = self.client.get('/titles/trending/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [title['slug'] for title in json.loads(response.content)],
+            [second.slug, first.slug],
+        )
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class TitleConditionalGetTest(BaseTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self._setup_test_titles(number=1)
+
+    def test_title_not_modified(self):
+        import time
+
+        from django.core.cache import cache
+
+        from apps.titles.models import Title
+        from apps.titles.versions import TITLE_MODIFIED_CACHE_KEY
+
+        title = Title.objects.enabled().first()
+        url = f'/titles/titles/{title.slug}/'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # response is cached until the version is bumped
+        name = self._get_random_string()
+        Title.objects.filter(pk=title.pk).update(name=name)
+        self.assertEqual(self.client.get(url).content, response.content)
+
+        cache.set(TITLE_MODIFIED_CACHE_KEY % title.pk, time.time() + 1, None)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['name'], name)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+
+    def test_catalog_not_modified(self):
+        for url in ('/titles/titles/', '/titles/ongoings/', '/translations/updates/'):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(
+                self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+            )
+
+    def test_updates_not_modified(self):
+        from unittest import mock
+
+        from apps.titles import versions
+        from apps.titles.models import Title
+
+        title = Title.objects.enabled().first()
+        etags = {
+            url: self.client.get(url)['ETag']
+            for url in ('/titles/titles/', '/translations/updates/')
+        }
+
+        def get_status_codes():
+            return {
+                url: self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+                for url, etag in etags.items()
+            }
+
+        # versions are bumped right away, not after the test's transaction
+        with mock.patch.object(
+            versions, 'transaction', on_commit=lambda function: function()
+        ):
+            # e.g. views or ratings are updated
+            versions.bump_versions([title.pk])
+            self.assertEqual(
+                get_status_codes(),
+                {'/titles/titles/': 200, '/translations/updates/': 304},
+            )
+
+            versions.bump_versions([title.pk], updates=True)
+            self.assertEqual(
+                get_status_codes(),
+                {'/titles/titles/': 200, '/translations/updates/': 200},
+            )
+
+    def test_not_finite_version(self):
+        from apps.titles.versions import _to_datetime
+
+        for modified in (float('inf'), float('-inf'), float('nan'), 1e20):
+            self.assertIsNone(_to_datetime(modified))
+        self.assertIsNotNone(_to_datetime(0.0))
+
+
+@override_settings(IMAGES_ASYNC_PROCESSING=True)
+class TitleImageProcessingTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=1)
+
+    def test_process_image(self):
+        from io import BytesIO
+        from tempfile import TemporaryDirectory
+        from unittest import mock
+
+        from django.core.files.base import ContentFile
+        from PIL import Image
+
+        from apps.core.services import requeue_processing_images
+        from apps.core.storages import PROCESSING, FileSystemImageStorage
+        from apps.core.tasks import process_image
+        from apps.titles.models import Title
+
+        io = BytesIO()
+        Image.new('RGB', (400, 600)).save(io, 'png')
+        title = Title.objects.first()
+        field = Title._meta.get_field('poster')
+        storage_class = type('Storage', (FileSystemImageStorage,), {'ratio': 1.39})
+
+        with TemporaryDirectory() as location, mock.patch.object(
+            field, 'storage', storage_class(location=location)
+        ), mock.patch(
+            # processing is scheduled right away, not after the test's transaction
+            'apps.core.fields.transaction',
+            on_commit=lambda function: function(),
+        ), mock.patch.object(
+            process_image, 'delay'
+        ) as delay:
+            title.poster.save('poster.png', ContentFile(io.getvalue()))
+
+            # saving the title schedules processing of the poster
+            delay.assert_called_once_with(
+                'titles.Title', title.pk, 'poster', title.poster.name
+            )
+            title.refresh_from_db()
+            self.assertEqual(title.poster_manifest['status'], PROCESSING)
+            self.assertTrue(title.poster.urls['processing'])
+
+            # processing isn't queued again until it's stale
+            self.assertEqual(requeue_processing_images(), 0)
+            Title.objects.filter(pk=title.pk).update(
+                poster_manifest={**title.poster_manifest, 'queued': 0}
+            )
+            self.assertEqual(requeue_processing_images(), 1)
+            self.assertEqual(delay.call_count, 2)
+
+            process_image(*delay.call_args[0])
+
+            title.refresh_from_db()
+            self.assertNotIn('status', title.poster_manifest)
+            self.assertEqual(len(title.poster_manifest['variants']), 12)
+            self.assertNotIn('processing', title.poster.urls)
+            self.assertEqual(requeue_processing_images(), 0)
@@ -0,0 +1,129 @@
+"""
+Trending scores of titles.
+
+Views are collected into hourly buckets (`TitleHourlyViews`), title's score is the sum
+of its views weighted by `0.5 ** (age / TITLES_TRENDING_HALF_LIFE)`, age in hours.
+
+Score is stored decayed to some hour (`trending_hour`), so it's updated incrementally:
+flushed views are added with their own weight, and when hours pass the score is just
+multiplied by the decay of passed hours. Celery task `update_title_trending` decays
+all scores to the current hour every few minutes, so they are comparable with each other.
+"""
+from datetime import datetime, timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import now
+from psycopg2.extras import execute_values
+
+from .models import TitleHourlyViews, TitleRelevantData
+
+# scores below are reset to zero
+MIN_SCORE = 0.001
+
+
+def get_hour(moment: datetime = None) -> datetime:
+    """Start of the hour of `moment`, defaults to now"""
+    return (moment or now()).replace(minute=0, second=0, microsecond=0)
+
+
+def get_decay() -> float:
+    """Decay of score per hour"""
+    return 0.5 ** (1 / settings.TITLES_TRENDING_HALF_LIFE)
+
+
+def decay_scores(current_hour: datetime = None) -> int:
+    """Decay scores to `current_hour`, defaults to the current hour.
+    Zero scores stay as they are, they have nothing to decay.
+    Returns number of decayed scores"""
+    table = connection.ops.quote_name(TitleRelevantData._meta.db_table)
+    current_hour = current_hour or get_hour()
+
+    score = f'trending * power(%(decay)s, extract(epoch from (%(hour)s - trending_hour)) / 3600)'
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            update {table} set
+                trending = case when {score} >= %(min_score)s then {score} else 0 end,
+                trending_hour = %(hour)s
+            where trending_hour < %(hour)s and trending > 0
+            """,
+            {'decay': get_decay(), 'hour': current_hour, 'min_score': MIN_SCORE},
+        )
+        return cursor.rowcount
+
+
+def add_views(titles: Dict[int, int], hour: datetime):
+    """Add views counted during `hour` to titles scores
+
+    Args:
+        titles (dict): title id to number of views
+        hour (datetime): start of the hour
+    """
+    table = connection.ops.quote_name(TitleRelevantData._meta.db_table)
+    current_hour = get_hour()
+    weight = get_decay() ** ((current_hour - hour) / timedelta(hours=1))
+
+    decay_scores(current_hour)
+
+    with connection.cursor() as cursor:
+        execute_values(
+            cursor,
+            f"""
+            update {table} set
+                trending = {table}.trending + counters.score,
+                trending_hour = counters.hour
+            from (values %s) as counters (title_id, score, hour)
+            where {table}.title_id = counters.title_id
+            """,
+            [(pk, views * weight, current_hour) for pk, views in titles.items()],
+        )
+
+
+def rebuild_scores() -> int:
+    """Recompute scores of all titles from kept hourly views.
+    Returns number of updated titles"""
+    table = connection.ops.quote_name(TitleRelevantData._meta.db_table)
+    hourly_views = connection.ops.quote_name(TitleHourlyViews._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            update {table} set trending = scores.score, trending_hour = %(hour)s
+            from (
+                select
+                    relevant_data.title_id,
+                    coalesce(sum(
+                        hourly_views.views * power(
+                            %(decay)s,
+                            extract(epoch from (%(hour)s - hourly_views.hour)) / 3600
+                        )
+                    ), 0) as score
+                from {table} as relevant_data
+                left join {hourly_views} as hourly_views
+                    on hourly_views.title_id = relevant_data.title_id
+                group by relevant_data.title_id
+            ) as scores
+            where {table}.title_id = scores.title_id
+            """,
+            {'decay': get_decay(), 'hour': get_hour()},
+        )
+        return cursor.rowcount
+
+
+def update_scores() -> dict:
+    """Decay all scores to the current hour and delete expired hourly views
+
+    Returns:
+        dict: number of decayed scores and deleted hourly views
+    """
+    with transaction.atomic():
+        decayed = decay_scores()
+
+    deleted, _ = TitleHourlyViews.objects.filter(
+        hour__lt=get_hour() - timedelta(hours=settings.TITLES_TRENDING_HOURS)
+    ).delete()
+
+    return {'decayed': decayed, 'deleted': deleted}
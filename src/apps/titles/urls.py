@@ -2,26 +2,56 @@ from django.core.cache import cache
 from django.urls import path
 from django.views.decorators.cache import cache_page
 
-from . import views
+from . import versions, views
 
 app_name = 'titles'
 
 pages = {
-    'titles/': {'view': views.Titles.as_view(), 'cache': False,},
-    'titles/<slug:slug>/': {'view': views.Title.as_view(), 'cache': 5,},
-    'populars/': {'view': views.Populars.as_view(), 'cache': 5,},
-    'ongoings/': {'view': views.Ongoings.as_view(), 'cache': 5,},
-    'current-season/': {'view': views.CurrentSeason.as_view(), 'cache': 5,},
-    'latests/': {'view': views.Latests.as_view(), 'cache': 5,},
+    'titles/': {
+        'view': views.Titles.as_view(),
+        'cache': False,
+        'version': versions.catalog_version,
+    },
+    'titles/<slug:slug>/': {
+        'view': views.Title.as_view(),
+        'cache': 5,
+        'version': versions.title_version,
+    },
+    'titles/<slug:slug>/rank-history/': {
+        'view': views.TitleRankHistory.as_view(),
+        'cache': 60,
+    },
+    'populars/': {'view': views.Populars.as_view(), 'cache': False,},
+    'trending/': {'view': views.Trending.as_view(), 'cache': 5,},
+    'ongoings/': {
+        'view': views.Ongoings.as_view(),
+        'cache': 5,
+        'version': versions.catalog_version,
+    },
+    'current-season/': {'view': views.CurrentSeason.as_view(), 'cache': False,},
+    'latests/': {'view': views.Latests.as_view(), 'cache': False,},
     'search/': {'view': views.Search.as_view(), 'cache': False,},
+    'autocomplete/': {'view': views.Autocomplete.as_view(), 'cache': False,},
+    'facets/': {'view': views.Facets.as_view(), 'cache': False,},
 }
 
-urlpatterns = [
-    path(
-        _path,
-        cache_page(int(page['cache']) * 60)(page['view'])
-        if page['cache']
-        else page['view'],
-    )
-    for _path, page in pages.items()
-]
+
+def _get_view(page: dict):
+    view = page['view']
+    version = page.get('version')
+
+    if page['cache']:
+        timeout = int(page['cache']) * 60
+        # response cached before the version is bumped isn't served after it
+        view = (
+            versions.version_cache_page(timeout, version)(view)
+            if version
+            else cache_page(timeout)(view)
+        )
+    # conditional GET is checked before cached response is looked up
+    if version:
+        view = versions.version_condition(version)(view)
+    return view
+
+
+urlpatterns = [path(_path, _get_view(page)) for _path, page in pages.items()]
@@ -0,0 +1,199 @@
+"""
+Versions of titles, catalog, search results and updates list.
+
+Every title has a version - time it was modified at, stored in cache. It's bumped
+on title save, episodes and translations changes, ratings and views updates.
+Batch recomputing of relevant data (e.g. ranks) bumps single version shared
+by all titles, catalog version is bumped together with any title version.
+Search version is bumped only when titles are enabled, disabled or renamed,
+updates version - when episodes or translations are changed
+and when titles are saved (e.g. variants of their images are processed),
+enabled or disabled, so views and ratings updates don't invalidate them.
+Updates version also keys cached home lists (populars, current season, latests).
+
+Versions are used as ETag and Last-Modified of title and catalog lists responses,
+so requests with matching If-None-Match or If-Modified-Since are answered
+with 304 before anything is queried or serialized. Cached responses of the views
+are keyed by the version too, so response cached before the version is bumped
+is never served with the new ETag.
+"""
+import math
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from .models import Title
+
+TITLE_MODIFIED_CACHE_KEY = 'titles.modified.title.%s'
+CATALOG_MODIFIED_CACHE_KEY = 'titles.modified.catalog'
+SEARCH_MODIFIED_CACHE_KEY = 'titles.modified.search'
+UPDATES_MODIFIED_CACHE_KEY = 'titles.modified.updates'
+RELEVANT_DATA_MODIFIED_CACHE_KEY = 'titles.modified.relevant_data'
+TITLE_ID_CACHE_KEY = 'titles.id.%s'
+TITLE_ID_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+
+
+def _get_modified(key: str) -> float:
+    modified: Optional[float] = cache.get(key)
+
+    if modified is None:
+        # version is lost (e.g. cache was cleared), so consider it modified now
+        modified = time.time()
+        if not cache.add(key, modified, None):
+            modified = cache.get(key, modified)
+
+    return modified
+
+
+def get_title_modified(title_id: int) -> float:
+    return max(
+        _get_modified(TITLE_MODIFIED_CACHE_KEY % title_id),
+        _get_modified(RELEVANT_DATA_MODIFIED_CACHE_KEY),
+    )
+
+
+def get_catalog_modified() -> float:
+    return _get_modified(CATALOG_MODIFIED_CACHE_KEY)
+
+
+def get_search_modified() -> float:
+    return _get_modified(SEARCH_MODIFIED_CACHE_KEY)
+
+
+def get_updates_modified() -> float:
+    return _get_modified(UPDATES_MODIFIED_CACHE_KEY)
+
+
+def get_title_id(slug: str) -> Optional[int]:
+    """Id of enabled title by its slug, cached until the title is saved"""
+    key = TITLE_ID_CACHE_KEY % slug
+
+    if (title_id := cache.get(key)) is None:
+        title_id = (
+            Title.objects.enabled()
+            .filter(slug=slug)
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if title_id is not None:
+            cache.set(key, title_id, TITLE_ID_CACHE_TIMEOUT)
+
+    return title_id
+
+
+def bump_versions(
+    title_ids: Iterable[int] = (),
+    slugs: Iterable[str] = (),
+    search: bool = False,
+    updates: bool = False,
+):
+    """
+    Bump versions of titles and catalog once current transaction is committed.
+    `slugs` are current and previous slugs of the titles, if they are known.
+    Versions of search results and updates list are bumped if `search` and `updates`
+    """
+    title_ids = [pk for pk in title_ids if pk is not None]
+    slugs = [slug for slug in slugs if slug]
+
+    def _bump():
+        modified = time.time()
+        cache.set_many(
+            {
+                CATALOG_MODIFIED_CACHE_KEY: modified,
+                **{TITLE_MODIFIED_CACHE_KEY % pk: modified for pk in title_ids},
+                **({SEARCH_MODIFIED_CACHE_KEY: modified} if search else {}),
+                **({UPDATES_MODIFIED_CACHE_KEY: modified} if updates else {}),
+            },
+            None,
+        )
+        if slugs:
+            cache.delete_many([TITLE_ID_CACHE_KEY % slug for slug in slugs])
+
+    transaction.on_commit(_bump)
+
+
+def bump_relevant_data_version():
+    """Bump versions of all titles and catalog once current transaction is committed,
+    should be called when relevant data of all titles is recomputed"""
+
+    def _bump():
+        modified = time.time()
+        cache.set_many(
+            {
+                CATALOG_MODIFIED_CACHE_KEY: modified,
+                RELEVANT_DATA_MODIFIED_CACHE_KEY: modified,
+            },
+            None,
+        )
+
+    transaction.on_commit(_bump)
+
+
+def _get_title_modified_by_slug(slug: str) -> Optional[float]:
+    title_id = get_title_id(slug)
+    return get_title_modified(title_id) if title_id is not None else None
+
+
+def _to_etag(modified: Optional[float]) -> Optional[str]:
+    return f'"{modified!r}"' if modified is not None else None
+
+
+def _to_datetime(modified: Optional[float]) -> Optional[datetime]:
+    if modified is None or not math.isfinite(modified):
+        return None
+
+    try:
+        return datetime.fromtimestamp(modified, tz=timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        # timestamp out of range of the platform
+        return None
+
+
+def title_version(request, slug: str, **kwargs) -> Optional[float]:
+    return _get_title_modified_by_slug(slug)
+
+
+def catalog_version(request, *args, **kwargs) -> float:
+    return get_catalog_modified()
+
+
+def updates_version(request, *args, **kwargs) -> float:
+    return get_updates_modified()
+
+
+def version_condition(get_version: Callable[..., Optional[float]]):
+    """Conditional GET by version `get_version` gets from view's arguments"""
+    return condition(
+        etag_func=lambda *args, **kwargs: _to_etag(get_version(*args, **kwargs)),
+        last_modified_func=lambda *args, **kwargs: _to_datetime(
+            get_version(*args, **kwargs)
+        ),
+    )
+
+
+def version_cache_page(timeout: int, get_version: Callable[..., Optional[float]]):
+    """`cache_page` keyed by version `get_version` gets from view's arguments"""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            version = get_version(request, *args, **kwargs)
+            return cache_page(timeout, key_prefix=f'titles.version.{version!r}')(view)(
+                request, *args, **kwargs
+            )
+
+        return wrapper
+
+    return decorator
+
+
+# decorators of title detail, catalog lists and updates list views
+title_condition = version_condition(title_version)
+catalog_condition = version_condition(catalog_version)
+updates_condition = version_condition(updates_version)
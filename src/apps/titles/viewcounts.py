@@ -0,0 +1,240 @@
+"""
+Write-behind counting of episode views.
+
+Every view only increments per-episode and per-title counters in Redis hashes
+(one hash per day for episodes and per hour for titles) and adds the viewer
+to the title's daily HyperLogLog of unique viewers, all in a single pipelined round trip.
+Celery beat task `flush_title_views` moves the counters to `EpisodeViews`, `TitleViews`
+and `TitleHourlyViews` tables, to title's `views_total` and trending score.
+
+Counters hash is renamed before it's read, so views counted during the flush go to a new hash.
+Renamed hash is deleted only after the database transaction is committed,
+if the flush fails it's retried by the next flush. Flushes don't overlap,
+a flush started while another one holds the lock is skipped.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import localdate, localtime
+from django_redis import get_redis_connection
+from psycopg2.extras import execute_values
+from redis.exceptions import ResponseError
+
+from apps.translations.models import Episode
+
+from . import trending, versions
+from .models import (
+    EpisodeViews,
+    Title,
+    TitleHourlyViews,
+    TitleRelevantData,
+    TitleViews,
+)
+
+EPISODES_VIEWS_KEY = 'titles:views:episodes:%s'
+TITLES_VIEWS_KEY = 'titles:views:titles:%s'
+TITLE_VIEWERS_KEY = 'titles:viewers:%s:%s'
+FLUSHING_SUFFIX = ':flushing'
+FLUSH_LOCK_KEY = 'titles:views:flush-lock'
+# flush holds the lock at most this long, should be longer than a flush takes
+FLUSH_LOCK_TIMEOUT = 60 * 10  # 10 minutes
+# hours are in UTC, so they are not repeated on DST change
+HOUR_FORMAT = '%Y-%m-%dT%H'
+
+# viewers of the day are kept until the next day is flushed
+VIEWERS_TIMEOUT = 60 * 60 * 24 * 2  # 2 days
+
+
+def count_view(episode_id: int, title_id: int, viewer: str):
+    """Count a view of the episode
+
+    Args:
+        episode_id (int): viewed episode
+        title_id (int): title of the episode
+        viewer (str): unique viewer identifier, e.g. user id or ip address of anonymous user
+    """
+    today = localdate().isoformat()
+    hour = trending.get_hour().strftime(HOUR_FORMAT)
+    viewers_key = TITLE_VIEWERS_KEY % (today, title_id)
+
+    pipeline = get_redis_connection().pipeline(transaction=False)
+    pipeline.hincrby(EPISODES_VIEWS_KEY % today, episode_id, 1)
+    pipeline.hincrby(TITLES_VIEWS_KEY % hour, title_id, 1)
+    pipeline.pfadd(viewers_key, viewer)
+    pipeline.expire(viewers_key, VIEWERS_TIMEOUT)
+    pipeline.execute()
+
+
+def _take_counters(redis, key: str) -> Tuple[str, Dict[int, int]]:
+    """Rename counters hash so new views go to a new one, and read it.
+    Hash left by failed flush is read instead and new views wait for the next flush"""
+    flushing_key = key + FLUSHING_SUFFIX
+
+    if not redis.exists(flushing_key):
+        try:
+            redis.rename(key, flushing_key)
+        except ResponseError:
+            # no views were counted
+            return flushing_key, {}
+
+    return (
+        flushing_key,
+        {int(pk): int(views) for pk, views in redis.hgetall(flushing_key).items()},
+    )
+
+
+def _get_pending_keys(redis, keys: List[str]) -> List[str]:
+    """Keys of counters hashes having views to flush"""
+    pipeline = redis.pipeline(transaction=False)
+    for key in keys:
+        pipeline.exists(key, key + FLUSHING_SUFFIX)
+    return [key for key, exists in zip(keys, pipeline.execute()) if exists]
+
+
+def _add_views(
+    model, columns: Tuple[str, str], rows: List[tuple], unique_viewers=False
+):
+    """Add views of (key, period, views[, unique viewers]) rows to views table,
+    `columns` are names of key and period columns"""
+    table = connection.ops.quote_name(model._meta.db_table)
+    updates = [f'views = {table}.views + excluded.views']
+
+    if unique_viewers:
+        # unique viewers of the whole day are counted by HyperLogLog
+        columns += ('views', 'unique_viewers')
+        updates.append(
+            f'unique_viewers = greatest({table}.unique_viewers, excluded.unique_viewers)'
+        )
+    else:
+        columns += ('views',)
+
+    with connection.cursor() as cursor:
+        execute_values(
+            cursor,
+            f"""
+            insert into {table} ({', '.join(columns)}) values %s
+            on conflict ({', '.join(columns[:2])}) do update set {', '.join(updates)}
+            """,
+            rows,
+        )
+
+
+def _add_views_total(titles: Dict[int, int]):
+    table = connection.ops.quote_name(TitleRelevantData._meta.db_table)
+
+    with connection.cursor() as cursor:
+        execute_values(
+            cursor,
+            f"""
+            update {table} set views_total = {table}.views_total + counters.views
+            from (values %s) as counters (title_id, views)
+            where {table}.title_id = counters.title_id
+            """,
+            list(titles.items()),
+        )
+
+
+def _flush_episodes(redis, key: str, day: date) -> int:
+    flushing_key, episodes = _take_counters(redis, key)
+
+    # episodes might be deleted after they were viewed
+    episodes = {
+        pk: episodes[pk]
+        for pk in Episode.objects.filter(pk__in=episodes).values_list('pk', flat=True)
+    }
+
+    with transaction.atomic():
+        if episodes:
+            _add_views(
+                EpisodeViews,
+                ('episode_id', 'date'),
+                [(pk, day, views) for pk, views in episodes.items()],
+            )
+
+        transaction.on_commit(lambda: redis.delete(flushing_key))
+
+    return sum(episodes.values())
+
+
+def _flush_titles(redis, key: str, hour: datetime) -> int:
+    flushing_key, titles = _take_counters(redis, key)
+    day = localtime(hour).date()
+
+    # titles might be deleted after they were viewed
+    titles = {
+        pk: titles[pk]
+        for pk in Title.objects.filter(pk__in=titles).values_list('pk', flat=True)
+    }
+
+    pipeline = redis.pipeline(transaction=False)
+    for title_id in titles:
+        pipeline.pfcount(TITLE_VIEWERS_KEY % (day.isoformat(), title_id))
+    viewers = dict(zip(titles, pipeline.execute()))
+
+    with transaction.atomic():
+        if titles:
+            _add_views(
+                TitleViews,
+                ('title_id', 'date'),
+                [(pk, day, views, viewers[pk]) for pk, views in titles.items()],
+                unique_viewers=True,
+            )
+            _add_views(
+                TitleHourlyViews,
+                ('title_id', 'hour'),
+                [(pk, hour, views) for pk, views in titles.items()],
+            )
+            _add_views_total(titles)
+            trending.add_views(titles, hour)
+            versions.bump_versions(titles)
+
+        transaction.on_commit(lambda: redis.delete(flushing_key))
+
+    return sum(titles.values())
+
+
+def flush_views() -> int:
+    """
+    Move buffered counters of last `TITLES_VIEWS_FLUSH_DAYS` days to the database.
+    Returns number of flushed views, 0 if another flush is running
+    """
+    redis = get_redis_connection()
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        return _flush_views(redis)
+    finally:
+        lock.release()
+
+
+def _flush_views(redis) -> int:
+    today = localdate()
+    current_hour = trending.get_hour()
+
+    days = {
+        EPISODES_VIEWS_KEY % day.isoformat(): day
+        for day in (
+            today - timedelta(days=days)
+            for days in reversed(range(settings.TITLES_VIEWS_FLUSH_DAYS))
+        )
+    }
+    hours = {
+        TITLES_VIEWS_KEY % hour.strftime(HOUR_FORMAT): hour
+        for hour in (
+            current_hour - timedelta(hours=hours)
+            for hours in reversed(range(settings.TITLES_VIEWS_FLUSH_DAYS * 24))
+        )
+    }
+
+    for key in _get_pending_keys(redis, list(days)):
+        _flush_episodes(redis, key, days[key])
+
+    return sum(
+        _flush_titles(redis, key, hours[key])
+        for key in _get_pending_keys(redis, list(hours))
+    )
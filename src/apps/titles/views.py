@@ -1,25 +1,17 @@
 import django_filters
 from django.conf import settings
-from django.db.models import OuterRef, Q, Subquery
-from django.utils.decorators import method_decorator
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
-from django.views.decorators.cache import cache_page
 from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.content.models import Country, Genre, Studio
-from apps.translations.models import Episode
+from apps.core.cache import cache_response
+from apps.core.generics import SparseFieldsMixin, ValuesListMixin
+from apps.core.rest import KeysetPagination, Pagination
 
-from . import models, serializers, services
-
-last_episode_annotate = Subquery(
-    (
-        Episode.objects.filter(translation__title=OuterRef('pk'))
-        .order_by('-number')
-        .values('number')[:1]
-    )
-)
+from . import autocomplete, facets, models, query, serializers, services, versions
 
 
 class TitleFilter(django_filters.FilterSet):
@@ -58,53 +50,78 @@ class TitleFilter(django_filters.FilterSet):
         # }
 
 
-class Titles(generics.ListAPIView):
+class TitleSparseFieldsMixin(SparseFieldsMixin):
+    projections = {
+        'card': (
+            'name',
+            'slug',
+            'poster',
+            'genres',
+            'season',
+            'year',
+            'type',
+            'status',
+            'relevant_data',
+            'last_episode',
+            'total_episodes',
+        ),
+        'detail': None,
+    }
+    field_prefetches = {
+        'translations': (
+            'translations',
+            'translations__translator',
+            'translations__episodes',
+        ),
+        'genres': ('genres',),
+        'studios': ('studios',),
+        'countries': ('countries',),
+    }
+
+    def get_queryset(self):
+        return (
+            models.Title.objects.enabled()
+            .select_related('relevant_data',)
+            .prefetch_related(*self.get_prefetches())
+        )
+
+
+class Titles(ValuesListMixin, TitleSparseFieldsMixin, generics.ListAPIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = serializers.TitleSerializer
+    values_serializer = serializers.title_values
     filterset_class = TitleFilter
+    pagination_class = KeysetPagination
     ordering_fields = [
         'relevant_data__rating_average',
         'relevant_data__rank',
         'relevant_data__views_total',
+        'relevant_data__trending',
         'year',
         'name',
     ]
     ordering = ['-relevant_data__rating_average']
-
-    def get_queryset(self):
-        return (
-            models.Title.objects.enabled()
-            .select_related('relevant_data',)
-            .prefetch_related(
-                'translations',
-                'translations__translator',
-                'translations__episodes',
-                'genres',
-                'studios',
-                'countries',
-            )
-            .annotate(last_episode=last_episode_annotate)
-        )
+    # cursor of keyset pagination is made of ordering fields values
+    values_extra_columns = ordering_fields
 
 
-class Title(generics.RetrieveAPIView):
+class Title(TitleSparseFieldsMixin, generics.RetrieveAPIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = serializers.TitleSerializer
     lookup_field = 'slug'
 
+
+class TitleRankHistory(generics.ListAPIView):
+    """Daily ranks of the title, oldest first"""
+
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = serializers.TitleRankHistorySerializer
+    pagination_class = None
+
     def get_queryset(self):
-        return (
-            models.Title.objects.enabled()
-            .select_related('relevant_data',)
-            .prefetch_related(
-                'translations',
-                'translations__translator',
-                'translations__episodes',
-                'genres',
-                'studios',
-                'countries',
-            )
-            .annotate(last_episode=last_episode_annotate)
+        return query.filter_queryset_by_enabled_title(
+            models.TitleRankHistory.objects.filter(title__slug=self.kwargs['slug']),
+            'title',
         )
 
 
@@ -113,7 +130,9 @@ class Populars(generics.ListAPIView):
     serializer_class = serializers.TitlePopularSerializer
     pagination_class = None
 
-    @method_decorator(cache_page(settings.TITLES_HOME_PAGE_CACHE_TIMEOUT))
+    @cache_response(
+        settings.TITLES_HOME_PAGE_CACHE_TIMEOUT, version=versions.get_updates_modified
+    )
     def list(self, *args, **kwargs):
         return super().list(*args, **kwargs)
 
@@ -126,6 +145,22 @@ class Populars(generics.ListAPIView):
         )[: settings.TITLES_HOME_PAGE_LIMIT]
 
 
+class Trending(generics.ListAPIView):
+    """Titles popular right now, by views decayed by their age"""
+
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = serializers.TitlePopularSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return (
+            models.Title.objects.enabled()
+            .select_related('relevant_data',)
+            .filter(relevant_data__trending__gt=0)
+            .order_by('-relevant_data__trending', 'pk')
+        )[: settings.TITLES_HOME_PAGE_LIMIT]
+
+
 class Ongoings(generics.ListAPIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = serializers.OngoingSerializer
@@ -137,7 +172,6 @@ class Ongoings(generics.ListAPIView):
             .filter(status=models.Title.STATUSES.ongoing)
             .select_related('relevant_data',)
             .prefetch_related('genres', 'studios', 'countries',)
-            .annotate(last_episode=last_episode_annotate)
         )
 
 
@@ -164,7 +198,9 @@ class CurrentSeason(generics.ListAPIView):
     serializer_class = serializers.CurrentSeasonSerializer
     pagination_class = None
 
-    @method_decorator(cache_page(settings.TITLES_HOME_PAGE_CACHE_TIMEOUT))
+    @cache_response(
+        settings.TITLES_HOME_PAGE_CACHE_TIMEOUT, version=versions.get_updates_modified
+    )
     def list(self, *args, **kwargs):
         return super().list(*args, **kwargs)
 
@@ -175,7 +211,7 @@ class CurrentSeason(generics.ListAPIView):
                 year=2020,  # TODO: remove hard-code
                 year_season=models.Title.YEAR_SEASONS.autumn,  # TODO: remove hard-code
             )
-            .annotate(last_episode=last_episode_annotate)
+            .select_related('relevant_data',)
         )[: settings.TITLES_HOME_PAGE_LIMIT]
 
 
@@ -184,9 +220,10 @@ class Latests(generics.ListAPIView):
     serializer_class = serializers.LatestsSerializer
     pagination_class = None
 
-    @method_decorator(cache_page(settings.TITLES_HOME_PAGE_CACHE_TIMEOUT))
+    @cache_response(
+        settings.TITLES_HOME_PAGE_CACHE_TIMEOUT, version=versions.get_updates_modified
+    )
     def list(self, *args, **kwargs):
-        print('cahce')
         return super().list(*args, **kwargs)
 
     def get_queryset(self):
@@ -195,16 +232,64 @@ class Latests(generics.ListAPIView):
         ]
 
 
-class Search(APIView):
+class SearchPagination(Pagination):
+    page_size = settings.TITLES_SEARCH_PAGE_SIZE
+    max_page_size = settings.TITLES_SEARCH_MAX_PAGE_SIZE
+
+
+class Search(generics.ListAPIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = serializers.SearchTitleSerializer
+    pagination_class = SearchPagination
+    filter_backends = ()
+
+    def list(self, request, *args, **kwargs):
+        serializer = serializers.SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        # ranked ids are cached, only titles of the current page are fetched
+        title_ids = self.paginate_queryset(
+            services.get_search_title_ids(serializer.validated_data['q'])
+        )
+        titles = models.Title.objects.enabled().in_bulk(title_ids)
+
+        return self.get_paginated_response(
+            self.get_serializer(
+                [titles[pk] for pk in title_ids if pk in titles], many=True
+            ).data
+        )
+
+
+class Autocomplete(APIView):
+    """Search for the search box, served from in-process index without database queries"""
+
+    permission_classes = (permissions.AllowAny,)
 
     def get(self, request):
         serializer = serializers.SearchQuerySerializer(data=request.query_params)
-        if serializer.is_valid(raise_exception=True):
-            queryset = services.search(
-                serializer.validated_data['q'], models.Title.objects.enabled()
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data['q']
+
+        if settings.TITLES_AUTOCOMPLETE_ENGINE:
+            return Response(
+                autocomplete.get_index().search(
+                    query, settings.TITLES_AUTOCOMPLETE_LIMIT
+                )
             )
-            result = self.serializer_class(queryset, many=True).data
 
-            return Response(result)
+        return Response(
+            serializers.SearchTitleSerializer(
+                services.search(query)[: settings.TITLES_AUTOCOMPLETE_LIMIT], many=True,
+            ).data
+        )
+
+
+class Facets(APIView):
+    """Number of titles for every catalog filter value under current filter state"""
+
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request):
+        serializer = serializers.FacetsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(facets.get_index().count(serializer.validated_data))
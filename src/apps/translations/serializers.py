@@ -1,6 +1,12 @@
 from rest_framework import serializers
 
-from apps.titles.serializers import BaseTitleSerializer, BaseTitleSerializerMeta
+from apps.core.fastserializers import Column, Nested, ValuesSerializer
+from apps.titles.serializers import (
+    BaseTitleSerializer,
+    BaseTitleSerializerMeta,
+    base_title_values_fields,
+    date_time,
+)
 
 from .models import Episode, Translation, Translator
 
@@ -37,3 +43,34 @@ class UpdateSerializer(serializers.ModelSerializer):
             'translation',
             'date_created',
         )
+
+
+# fast path serializer (see apps.core.fastserializers), output must match UpdateSerializer
+
+update_values = ValuesSerializer(
+    Episode,
+    {
+        'id': Column('id'),
+        'number': Column('number'),
+        'name': Column('name'),
+        'translation': Nested(
+            'translation',
+            {
+                'id': Column('id'),
+                'title': Nested(
+                    'title', {**base_title_values_fields, 'type': Column('type')}
+                ),
+                'translator': Nested(
+                    'translator',
+                    {
+                        'id': Column('id'),
+                        'slug': Column('slug'),
+                        'name': Column('name'),
+                    },
+                ),
+                'service': Column('service'),
+            },
+        ),
+        'date_created': Column('date_created', date_time),
+    },
+)
@@ -1,11 +1,14 @@
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
 from apps.notifications.models import Notification
 from apps.push_notifications.tasks import send_push_notification_task
+from apps.titles.models import TitleRelevantData
+from apps.titles import versions
+from apps.titles.services import refresh_last_episode, update_last_episode
 from apps.users.models import User
 
-from .models import Episode, Update
+from .models import Episode, Translation, Update
 
 
 @receiver(
@@ -33,3 +36,39 @@ def update_added_episodes_signal(action, pk_set, **kwargs):
 
         for notification in notifications:
             send_push_notification_task.delay(notification.id)
+
+
+@receiver(post_save, sender=Episode, dispatch_uid='episode_last_episode_signal')
+def episode_last_episode_signal(instance, created, **kwargs):
+    if created:
+        update_last_episode(instance)
+    else:
+        # number could be changed (e.g. via admin), so recalculate it
+        refresh_last_episode(
+            TitleRelevantData.objects.filter(title__translation=instance.translation_id)
+        )
+
+
+@receiver(
+    post_delete, sender=Episode, dispatch_uid='episode_delete_last_episode_signal'
+)
+def episode_delete_last_episode_signal(instance, **kwargs):
+    refresh_last_episode(
+        TitleRelevantData.objects.filter(title__translation=instance.translation_id)
+    )
+
+
+@receiver(post_save, sender=Episode, dispatch_uid='episode_versions_save_signal')
+@receiver(post_delete, sender=Episode, dispatch_uid='episode_versions_delete_signal')
+def episode_versions_signal(instance, **kwargs):
+    versions.bump_versions([instance.translation.title_id], updates=True)
+
+
+@receiver(
+    post_save, sender=Translation, dispatch_uid='translation_versions_save_signal'
+)
+@receiver(
+    post_delete, sender=Translation, dispatch_uid='translation_versions_delete_signal'
+)
+def translation_versions_signal(instance, **kwargs):
+    versions.bump_versions([instance.title_id], updates=True)
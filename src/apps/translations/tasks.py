@@ -5,6 +5,7 @@ import logging
 from celery import shared_task
 from celery.app.control import Inspect
 
+from apps.api import home
 from config.celery import app
 
 from .services import MoviesKodikUpdateService, SeriesKodikUpdateService
@@ -39,5 +40,6 @@ def DO_NOT_USE_update_title():
     try:
         SeriesKodikUpdateService().update()
         MoviesKodikUpdateService().update()
+        home.schedule_update()
     except Exception:
         logger.exception()
@@ -26,6 +26,26 @@ class TranslationEndpointsTest(BaseTestCase):
         self.assertEqual(self.client.get('/translations/updates/').status_code, 200)
 
 
+class UpdateValuesSerializerTest(BaseTestCase):
+    """Fast path serializer must give the same output as UpdateSerializer"""
+
+    def setUp(self):
+        self._setup_test_titles(number=3)
+
+    def test_same_output(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from apps.translations.serializers import UpdateSerializer, update_values
+        from apps.translations.views import Updates
+
+        self.assertEqual(
+            JSONRenderer().render(update_values.serialize(Updates.queryset.all())),
+            JSONRenderer().render(
+                UpdateSerializer(Updates.queryset.all(), many=True).data
+            ),
+        )
+
+
 # class UpdatesNotificationTest(BaseTestCase):
 #     def setUp(self):
 #         self.user, self.token = self._setup_test_user()
@@ -1,9 +1,15 @@
 from django.urls import include, path
 
+from apps.titles import versions
+
 from . import views
 
 app_name = 'translations'
 
 urlpatterns = [
-    path('updates/', views.Updates.as_view(), name='updates_list'),
+    path(
+        'updates/',
+        versions.updates_condition(views.Updates.as_view()),
+        name='updates_list',
+    ),
 ]
@@ -4,15 +4,17 @@ from django.db.models import QuerySet
 from django.shortcuts import render
 from rest_framework import generics, permissions
 
+from apps.core.generics import ValuesListMixin
 from apps.titles.query import filter_queryset_by_enabled_title
 
 from .models import Episode
-from .serializers import UpdateSerializer
+from .serializers import UpdateSerializer, update_values
 
 
-class Updates(generics.ListAPIView):
+class Updates(ValuesListMixin, generics.ListAPIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = UpdateSerializer
+    values_serializer = update_values
     queryset = (
         filter_queryset_by_enabled_title(Episode.objects.all(), 'translation__title',)
         .select_related('translation__translator', 'translation__title')
@@ -0,0 +1,20 @@
+# Generated by Django 3.1 on 2026-10-18 10:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # table is big, index is built without locking writes
+    atomic = False
+
+    dependencies = [
+        ('users', '0021_auto_20201031_0403'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='viewedepisode',
+            index=models.Index(fields=['user', 'episode'], name='users_viewe_user_id_dfabdb_idx'),
+        ),
+    ]
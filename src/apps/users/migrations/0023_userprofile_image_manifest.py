@@ -0,0 +1,25 @@
+# Generated by Django 3.1 on 2026-10-18 10:15
+
+import apps.core.fields
+import apps.users.storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0022_viewedepisode_user_episode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='image_manifest',
+            field=models.JSONField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='image',
+            field=apps.core.fields.BaseImageField(blank=True, manifest_field='image_manifest', max_length=255, null=True, storage=apps.users.storages.UserImageStorage(), upload_to=apps.users.storages.user_image_path, verbose_name='avatar'),
+        ),
+    ]
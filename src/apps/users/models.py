@@ -161,7 +161,9 @@ class UserProfile(BaseModel):
         upload_to=storages.user_image_path,
         null=True,
         blank=True,
+        manifest_field='image_manifest',
     )
+    image_manifest = models.JSONField(null=True, editable=False)
     birthday = models.DateField(_('дата рождения'), null=True, blank=True)
     sex = models.CharField(
         _('пол'), max_length=30, choices=SEX.choices, null=True, blank=True
@@ -230,6 +232,9 @@ class ViewedEpisode(BaseModel, DateCreatedMixin):
         _('Продолжить просмотр с (секунд)'), default=0
     )
 
+    class Meta:
+        indexes = [models.Index(fields=['user', 'episode'])]
+
 
 class TitleRating(BaseModel, DateCreatedMixin):
     class RATES(models.IntegerChoices):
@@ -8,6 +8,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.settings import api_settings
 
 from apps.core import services
+from apps.core.fastserializers import Column, ImageUrls, Nested
 from apps.core.serializers import CaptchaSerializerMixin
 from apps.titles.models import Title
 from apps.titles.serializers import (
@@ -16,6 +17,7 @@ from apps.titles.serializers import (
     EpisodeSerializer,
     TitleSerializer,
 )
+from apps.translations.models import Episode
 from apps.translations.serializers import TranslatorSerializer
 from apps.users.models import User
 
@@ -105,6 +107,22 @@ class UserBaseSerializer(serializers.ModelSerializer):
         pass
 
 
+# fields of fast path serializers (see apps.core.fastserializers) matching UserBaseSerializer
+user_base_values_fields = {
+    'id': Column('id'),
+    'username': Column('username'),
+    'profile': Nested(
+        'profile',
+        {
+            'birthday': Column('birthday', serializers.DateField().to_representation),
+            'sex': Column('sex'),
+            'about_myself': Column('about_myself'),
+            'image': ImageUrls('image'),
+        },
+    ),
+}
+
+
 class PublicUserSerializer(UserBaseSerializer):
     """
     Serialization for private user data, must be avaliable only for current user
@@ -179,6 +197,9 @@ class ViewedEpisodeSerializer(CaptchaSerializerMixin, serializers.ModelSerialize
     class Meta:
         model = models.ViewedEpisode
         fields = ('user', 'episode', 'translation', 'start_from', 'captcha')
+        extra_kwargs = {
+            'episode': {'queryset': Episode.objects.select_related('translation')}
+        }
 
 
 class TitleRatingSerializer(serializers.ModelSerializer):
@@ -0,0 +1,63 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils.timezone import now
+
+from .models import ViewedEpisode
+
+
+def prune_viewed_episodes() -> dict:
+    """
+    Delete viewed episodes older than `USERS_VIEWED_EPISODES_DAYS`, except the last view
+    of every user's episode, which keeps watch progress and last viewed titles.
+    Views counts are kept in daily rollups, see apps.titles.viewcounts.
+
+    Rows are deleted in chunks of `USERS_VIEWED_EPISODES_PRUNE_CHUNK` ids,
+    every chunk in its own short transaction, so autovacuum keeps up with it.
+
+    Returns:
+        dict: number of deleted rows, chunks and spent seconds
+    """
+    started = time.perf_counter()
+    table = connection.ops.quote_name(ViewedEpisode._meta.db_table)
+    chunk = settings.USERS_VIEWED_EPISODES_PRUNE_CHUNK
+
+    cutoff = now() - timedelta(days=settings.USERS_VIEWED_EPISODES_DAYS)
+    ids = ViewedEpisode.objects.filter(date_created__lt=cutoff).aggregate(
+        first=Min('pk'), last=Max('pk')
+    )
+    deleted = chunks = 0
+
+    if ids['first'] is not None:
+        for start in range(ids['first'], ids['last'] + 1, chunk):
+            with transaction.atomic(), connection.cursor() as cursor:
+                # views are ordered by creation date, ids only break ties
+                cursor.execute(
+                    f"""
+                    delete from {table} as viewed
+                    where viewed.id >= %s and viewed.id < %s and viewed.id <= %s
+                    and viewed.date_created < %s
+                    and (
+                        viewed.user_id is null
+                        or exists (
+                            select 1 from {table} as newer
+                            where newer.user_id = viewed.user_id
+                            and newer.episode_id = viewed.episode_id
+                            and (newer.date_created, newer.id)
+                            > (viewed.date_created, viewed.id)
+                        )
+                    )
+                    """,
+                    (start, start + chunk, ids['last'], cutoff),
+                )
+                deleted += cursor.rowcount
+            chunks += 1
+
+    return {
+        'deleted': deleted,
+        'chunks': chunks,
+        'seconds': time.perf_counter() - started,
+    }
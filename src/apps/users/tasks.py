@@ -0,0 +1,22 @@
+import logging
+
+from celery import shared_task
+
+from . import services
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_viewed_episodes():
+    logger.info('Pruning viewed episodes')
+    try:
+        result = services.prune_viewed_episodes()
+        logger.info(
+            'Successfully pruned viewed episodes: %s rows in %s chunks, %.3fs',
+            result['deleted'],
+            result['chunks'],
+            result['seconds'],
+        )
+    except Exception as ex:
+        logger.exception(ex)
@@ -1,3 +1,7 @@
+from django.test import override_settings
+
+from core.tests import BaseTestCase
+
 # from io import BytesIO
 
 # from django.conf import settings
@@ -107,3 +111,53 @@
 #             data={'image': image},
 #         )
 #         self.assertEqual(response.status_code, 400)
+
+
+@override_settings(USERS_VIEWED_EPISODES_DAYS=30, USERS_VIEWED_EPISODES_PRUNE_CHUNK=2)
+class PruneViewedEpisodesTest(BaseTestCase):
+    def setUp(self):
+        self._setup_test_titles(number=4)
+
+    def test_prune_viewed_episodes(self):
+        from datetime import timedelta
+
+        from django.utils.timezone import now
+
+        from apps.translations.models import Episode
+        from apps.users.models import ViewedEpisode
+        from apps.users.services import prune_viewed_episodes
+
+        first_user, _ = self._setup_test_user()
+        second_user, _ = self._setup_test_user()
+        first, second, third = Episode.objects.order_by('pk')[:3]
+
+        def view(user, episode, days):
+            return ViewedEpisode.objects.create(
+                user=user, episode=episode, date_created=now() - timedelta(days=days)
+            )
+
+        deleted = [
+            view(first_user, first, 60),
+            view(second_user, first, 45),
+            view(None, first, 40),
+        ]
+        kept = [
+            # the last views of users' episodes
+            view(first_user, first, 50),
+            view(first_user, second, 40),
+            view(second_user, first, 1),
+            # recent anonymous view
+            view(None, first, 1),
+            # the last view is older than a view created after it
+            view(first_user, third, 35),
+        ]
+        deleted.append(view(first_user, third, 70))
+
+        result = prune_viewed_episodes()
+
+        self.assertEqual(result['deleted'], len(deleted))
+        self.assertEqual(
+            set(ViewedEpisode.objects.values_list('pk', flat=True)),
+            {viewed_episode.pk for viewed_episode in kept},
+        )
+        self.assertEqual(prune_viewed_episodes()['deleted'], 0)
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models.query import QuerySet
 from django.utils.translation import gettext_lazy as _
 from rest_framework import generics, permissions, status
@@ -8,7 +9,9 @@ from rest_framework.views import APIView, Response
 
 from apps.core.generics import CreateAPIView
 from apps.core.permissions import IsOwner
+from apps.titles import viewcounts
 from apps.titles.query import filter_queryset_by_enabled_title
+from apps.titles.services import update_rating_aggregates
 
 from . import models, serializers
 
@@ -144,6 +147,15 @@ class ViewEpisode(generics.CreateAPIView):
     def get_queryset(self) -> QuerySet:
         return models.ViewedEpisode.objects.enabled()
 
+    def get_viewer(self) -> str:
+        """Unique viewer identifier: user id or ip address of anonymous user"""
+        if self.request.user.is_authenticated:
+            return f'u{self.request.user.pk}'
+
+        if forwarded_for := self.request.META.get('HTTP_X_FORWARDED_FOR'):
+            return f'a{forwarded_for.split(",")[0].strip()}'
+        return f'a{self.request.META.get("REMOTE_ADDR")}'
+
     def perform_create(self, serializer: serializers.ViewedEpisodeSerializer):
         new_viewed_episode: models.ViewedEpisode = models.ViewedEpisode(
             **serializer.validated_data
@@ -157,10 +169,22 @@ class ViewEpisode(generics.CreateAPIView):
                 .first()
             )
             if viewed_episode and viewed_episode.episode == new_viewed_episode.episode:
+                # watch progress of the last view is updated, no new view is counted
                 viewed_episode.start_from = new_viewed_episode.start_from
                 viewed_episode.save()
                 return viewed_episode
 
+        viewcounts.count_view(
+            new_viewed_episode.episode.pk,
+            new_viewed_episode.episode.translation.title_id,
+            self.get_viewer(),
+        )
+
+        # views are counted in redis, only watch progress of users is stored
+        if not new_viewed_episode.user:
+            serializer.instance = new_viewed_episode
+            return new_viewed_episode
+
         return serializer.save()
 
 
@@ -169,18 +193,28 @@ class TitleRatingCreate(generics.CreateAPIView):
     queryset = models.TitleRating.objects
     serializer_class = serializers.TitleRatingSerializer
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         if (
-            title_rating := self.get_queryset().get_or_none(
+            title_rating := self.get_queryset()
+            .select_for_update()
+            .filter(
                 user=serializer.validated_data['user'],
                 title=serializer.validated_data['title'],
             )
+            .first()
         ) :
             if title_rating.rate != serializer.validated_data['rate']:
+                rate_previous = title_rating.rate
                 title_rating.rate = serializer.validated_data['rate']
                 title_rating.save()
+                update_rating_aggregates(
+                    title_rating.title_id,
+                    added=title_rating.rate,
+                    removed=rate_previous,
+                )
                 return Response(
                     self.get_serializer_class()(title_rating).data,
                     status=status.HTTP_201_CREATED,
@@ -192,6 +226,10 @@ class TitleRatingCreate(generics.CreateAPIView):
 
         return super().create(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        title_rating = serializer.save()
+        update_rating_aggregates(title_rating.title_id, added=title_rating.rate)
+
 
 class TitleRatingRetrieve(APIView):
     permission_classes = (permissions.IsAuthenticated,)
@@ -209,11 +247,15 @@ class TitleRatingRetrieve(APIView):
 class TitleRatingRemove(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
+    @transaction.atomic
     def delete(self, request, title_slug):
-        if title_rating := models.TitleRating.objects.get_or_none(
-            user=request.user, title__slug=title_slug
-        ):
+        if (
+            title_rating := models.TitleRating.objects.select_for_update()
+            .filter(user=request.user, title__slug=title_slug)
+            .first()
+        ) :
             title_rating.delete()
+            update_rating_aggregates(title_rating.title_id, removed=title_rating.rate)
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response(
@@ -239,6 +239,10 @@ SEARCH_MIN_LENGTH = 3
 SEARCH_MAX_LENGTH = 30
 
 ALLOWED_IMAGES_MIMES = ('image/png', 'image/jpeg', 'image/webp', 'image/gif')
+# variants of uploaded images are saved by celery task, see apps.core.fields.BaseImageField
+IMAGES_ASYNC_PROCESSING = env.bool('IMAGES_ASYNC_PROCESSING', True)
+# storage backend of images, e.g. apps.core.storages.FileSystemImageStorage to store them in MEDIA_ROOT
+IMAGES_STORAGE = env.str('IMAGES_STORAGE', 'apps.core.storages.S3ImageStorage')
 ARRAY_FIELD_DELIMITER = '\n'
 
 
@@ -251,14 +255,39 @@ USERS_PASSWORD_MIN_LENGTH = 6
 USERS_USERNAME_MAX_LENGTH = 30
 USERS_USERNAME_MIN_LENGTH = 6
 USERS_PROFILE_ABOUTMYSELF_MAX_LENGTH = 255
+# older viewed episodes are deleted, except the last view of every user's episode
+USERS_VIEWED_EPISODES_DAYS = 30
+USERS_VIEWED_EPISODES_PRUNE_CHUNK = 10000
 
 NOTIFICATIONS_MAX_NUMBER_SELECTED = 20
 
 TITLES_SEARCH_MIN_LENGTH = 3
 TITLES_SEARCH_MAX_LENGTH = 30
+TITLES_SEARCH_PAGE_SIZE = 20
+TITLES_SEARCH_MAX_PAGE_SIZE = 50
+# max number of ranked results of a search query
+TITLES_SEARCH_MAX_RESULTS = 100
+TITLES_SEARCH_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+# serve autocomplete from in-process index (apps.titles.autocomplete) instead of database
+TITLES_AUTOCOMPLETE_ENGINE = env.bool('TITLES_AUTOCOMPLETE_ENGINE', True)
+TITLES_AUTOCOMPLETE_LIMIT = 10
+# how often (in seconds) workers check for titles changes
+TITLES_AUTOCOMPLETE_CHECK_INTERVAL = 1
 TITLES_RANK_EPISODES_DAYS_COUNT = 7
+# number of days title's rank snapshots are kept for
+TITLES_RANK_HISTORY_DAYS = 90
+# days of buffered views moved to the database by every flush, covers missed flushes
+TITLES_VIEWS_FLUSH_DAYS = 3
+# hours after which views weigh half as much in trending score
+TITLES_TRENDING_HALF_LIFE = 24
+# number of hours title's hourly views are kept for
+TITLES_TRENDING_HOURS = 24 * 7
 TITLES_HOME_PAGE_LIMIT = 20
 TITLES_HOME_PAGE_CACHE_TIMEOUT = 60 * 30  # 30 min
+TITLES_SIMILARS_LIMIT = 10
+TITLES_SIMILARS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+# min part of title's genres, which similar title must have
+TITLES_SIMILARS_MIN_GENRES_RATIO = 0.9
 
 COMMENTS_COMMENT_MAX_LENGTH = 255
 
@@ -309,4 +338,3 @@ if IS_LOCAL:
         from .local_settings import *
     except Exception:
         pass
-
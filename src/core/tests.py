@@ -1,6 +1,7 @@
 import random
 import string
 
+from django.conf import settings
 from django.test import TestCase
 
 JSON_CONTENT_TYPE = 'application/json'
@@ -47,3 +48,14 @@ class BaseTestCase(TestCase):
 DUMMY_CACHE_SETTINGS = {
     'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
 }
+
+# separate redis database, tests using redis directly flush it after themselves
+REDIS_TEST_CACHE_SETTINGS = {
+    'CACHES': {
+        'default': {
+            **settings.CACHES['default'],
+            'LOCATION': settings.CACHES['default']['LOCATION'].rpartition('/')[0]
+            + '/15',
+        }
+    }
+}